@@ -6,6 +6,11 @@ class Settings(BaseSettings):
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 480  # 8 hours for better UX
     
+    # Timetable solver
+    SOLVER_PROFILE: str = "standard"  # fast_draft, standard or exhaustive
+    SOLVER_NUM_WORKERS: int = 0  # 0 = use every CPU core
+    SOLVER_TIME_BUDGET_SECONDS: int = 0  # 0 = use the profile's budget for a whole run
+    
     class Config:
         env_file = ".env"
     
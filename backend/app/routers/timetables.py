@@ -1,9 +1,9 @@
 from fastapi import APIRouter, Depends, HTTPException, status, WebSocket, WebSocketDisconnect
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 import asyncio
 from ..database import get_db
-from ..schemas import Timetable, TimetableCreate, TimetableWithSlots
+from ..schemas import Timetable, TimetableCreate, TimetableWithSlots, TimetableRepairRequest, TimetableImproveRequest
 from ..models import Timetable as TimetableModel, User
 from ..auth import get_current_user, get_current_active_coordinator
 from ..services.timetable_generator import TimetableGenerator
@@ -68,11 +68,21 @@ async def create_timetable(
 async def generate_timetable_ws(
     websocket: WebSocket,
     timetable_id: int,
+    engine: str = 'bool_matrix',
+    profile: Optional[str] = None,
+    time_budget_seconds: Optional[float] = None,
+    baseline_timetable_id: Optional[int] = None,
+    mode: str = 'sequential',
+    draft_hints: bool = False,
+    strengthen_model: bool = False,
+    lean_model: bool = False,
+    lecturer_binding: str = 'session',
+    shared_sessions: bool = True,
+    level_order: str = 'difficulty',
+    max_backtracks: int = 2,
+    best_effort: bool = False,
 ):
-    """
-    Generate timetable with real-time progress updates via WebSocket.
-    This endpoint generates the timetable level by level (5th -> 4th -> 3rd -> 2nd).
-    """
+    """Generate a timetable with real-time progress updates; query parameters are listed in README.md"""
     await manager.connect(websocket)
     
     try:
@@ -97,7 +107,20 @@ async def generate_timetable_ws(
         generator = TimetableGenerator(
             db=db,
             timetable_id=timetable_id,
-            progress_callback=lambda data: asyncio.create_task(progress_callback(data))
+            progress_callback=lambda data: asyncio.create_task(progress_callback(data)),
+            engine=engine,
+            profile=profile,
+            time_budget_seconds=time_budget_seconds,
+            baseline_timetable_id=baseline_timetable_id,
+            mode=mode,
+            draft_hints=draft_hints,
+            strengthen_model=strengthen_model,
+            lean_model=lean_model,
+            lecturer_binding=lecturer_binding,
+            shared_sessions=shared_sessions,
+            level_order=level_order,
+            max_backtracks=max_backtracks,
+            best_effort=best_effort
         )
         
         # Run generation
@@ -112,7 +135,21 @@ async def generate_timetable_ws(
             # Update timetable metadata
             timetable.generation_metadata = {
                 'generated': True,
-                'levels_processed': [5, 4, 3, 2]
+                'levels_processed': generator.run_stats.get('level_order', {}).get('order', [5, 4, 3, 2]),
+                'engine': engine,
+                'mode': mode,
+                'draft_hints': draft_hints,
+                'strengthen_model': strengthen_model,
+                'lean_model': lean_model,
+                'lecturer_binding': lecturer_binding,
+                'shared_sessions': shared_sessions,
+                'level_order': level_order,
+                'max_backtracks': max_backtracks,
+                'best_effort': best_effort,
+                'solver_profile': generator.profile['name'],
+                'baseline_timetable_id': baseline_timetable_id,
+                'level_stats': generator.level_stats,
+                'run_stats': generator.run_stats
             }
             db.commit()
             
@@ -122,9 +159,15 @@ async def generate_timetable_ws(
                 'timetable_id': timetable_id
             })
         else:
+            # Levels the feasibility precheck rejected, with their resource-pressure reports
+            precheck = {
+                key: stats['precheck'] for key, stats in generator.level_stats.items()
+                if isinstance(stats, dict) and 'precheck' in stats
+            }
             await websocket.send_json({
                 'status': 'error',
-                'message': 'Failed to generate timetable. Please check constraints.'
+                'message': 'Failed to generate timetable. Please check constraints.',
+                'precheck': precheck
             })
     
     except WebSocketDisconnect:
@@ -138,6 +181,107 @@ async def generate_timetable_ws(
         if db:
             db.close()
 
+def _generated_binding(timetable: TimetableModel) -> str:
+    """Lecturer binding a timetable was generated with, so repairs and improvements keep it"""
+    return (timetable.generation_metadata or {}).get('lecturer_binding', 'session')
+
+@router.post("/{timetable_id}/repair")
+def repair_timetable(
+    timetable_id: int,
+    repair: TimetableRepairRequest,
+    current_user: User = Depends(get_current_active_coordinator),
+    db: Session = Depends(get_db)
+):
+    """
+    Re-solve only the sessions affected by a change (courses, departments, levels,
+    rooms or lecturers) and update the timetable's slots in place. Every other slot
+    stays where it is. Coordinator only. A plain def: FastAPI runs it in its threadpool,
+    so the blocking solve does not hold up the event loop.
+    """
+    timetable = db.query(TimetableModel).filter(TimetableModel.id == timetable_id).first()
+    
+    if not timetable:
+        raise HTTPException(status_code=404, detail="Timetable not found")
+    
+    scope = repair.model_dump(include={'course_ids', 'department_ids', 'levels', 'room_ids', 'lecturer_ids'})
+    if not any(scope.values()):
+        raise HTTPException(status_code=400, detail="Nothing to repair: the change scope is empty")
+    
+    try:
+        generator = TimetableGenerator(
+            db=db,
+            timetable_id=timetable_id,
+            engine=repair.engine,
+            profile=repair.profile,
+            time_budget_seconds=repair.time_budget_seconds,
+            lecturer_binding=repair.lecturer_binding or _generated_binding(timetable)
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if not generator.repair_timetable(scope, repair.neighbourhood):
+        raise HTTPException(
+            status_code=409,
+            detail="No feasible placement for the affected sessions. Try a larger neighbourhood or a full regeneration."
+        )
+    
+    timetable.generation_metadata = dict(
+        timetable.generation_metadata or {},
+        last_repair={
+            'engine': repair.engine,
+            'solver_profile': generator.profile['name'],
+            'stats': generator.level_stats.get('repair'),
+            **generator.run_stats['repair']
+        }
+    )
+    db.commit()
+    
+    return generator.run_stats['repair']
+
+@router.post("/{timetable_id}/improve")
+def improve_timetable(
+    timetable_id: int,
+    improve: TimetableImproveRequest,
+    current_user: User = Depends(get_current_active_coordinator),
+    db: Session = Depends(get_db)
+):
+    """
+    Improve a generated timetable's soft objective (broken lecturer preferences) by
+    repeatedly re-solving one day, lecturer, room or department with everything else
+    fixed, for up to time_budget_seconds. Returns the objective over time. Coordinator only.
+    A plain def, run in FastAPI's threadpool, like repair_timetable.
+    """
+    timetable = db.query(TimetableModel).filter(TimetableModel.id == timetable_id).first()
+    
+    if not timetable:
+        raise HTTPException(status_code=404, detail="Timetable not found")
+    
+    try:
+        generator = TimetableGenerator(
+            db=db,
+            timetable_id=timetable_id,
+            engine=improve.engine,
+            profile=improve.profile,
+            time_budget_seconds=improve.time_budget_seconds,
+            lecturer_binding=improve.lecturer_binding or _generated_binding(timetable)
+        )
+        improved = generator.improve_timetable(tuple(improve.neighbourhoods), improve.seed)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if improved:
+        timetable.generation_metadata = dict(
+            timetable.generation_metadata or {},
+            last_improve={
+                'engine': improve.engine,
+                'solver_profile': generator.profile['name'],
+                **generator.run_stats['improve']
+            }
+        )
+        db.commit()
+    
+    return dict(generator.run_stats['improve'], improved=improved)
+
 @router.post("/{timetable_id}/activate", response_model=Timetable)
 async def activate_timetable(
     timetable_id: int,
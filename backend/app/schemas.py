@@ -316,3 +316,25 @@ class TimetableGenerationRequest(BaseModel):
     name: str
     semester: str
     year: int
+
+class TimetableRepairRequest(BaseModel):
+    """What changed since the timetable was generated; only sessions it touches are re-solved"""
+    course_ids: List[int] = []
+    department_ids: List[int] = []
+    levels: List[int] = []
+    room_ids: List[int] = []
+    lecturer_ids: List[int] = []
+    neighbourhood: int = 0
+    engine: str = 'bool_matrix'
+    profile: Optional[str] = None
+    time_budget_seconds: Optional[float] = None
+    lecturer_binding: Optional[str] = None  # default: the one the timetable was generated with
+
+class TimetableImproveRequest(BaseModel):
+    """Keep improving a generated timetable's lecturer preferences within a time budget"""
+    neighbourhoods: List[str] = ['day', 'lecturer', 'room', 'department']
+    engine: str = 'bool_matrix'
+    profile: Optional[str] = None
+    time_budget_seconds: Optional[float] = 60
+    seed: int = 0
+    lecturer_binding: Optional[str] = None  # default: the one the timetable was generated with
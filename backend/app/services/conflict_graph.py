@@ -0,0 +1,58 @@
+from collections import defaultdict
+from typing import Dict, List, Set, Tuple
+
+# Enumeration stops after this many maximal cliques; large levels have a great many
+MAX_CLIQUES = 500
+
+
+def conflict_graph(sessions: List[Dict]) -> Tuple[Dict[int, Set[int]], List[Set[int]]]:
+    """
+    Sessions (by index) that can never run at the same time: they share a group (any of
+    a shared session's group_ids, or of the subgroups in its cover_groups), or both depend on the same single possible lecturer
+    or the same single eligible room.
+    Returns (adjacency, the member sets of every group / sole lecturer / sole room).
+    """
+    by_resource = defaultdict(set)
+    for idx, session in enumerate(sessions):
+        for group_id in session.get('cover_groups') or session.get('group_ids') or [session['group_id']]:
+            by_resource['group', group_id].add(idx)
+        if len(session['lecturers']) == 1:
+            by_resource['lecturer', session['lecturers'][0]].add(idx)
+        if len(session['rooms']) == 1:
+            by_resource['room', session['rooms'][0]].add(idx)
+
+    adjacency = {idx: set() for idx in range(len(sessions))}
+    for members in by_resource.values():
+        for idx in members:
+            adjacency[idx] |= members - {idx}
+    return adjacency, list(by_resource.values())
+
+
+def _maximal_cliques(adjacency: Dict[int, Set[int]], limit: int) -> List[Set[int]]:
+    """Bron-Kerbosch with pivoting, stopping after limit cliques"""
+    cliques = []
+    stack = [(set(), set(adjacency), set())]
+    while stack and len(cliques) < limit:
+        clique, candidates, excluded = stack.pop()
+        if not candidates and not excluded:
+            cliques.append(clique)
+            continue
+        pivot = max(candidates | excluded, key=lambda idx: len(adjacency[idx] & candidates))
+        for idx in list(candidates - adjacency[pivot]):
+            stack.append((clique | {idx}, candidates & adjacency[idx], excluded & adjacency[idx]))
+            candidates = candidates - {idx}
+            excluded = excluded | {idx}
+    return cliques
+
+
+def conflict_cliques(sessions: List[Dict], limit: int = MAX_CLIQUES) -> List[List[int]]:
+    """
+    Maximal cliques of the conflict graph that no single group, lecturer or room covers,
+    i.e. those whose at-most-one-per-hour is not already implied by a resource's own
+    constraint. Each is a sorted list of session indexes.
+    """
+    adjacency, resource_sets = conflict_graph(sessions)
+    return [
+        sorted(clique) for clique in _maximal_cliques(adjacency, limit)
+        if len(clique) > 2 and not any(clique <= members for members in resource_sets)
+    ]
@@ -0,0 +1,112 @@
+from collections import defaultdict
+from time import perf_counter
+from typing import Dict, List, Tuple
+from .level_quotas import hall_demands, resource_pressure
+
+# Resources listed in a precheck report, most oversubscribed first
+REPORT_RESOURCES = 20
+
+
+def _free_by_day(busy: int, num_days: int, day_len: int) -> List[int]:
+    """Free hours of an occupancy bitmap on each day"""
+    day_mask = (1 << day_len) - 1
+    return [day_len - bin(busy >> (day_idx * day_len) & day_mask).count('1') for day_idx in range(num_days)]
+
+
+def _no_placement(session: Dict, reason: str) -> Dict:
+    """Problem entry for a session that has nowhere to go"""
+    return {'check': 'no_placement', 'reason': reason, 'course_id': session['course_id'],
+            'group_id': session['group_id'], 's_id': session['s_id'],
+            'type': session['type'], 'duration': session['duration']}
+
+
+def precheck_sessions(sessions: List[Dict], room_busy: Dict[int, int], lecturer_busy: Dict[int, int],
+                      group_busy: Dict[int, int], remaining_hours: Dict[int, int],
+                      num_days: int, day_len: int, skipped: List[Dict] = ()) -> Tuple[List[Dict], Dict]:
+    """
+    Counting checks that are necessary for the sessions to fit around the occupancy
+    bitmaps (earlier slots and unavailability), run before any model is built:
+    - group_hours: the hours of the sessions filling a group (cover_groups) fit in its free cells
+    - lecturer_hours / room_hours: Hall's condition for every lecturer and room candidate
+      set, against free cells (lecturers also against the weekly hours they have left)
+    - no_placement: every session has some day and start where one of its groups' cells,
+      one of its rooms and one of its lecturers are all free for the whole block (reason
+      'blocked'); skipped lists the sessions left out for having no candidates at all,
+      each a no_placement problem with its session['reason']
+    The counts take the unfiltered demand: skipped sessions' hours still fill their groups
+    and the rooms or lecturers they do have. Any problem proves the sessions infeasible;
+    none proves nothing.
+
+    Returns (problems, report): the report holds the problems, the skipped hours per
+    reason, per-resource pressure (demand / free hours) of the most oversubscribed rooms,
+    lecturers and groups with their free hours per day, and the time taken.
+    """
+    started = perf_counter()
+    num_cells = num_days * day_len
+    problems = []
+    demand_sessions = list(sessions) + list(skipped)
+
+    def free_cells(busy: int) -> int:
+        return num_cells - bin(busy).count('1')
+
+    group_demand = defaultdict(int)
+    for session in demand_sessions:
+        for group_id in session.get('cover_groups') or session.get('group_ids') or [session['group_id']]:
+            group_demand[group_id] += session['duration']
+    group_pressure = {}
+    for group_id, demand in group_demand.items():
+        capacity = free_cells(group_busy.get(group_id, 0))
+        group_pressure[group_id] = demand / max(capacity, 1)
+        if demand > capacity:
+            problems.append({'check': 'group_hours', 'group_id': group_id, 'demand': demand, 'capacity': capacity})
+
+    capacity_of = {
+        'rooms': lambda room_id: free_cells(room_busy.get(room_id, 0)),
+        'lecturers': lambda lecturer_id: min(free_cells(lecturer_busy.get(lecturer_id, 0)),
+                                             remaining_hours.get(lecturer_id, num_cells)),
+    }
+    for key, check in (('lecturers', 'lecturer_hours'), ('rooms', 'room_hours')):
+        for candidates, demand in hall_demands(demand_sessions, key).items():
+            if not candidates:
+                continue  # a skipped session without any is a no_placement problem below
+            capacity = sum(capacity_of[key](resource_id) for resource_id in candidates)
+            if demand > capacity:
+                problems.append({'check': check, key[:-1] + '_ids': sorted(candidates),
+                                 'demand': demand, 'capacity': capacity})
+
+    for session in sessions:
+        groups_blocked = 0
+        for group_id in session.get('group_ids') or [session['group_id']]:
+            groups_blocked |= group_busy.get(group_id, 0)
+        duration = session['duration']
+        placeable = any(
+            not groups_blocked & block
+            and any(not room_busy.get(room_id, 0) & block for room_id in session['rooms'])
+            and any(not lecturer_busy.get(lecturer_id, 0) & block for lecturer_id in session['lecturers'])
+            for day_idx in (session.get('days') or range(num_days))
+            for start_t in range(day_len - duration + 1)
+            for block in [((1 << duration) - 1) << (day_idx * day_len + start_t)]
+        )
+        if not placeable:
+            problems.append(_no_placement(session, 'blocked'))
+    problems.extend(_no_placement(session, session['reason']) for session in skipped)
+
+    # Heatmap of the tightest resources: pressure and what is left of each day
+    pressure = resource_pressure(demand_sessions, room_busy, lecturer_busy, remaining_hours, num_cells)
+    pressure.update({('group', group_id): ratio for group_id, ratio in group_pressure.items()})
+    busy_of = {'room': room_busy, 'lecturer': lecturer_busy, 'group': group_busy}
+    tightest = sorted(pressure, key=lambda resource: (-pressure[resource], resource))[:REPORT_RESOURCES]
+    skipped_hours = defaultdict(int)
+    for session in skipped:
+        skipped_hours[session['reason']] += session['duration']
+    report = {
+        'problems': problems,
+        'skipped_hours': dict(skipped_hours),
+        'pressure': [
+            {'kind': kind, 'id': resource_id, 'pressure': round(pressure[kind, resource_id], 3),
+             'free_by_day': _free_by_day(busy_of[kind].get(resource_id, 0), num_days, day_len)}
+            for kind, resource_id in tightest
+        ],
+        'seconds': round(perf_counter() - started, 4),
+    }
+    return problems, report
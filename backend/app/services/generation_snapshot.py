@@ -0,0 +1,87 @@
+from collections import defaultdict
+from time import perf_counter
+from typing import Dict, List, Optional
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from ..models import (
+    Room, Course, Lecturer, Department, StudentGroup,
+    GroupAssignment, LecturerAssignment, LecturerUnavailability, TimetableSlot
+)
+
+class GenerationSnapshot:
+    """
+    Everything the generator reads, loaded once per run with one query per table.
+    On PostgreSQL the reads share a REPEATABLE READ transaction, so all levels see
+    the same consistent data even if staff keep editing while generation runs.
+    """
+
+    def __init__(self):
+        self.courses_by_level: Dict[int, List[Course]] = defaultdict(list)
+        self.groups_by_level: Dict[int, List[StudentGroup]] = defaultdict(list)
+        self.groups: Dict[int, StudentGroup] = {}
+        self.group_sizes: Dict[int, int] = {}
+        self.rooms: List[Room] = []
+        self.department_codes: Dict[int, str] = {}
+        self.lecturers: List[Lecturer] = []
+        self.unavailability: List[LecturerUnavailability] = []
+        self.lecturer_assignments: Dict[int, List[LecturerAssignment]] = defaultdict(list)  # course_id -> rows
+        self.group_ids_by_course: Dict[int, List[int]] = defaultdict(list)
+        self.baseline_slots: List[TimetableSlot] = []  # slots of the timetable to warm-start from
+        self.stats: Dict[str, float] = {}
+
+    @classmethod
+    def load(cls, db: Session, baseline_timetable_id: Optional[int] = None) -> 'GenerationSnapshot':
+        snapshot = cls()
+        started = perf_counter()
+        queries = 0
+
+        def count_query(*args, **kwargs):
+            nonlocal queries
+            queries += 1
+
+        connection = db.get_bind().connect()
+        if connection.dialect.name == 'postgresql':
+            connection = connection.execution_options(isolation_level='REPEATABLE READ')
+        event.listen(connection, 'before_cursor_execute', count_query)
+        reader = Session(bind=connection)
+        try:
+            with connection.begin():
+                for course in reader.query(Course).order_by(Course.id).all():
+                    snapshot.courses_by_level[course.level].append(course)
+
+                for group in reader.query(StudentGroup).order_by(StudentGroup.id).all():
+                    snapshot.groups[group.id] = group
+                    snapshot.group_sizes[group.id] = group.size
+                    snapshot.groups_by_level[group.level].append(group)
+
+                snapshot.rooms = reader.query(Room).order_by(Room.id).all()
+                snapshot.department_codes = {dept.id: dept.code for dept in reader.query(Department).all()}
+                snapshot.lecturers = reader.query(Lecturer).all()
+                snapshot.unavailability = reader.query(LecturerUnavailability).all()
+
+                for assignment in reader.query(LecturerAssignment).order_by(LecturerAssignment.id).all():
+                    snapshot.lecturer_assignments[assignment.course_id].append(assignment)
+
+                for assignment in reader.query(GroupAssignment).order_by(GroupAssignment.id).all():
+                    snapshot.group_ids_by_course[assignment.course_id].append(assignment.group_id)
+
+                if baseline_timetable_id is not None:
+                    snapshot.baseline_slots = reader.query(TimetableSlot).filter(
+                        TimetableSlot.timetable_id == baseline_timetable_id
+                    ).all()
+        finally:
+            # Rows stay usable as plain detached objects after the reader closes
+            reader.close()
+            event.remove(connection, 'before_cursor_execute', count_query)
+            connection.close()
+
+        snapshot.stats = {
+            'queries': queries,
+            'load_seconds': round(perf_counter() - started, 3),
+            'courses': sum(len(c) for c in snapshot.courses_by_level.values()),
+            'groups': len(snapshot.groups),
+            'rooms': len(snapshot.rooms),
+            'lecturers': len(snapshot.lecturers),
+            'baseline_slots': len(snapshot.baseline_slots),
+        }
+        return snapshot
@@ -0,0 +1,70 @@
+from collections import defaultdict
+from typing import Dict, FrozenSet, List, Optional
+from ..models import GroupDivisionType, GroupType, StudentGroup
+
+# Course division -> (session type taught in subgroups, type of the subgroups)
+DIVISION_SUBGROUPS = {
+    GroupDivisionType.LAB_GROUPS: ('practical', GroupType.LAB_GROUP),
+    GroupDivisionType.DRAWING_GROUPS: ('practical', GroupType.DRAWING_GROUP),
+    GroupDivisionType.TUTORIAL_GROUPS: ('tutorial', GroupType.TUTORIAL_GROUP),
+}
+
+
+class GroupHierarchy:
+    """
+    Closures of the StudentGroup.parent_group_id tree, computed once per run. A group's
+    students are also in all its ancestors, so a group's session clashes with sessions of
+    its ancestors and descendants, but not with those of its siblings: sibling lab groups
+    may run in parallel.
+    """
+
+    def __init__(self, groups: List[StudentGroup]):
+        self.parent: Dict[int, int] = {}
+        self.children: Dict[int, List[int]] = defaultdict(list)
+        self.group_types: Dict[int, Optional[GroupType]] = {}
+        for group in groups:
+            self.group_types[group.id] = group.group_type
+        for group in groups:
+            if group.parent_group_id in self.group_types and group.parent_group_id != group.id:
+                self.parent[group.id] = group.parent_group_id
+                self.children[group.parent_group_id].append(group.id)
+
+        self.ancestors: Dict[int, FrozenSet[int]] = {}    # group_id -> strict ancestors
+        self.descendants: Dict[int, FrozenSet[int]] = {}  # group_id -> strict descendants
+        for group_id in self.group_types:
+            chain, current = [], self.parent.get(group_id)
+            # A corrupt parent cycle stops the walk instead of looping forever
+            while current is not None and current != group_id and current not in chain:
+                chain.append(current)
+                current = self.parent.get(current)
+            self.ancestors[group_id] = frozenset(chain)
+        below = defaultdict(set)
+        for group_id, ancestors in self.ancestors.items():
+            for ancestor in ancestors:
+                below[ancestor].add(group_id)
+        self.descendants = {group_id: frozenset(below[group_id]) for group_id in self.group_types}
+
+    def below(self, group_id: int) -> FrozenSet[int]:
+        """The group and its descendants: the groups whose timetables its sessions fill"""
+        return self.descendants.get(group_id, frozenset()) | {group_id}
+
+    def family(self, group_id: int) -> FrozenSet[int]:
+        """The group, its ancestors and its descendants: every group it may not overlap"""
+        return self.ancestors.get(group_id, frozenset()) | self.below(group_id)
+
+    def subgroups(self, group_id: int, group_type: GroupType) -> List[int]:
+        """Direct subgroups of the given type, in id order"""
+        return sorted(child for child in self.children.get(group_id, []) if self.group_types[child] == group_type)
+
+    def split_groups(self, group_id: int, division: Optional[GroupDivisionType], session_type: str) -> List[int]:
+        """
+        Groups a course session assigned to group_id is taught to: the group's lab,
+        drawing or tutorial subgroups (each on its own, possibly in parallel) when the
+        course's division splits that session type and the subgroups exist, else the group.
+        """
+        split = DIVISION_SUBGROUPS.get(division)
+        if split is not None and split[0] == session_type:
+            subgroups = self.subgroups(group_id, split[1])
+            if subgroups:
+                return subgroups
+        return [group_id]
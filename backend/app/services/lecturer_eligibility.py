@@ -0,0 +1,119 @@
+from typing import Dict, List, Optional, Set
+from ..models import Lecturer, LecturerAssignment, LecturerUnavailability
+from .room_eligibility import DAY_NAMES
+
+SESSION_TYPES = ('lecture', 'tutorial', 'practical')
+
+# Spellings seen in LecturerAssignment.session_type
+SESSION_TYPE_ALIASES = {
+    'lectures': 'lecture',
+    'tutorials': 'tutorial',
+    'tut': 'tutorial',
+    'practicals': 'practical',
+    'lab': 'practical',
+    'labs': 'practical',
+}
+
+
+def parse_session_types(text: Optional[str]) -> Optional[Set[str]]:
+    """'lecture' / 'Lecture, Tutorial' / 'lab' -> session types, None when unrestricted"""
+    if not text or not text.strip():
+        return None
+    types = set()
+    for part in text.replace(';', ',').replace('/', ',').split(','):
+        part = part.strip().lower()
+        part = SESSION_TYPE_ALIASES.get(part, part)
+        if part in ('all', 'any', 'both'):
+            return None
+        if part in SESSION_TYPES:
+            types.add(part)
+    return types or None
+
+
+def parse_preferred_days(values, num_days: int) -> Optional[Set[int]]:
+    """teaching_preferences["preferred_days"] (names or 0-based indexes) -> day indexes"""
+    if not values:
+        return None
+    if not isinstance(values, list):
+        values = [values]
+    days = set()
+    for value in values:
+        if isinstance(value, int):
+            day_idx = value
+        else:
+            name = str(value).strip().lower()[:3]
+            day_idx = DAY_NAMES.index(name) if name in DAY_NAMES else None
+        if day_idx is not None and 0 <= day_idx < num_days:
+            days.add(day_idx)
+    # Preferring every day (or nothing readable) is no preference at all
+    if not days or len(days) == num_days:
+        return None
+    return days
+
+
+class LecturerEligibility:
+    """
+    Compiles each lecturer's LecturerUnavailability rows into a day x hour
+    bitmask (bit = day * day_len + hour index) and keeps the weekly hour cap and
+    teaching preferences at hand, so the generator can skip impossible variables.
+    """
+
+    def __init__(self, lecturers: List[Lecturer], unavailability: List[LecturerUnavailability],
+                 num_days: int, day_len: int, first_hour: int = 7):
+        self.unavailable: Dict[int, int] = {}      # lecturer_id -> bitmap of cells they cannot teach
+        self.max_hours: Dict[int, int] = {}        # lecturer_id -> max_hours_per_week
+        self.preferences: Dict[int, Dict] = {}     # lecturer_id -> teaching_preferences
+        self.preferred_days: Dict[int, Set[int]] = {}  # lecturer_id -> days they prefer, when restricted
+
+        for lecturer in lecturers:
+            if lecturer.max_hours_per_week is not None:
+                self.max_hours[lecturer.id] = lecturer.max_hours_per_week
+            prefs = lecturer.teaching_preferences
+            if isinstance(prefs, dict):
+                self.preferences[lecturer.id] = prefs
+                days = parse_preferred_days(prefs.get('preferred_days'), num_days)
+                if days:
+                    self.preferred_days[lecturer.id] = days
+
+        for entry in unavailability:
+            if not 0 <= entry.day_of_week < num_days:
+                continue
+            # Any hour slot the unavailable window touches is blocked
+            start_idx = max(entry.start_time.hour - first_hour, 0)
+            end_idx = min(entry.end_time.hour - first_hour + (1 if entry.end_time.minute else 0), day_len)
+            for t_idx in range(start_idx, end_idx):
+                self.unavailable[entry.lecturer_id] = (
+                    self.unavailable.get(entry.lecturer_id, 0) | 1 << (entry.day_of_week * day_len + t_idx)
+                )
+
+    def eligible_lecturers(self, assignments: List[LecturerAssignment], session_type: str) -> List[int]:
+        """
+        Lecturers assigned to a course who may teach the given session type. Assignments
+        without a session_type cover every type; if nobody covers the type explicitly,
+        any assigned lecturer may take it rather than dropping the session.
+        """
+        eligible = []
+        for assignment in assignments:
+            types = parse_session_types(assignment.session_type)
+            if (types is None or session_type in types) and assignment.lecturer_id not in eligible:
+                eligible.append(assignment.lecturer_id)
+        if not eligible:
+            eligible = list(dict.fromkeys(a.lecturer_id for a in assignments))
+        return eligible
+
+    def bound_lecturers(self, assignments: List[LecturerAssignment], session_types: Set[str],
+                        primary_only: bool = False) -> List[int]:
+        """
+        Lecturers assigned to a course who may teach every one of the session types, for
+        binding a single lecturer to all of them. Primary expertise comes first; with
+        primary_only, assistants are left out whenever some primary lecturer qualifies.
+        """
+        eligible = None
+        for session_type in session_types:
+            allowed = self.eligible_lecturers(assignments, session_type)
+            eligible = allowed if eligible is None else [l for l in eligible if l in allowed]
+        eligible = eligible or []
+        primary = {a.lecturer_id for a in assignments if (a.expertise_level or 'primary').lower() == 'primary'}
+        if primary_only and primary & set(eligible):
+            return [lecturer_id for lecturer_id in eligible if lecturer_id in primary]
+        return sorted(eligible, key=lambda lecturer_id: lecturer_id not in primary)
@@ -0,0 +1,227 @@
+from collections import defaultdict
+from time import perf_counter
+from typing import Dict, List, Optional, Tuple
+from ortools.sat.python import cp_model
+
+# Rooms and lecturers are divided between levels in half-day blocks
+BLOCKS_PER_DAY = 2
+
+
+def hall_demands(sessions: List[Dict], key: str) -> Dict[frozenset, int]:
+    """
+    For every distinct candidate set (session['rooms'] or session['lecturers']), the hours
+    of sessions that can only use resources inside it. Giving each set at least that much
+    capacity is Hall's condition, necessary for the level to fit its quota.
+    """
+    hours = defaultdict(int)
+    for session in sessions:
+        hours[frozenset(session[key])] += session['duration']
+    return {
+        candidates: sum(h for subset, h in hours.items() if subset <= candidates)
+        for candidates in hours
+    }
+
+
+def resource_pressure(sessions: List[Dict], room_busy: Dict[int, int], lecturer_busy: Dict[int, int],
+                      remaining_hours: Dict[int, int], num_cells: int) -> Dict[Tuple[str, int], float]:
+    """
+    How oversubscribed each room and lecturer the sessions may use is: for every Hall
+    demand of hall_demands, its hours divided by the free hours of its candidate set, and
+    per resource the highest such ratio of a set it belongs to. A lecturer's free hours are
+    also capped by the weekly hours it has left. Above 1.0 the sessions cannot all fit;
+    a set with no free hours at all counts its demand as the ratio.
+
+    Returns {('room' | 'lecturer', resource_id): ratio}.
+    """
+    def free_room(room_id: int) -> int:
+        return num_cells - bin(room_busy.get(room_id, 0)).count('1')
+
+    def free_lecturer(lecturer_id: int) -> int:
+        free = num_cells - bin(lecturer_busy.get(lecturer_id, 0)).count('1')
+        return min(free, remaining_hours.get(lecturer_id, free))
+
+    pressure = {}
+    for kind, key, free in (('room', 'rooms', free_room), ('lecturer', 'lecturers', free_lecturer)):
+        for candidates, demand in hall_demands(sessions, key).items():
+            ratio = demand / max(sum(free(resource_id) for resource_id in candidates), 1)
+            for resource_id in candidates:
+                pressure[kind, resource_id] = max(pressure.get((kind, resource_id), 0.0), ratio)
+    return pressure
+
+
+def allocate_level_quotas(level_sessions: Dict[int, List[Dict]], room_busy: Dict[int, int],
+                          lecturer_busy: Dict[int, int], remaining_hours: Dict[int, int],
+                          num_days: int, day_len: int, time_limit: float,
+                          num_workers: int = 1) -> Tuple[Optional[Dict[int, Dict]], Dict]:
+    """
+    Divide the rooms and lecturers that several levels compete for between those levels,
+    so every level can then be solved on its own. Each half-day block of a shared room or
+    lecturer goes to at most one level, and a shared lecturer's remaining weekly hours are
+    split between the levels that need them; resources only one level uses stay whole.
+    A small CP-SAT model enforces Hall's condition per level for every room and lecturer
+    candidate set, requires rooms and lecturers in the same blocks for the sessions (and
+    groups) that need both, and spreads each level's room-hours evenly over the week.
+
+    Returns ({level: {'rooms': {room_id: blocked mask}, 'lecturers': {lecturer_id: blocked mask},
+    'max_hours': {lecturer_id: hours left}}}, stats); the quotas are None if no split exists.
+    """
+    started = perf_counter()
+    model = cp_model.CpModel()
+    levels = [level for level, sessions in level_sessions.items() if sessions]
+    block_len = day_len // BLOCKS_PER_DAY
+    blocks = range(num_days * BLOCKS_PER_DAY)
+    block_masks = [((1 << block_len) - 1) << (b // BLOCKS_PER_DAY * day_len + b % BLOCKS_PER_DAY * block_len)
+                   for b in blocks]
+
+    def free_hours(busy: int, block: int) -> int:
+        return block_len - bin(busy & block_masks[block]).count('1')
+
+    levels_using = {'rooms': defaultdict(set), 'lecturers': defaultdict(set)}
+    for level in levels:
+        for session in level_sessions[level]:
+            for key in ('rooms', 'lecturers'):
+                for resource_id in session[key]:
+                    levels_using[key][resource_id].add(level)
+
+    # owners[key][resource_id][level, block] -> literal, for resources shared by several levels
+    owners = {'rooms': defaultdict(dict), 'lecturers': defaultdict(dict)}
+    busy_by = {'rooms': room_busy, 'lecturers': lecturer_busy}
+    for key in ('rooms', 'lecturers'):
+        for resource_id, using in levels_using[key].items():
+            if len(using) < 2:
+                continue
+            busy = busy_by[key].get(resource_id, 0)
+            for block in blocks:
+                if not free_hours(busy, block):
+                    continue
+                literals = []
+                for level in using:
+                    literal = model.NewBoolVar(f'{key}{resource_id}_l{level}_b{block}')
+                    owners[key][resource_id][level, block] = literal
+                    literals.append(literal)
+                model.AddAtMostOne(literals)
+
+    def block_capacity(key: str, resource_ids, level: int, block: int):
+        """Free hours the level can use in one block across some rooms or lecturers"""
+        literals, coeffs, fixed = [], [], 0
+        for resource_id in resource_ids:
+            hours = free_hours(busy_by[key].get(resource_id, 0), block)
+            if resource_id not in owners[key]:
+                fixed += hours
+            elif (level, block) in owners[key][resource_id]:
+                literals.append(owners[key][resource_id][level, block])
+                coeffs.append(hours)
+        return cp_model.LinearExpr.WeightedSum(literals, coeffs) + fixed
+
+    # Shared lecturers' remaining hours are split; a level only gets hours in blocks it owns
+    lecturer_hours = defaultdict(dict)  # lecturer_id -> {level: hours variable}
+    for lecturer_id in owners['lecturers']:
+        for level in levels_using['lecturers'][lecturer_id]:
+            hours = model.NewIntVar(0, num_days * day_len, f'hours{lecturer_id}_l{level}')
+            model.Add(hours <= cp_model.LinearExpr.Sum(
+                [block_capacity('lecturers', [lecturer_id], level, block) for block in blocks]
+            ))
+            lecturer_hours[lecturer_id][level] = hours
+        if lecturer_id in remaining_hours:
+            model.Add(cp_model.LinearExpr.Sum(list(lecturer_hours[lecturer_id].values())) <= remaining_hours[lecturer_id])
+
+    def lecturer_hours_for(lecturer_id: int, level: int):
+        if lecturer_id in lecturer_hours:
+            return lecturer_hours[lecturer_id][level]
+        busy = lecturer_busy.get(lecturer_id, 0)
+        return min(remaining_hours.get(lecturer_id, num_days * day_len),
+                   sum(free_hours(busy, block) for block in blocks))
+
+    def add_cover(name: str, level: int, rooms, lecturers, demand: int, per_day_cap: int):
+        # Sessions need a room and a lecturer in the same block: per block, count the
+        # hours both sides can offer
+        daily = defaultdict(list)
+        for block in blocks:
+            cover = model.NewIntVar(0, block_len * len(rooms), f'{name}_b{block}')
+            model.Add(cover <= block_capacity('rooms', rooms, level, block))
+            model.Add(cover <= block_capacity('lecturers', lecturers, level, block))
+            daily[block // BLOCKS_PER_DAY].append(cover)
+        totals = []
+        for day_covers in daily.values():
+            total = model.NewIntVar(0, per_day_cap, f'{name}_day{len(totals)}')
+            model.Add(total <= cp_model.LinearExpr.Sum(day_covers))
+            totals.append(total)
+        model.Add(cp_model.LinearExpr.Sum(totals) >= demand)
+
+    spread_terms = []
+    shared = set(owners['rooms']) | set(owners['lecturers'])
+    for level in levels:
+        sessions = level_sessions[level]
+        combos = defaultdict(int)
+        group_demand = defaultdict(int)
+        group_rooms, group_lecturers = defaultdict(set), defaultdict(set)
+        for session in sessions:
+            combos[frozenset(session['rooms']), frozenset(session['lecturers'])] += session['duration']
+            # A shared session (session['group_ids']) counts for each of its groups, and a
+            # session of a group with subgroups (session['cover_groups']) for each of those
+            for group_id in session.get('cover_groups') or session.get('group_ids') or [session['group_id']]:
+                group_demand[group_id] += session['duration']
+                group_rooms[group_id].update(session['rooms'])
+                group_lecturers[group_id].update(session['lecturers'])
+        for idx, ((rooms, lecturers), demand) in enumerate(combos.items()):
+            if (rooms | lecturers) & shared:
+                add_cover(f'combo{idx}_l{level}', level, rooms, lecturers, demand, demand)
+        # A group attends at most day_len hours a day
+        for group_id, demand in group_demand.items():
+            if (group_rooms[group_id] | group_lecturers[group_id]) & shared:
+                add_cover(f'group{group_id}_l{level}', level, group_rooms[group_id],
+                          group_lecturers[group_id], demand, day_len)
+
+        for rooms, demand in hall_demands(sessions, 'rooms').items():
+            if rooms & set(owners['rooms']):
+                model.Add(cp_model.LinearExpr.Sum(
+                    [block_capacity('rooms', rooms, level, block) for block in blocks]
+                ) >= demand)
+        for lecturers, demand in hall_demands(sessions, 'lecturers').items():
+            if lecturers & set(owners['lecturers']):
+                model.Add(cp_model.LinearExpr.Sum([lecturer_hours_for(l, level) for l in lecturers]) >= demand)
+
+        # Reward each block's room-hours up to the level's even share
+        block_share = -(-sum(s['duration'] for s in sessions) // len(blocks))
+        level_rooms = {r for s in sessions for r in s['rooms']}
+        for block in blocks:
+            spread = model.NewIntVar(0, block_share, f'spread_l{level}_b{block}')
+            model.Add(spread <= block_capacity('rooms', level_rooms, level, block))
+            spread_terms.append(spread)
+
+    # ...and hand out as many of the shared lecturers' remaining hours as the caps allow
+    hour_terms = [hours for hours_by_level in lecturer_hours.values() for hours in hours_by_level.values()]
+    model.Maximize(cp_model.LinearExpr.Sum(spread_terms + hour_terms))
+
+    build_seconds = perf_counter() - started
+    solver = cp_model.CpSolver()
+    solver.parameters.max_time_in_seconds = time_limit
+    solver.parameters.num_workers = num_workers
+    status = solver.Solve(model)
+    stats = {
+        'variables': len(model.Proto().variables),
+        'constraints': len(model.Proto().constraints),
+        'shared_rooms': len(owners['rooms']),
+        'shared_lecturers': len(owners['lecturers']),
+        'build_seconds': round(build_seconds, 3),
+        'solve_seconds': round(perf_counter() - started - build_seconds, 3),
+        'status': solver.StatusName(status),
+    }
+    if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        return None, stats
+
+    quotas = {level: {'rooms': {}, 'lecturers': {}, 'max_hours': {}} for level in levels}
+    for key in ('rooms', 'lecturers'):
+        for resource_id, owned in owners[key].items():
+            for level in levels_using[key][resource_id]:
+                blocked = 0
+                for block in blocks:
+                    literal = owned.get((level, block))
+                    if literal is None or not solver.BooleanValue(literal):
+                        blocked |= block_masks[block]
+                quotas[level][key][resource_id] = blocked
+    for lecturer_id, hours_by_level in lecturer_hours.items():
+        if lecturer_id in remaining_hours:
+            for level, hours in hours_by_level.items():
+                quotas[level]['max_hours'][lecturer_id] = solver.Value(hours)
+    return quotas, stats
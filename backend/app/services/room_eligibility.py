@@ -0,0 +1,184 @@
+import re
+from typing import Dict, List, Optional, Tuple
+from ..models import Room, Course, RoomType, RoomCategory
+
+DAY_NAMES = ['mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun']
+
+# Room categories that satisfy a course's preferred room type
+PREFERRED_CATEGORIES = {
+    RoomType.LECTURE_HALL: {
+        RoomCategory.LECTURE_HALL_LARGE, RoomCategory.LECTURE_HALL_MEDIUM, RoomCategory.LECTURE_HALL_SMALL
+    },
+    RoomType.LAB: {RoomCategory.COMPUTER_LAB, RoomCategory.MECHANICAL_LAB, RoomCategory.ELECTRICAL_LAB},
+    RoomType.DRAWING_ROOM: {RoomCategory.DRAWING_ROOM},
+    RoomType.SEMINAR_ROOM: {RoomCategory.SEMINAR_ROOM, RoomCategory.CONFERENCE_ROOM},
+    RoomType.SURVEYING_ROOM: {RoomCategory.SURVEYING_ROOM},
+}
+
+# Legacy room_type substrings, used for rooms without a room_category
+PREFERRED_ROOM_TYPE_KEYWORDS = {
+    RoomType.LECTURE_HALL: ('lecture', 'class'),
+    RoomType.LAB: ('lab',),
+    RoomType.DRAWING_ROOM: ('drawing',),
+    RoomType.SEMINAR_ROOM: ('seminar',),
+    RoomType.SURVEYING_ROOM: ('surveying',),
+}
+
+# Affinity values that do not restrict a room to one department
+OPEN_AFFINITIES = {'', 'general', 'all', 'any', 'none'}
+
+_CLAUSE_RE = re.compile(
+    r'^(?P<days>[a-z]{3}[a-z]*(?:\s*[-,]\s*[a-z]{3}[a-z]*)*)?\s*'
+    r'(?P<start>\d{1,2}:\d{2})?\s*(?:-\s*(?P<end>\d{1,2}:\d{2}))?$'
+)
+
+
+def _parse_days(text: str) -> Optional[List[int]]:
+    """'Mon-Fri' / 'Mon,Wed' / 'Tuesday' -> day indexes, None if unrecognised"""
+    days = []
+    for part in text.split(','):
+        bounds = [b.strip()[:3] for b in part.split('-')]
+        if any(b not in DAY_NAMES for b in bounds) or len(bounds) > 2:
+            return None
+        first, last = DAY_NAMES.index(bounds[0]), DAY_NAMES.index(bounds[-1])
+        days.extend(range(first, last + 1))
+    return days
+
+
+def parse_availability(text: Optional[str], num_days: int, day_len: int, first_hour: int = 7) -> int:
+    """
+    Compile a room availability string such as "Mon-Fri 08:00-17:00" or
+    "Mon,Wed 09:00-12:00; Fri 07:00-13:00" into a day x hour bitmask
+    (bit = day * day_len + hour index). Empty or unreadable strings mean always available.
+    """
+    full_mask = (1 << (num_days * day_len)) - 1
+    if not text or not text.strip():
+        return full_mask
+
+    mask = 0
+    for clause in text.lower().split(';'):
+        clause = clause.strip()
+        if not clause:
+            continue
+        match = _CLAUSE_RE.match(clause)
+        if not match:
+            return full_mask
+
+        days = _parse_days(match.group('days')) if match.group('days') else list(range(num_days))
+        if days is None:
+            return full_mask
+
+        # Only whole hour slots inside the window are usable
+        start_idx, end_idx = 0, day_len
+        if match.group('start'):
+            start_hour, start_minute = (int(v) for v in match.group('start').split(':'))
+            start_idx = start_hour - first_hour + (1 if start_minute else 0)
+        if match.group('end'):
+            end_idx = int(match.group('end').split(':')[0]) - first_hour
+        start_idx, end_idx = max(start_idx, 0), min(end_idx, day_len)
+
+        for day_idx in days:
+            if day_idx >= num_days:
+                continue
+            for t_idx in range(start_idx, end_idx):
+                mask |= 1 << (day_idx * day_len + t_idx)
+
+    return mask
+
+
+class RoomEligibility:
+    """
+    Parses every room's scheduling attributes once (type/category, capacity,
+    equipment, availability, department affinity) and answers which rooms a
+    (course, session type, group) may legally use, memoised as an eligibility matrix.
+    """
+
+    def __init__(self, rooms: List[Room], department_codes: Dict[int, str], num_days: int, day_len: int):
+        self.department_codes = department_codes
+        self.matrix: Dict[Tuple[int, str, int, int], List[int]] = {}  # (course_id, session_type, group_id, size) -> room ids
+        self.unavailable: Dict[int, int] = {}  # room_id -> bitmap of cells the room cannot be booked
+        self._rooms = []
+
+        full_mask = (1 << (num_days * day_len)) - 1
+        for room in rooms:
+            equipment = room.equipment if isinstance(room.equipment, list) else []
+            affinity = (room.department_affinity or '').strip().lower()
+            available = parse_availability(room.availability, num_days, day_len)
+            if available != full_mask:
+                self.unavailable[room.id] = full_mask & ~available
+            self._rooms.append({
+                'id': room.id,
+                'capacity': room.capacity or 0,
+                'category': room.room_category,
+                'room_type': str(room.room_type or '').lower(),
+                'equipment': [str(e).lower() for e in equipment],
+                'has_projector': bool(room.has_projector),
+                'has_computers': bool(room.has_computers),
+                'affinities': None if affinity in OPEN_AFFINITIES else {
+                    a.strip() for a in re.split(r'[,;/]', affinity) if a.strip()
+                },
+                'bookable': available != 0,
+            })
+
+    def eligible_rooms(self, course: Course, session_type: str, group_id: int, group_size: int) -> List[int]:
+        """
+        Room ids the given course session may use for a group of group_size students
+        (several groups taught together pass their combined size)
+        """
+        key = (course.id, session_type, group_id, group_size)
+        if key not in self.matrix:
+            fits = self._fits(course, session_type, group_size)
+            self.matrix[key] = [
+                room['id'] for room in self._rooms
+                if fits(room) and self._matches_room_type(room, course.preferred_room_type)
+            ]
+        return self.matrix[key]
+
+    def other_type_rooms(self, course: Course, session_type: str, group_size: int) -> List[int]:
+        """
+        Rooms the session could use if the course's preferred room type were waived: those
+        meeting every other requirement that eligible_rooms leaves out for their type only
+        """
+        fits = self._fits(course, session_type, group_size)
+        return [
+            room['id'] for room in self._rooms
+            if fits(room) and not self._matches_room_type(room, course.preferred_room_type)
+        ]
+
+    def _fits(self, course: Course, session_type: str, group_size: int):
+        """Test of everything but the room type: availability, capacity, affinity, equipment"""
+        department_code = (self.department_codes.get(course.department_id) or '').lower()
+        required_equipment = self._required_equipment(course, session_type)
+        return lambda room: (
+            room['bookable']
+            and room['capacity'] >= group_size
+            and (room['affinities'] is None or department_code in room['affinities'])
+            and all(self._has_equipment(room, item) for item in required_equipment)
+        )
+
+    def _matches_room_type(self, room: Dict, preferred: Optional[RoomType]) -> bool:
+        if preferred is None or preferred == RoomType.ANY or preferred not in PREFERRED_CATEGORIES:
+            return True
+        if room['category'] is not None:
+            return room['category'] in PREFERRED_CATEGORIES[preferred]
+        return any(keyword in room['room_type'] for keyword in PREFERRED_ROOM_TYPE_KEYWORDS[preferred])
+
+    def _required_equipment(self, course: Course, session_type: str) -> List[str]:
+        """
+        Equipment listed in session_configuration["required_equipment"], either one list
+        for every session or a dict keyed by session type.
+        """
+        config = course.session_configuration or {}
+        required = config.get('required_equipment') or []
+        if isinstance(required, dict):
+            required = required.get(session_type) or []
+        if isinstance(required, str):
+            required = [required]
+        return [str(item).strip().lower() for item in required if str(item).strip()]
+
+    def _has_equipment(self, room: Dict, item: str) -> bool:
+        if 'projector' in item and room['has_projector']:
+            return True
+        if 'computer' in item and room['has_computers']:
+            return True
+        return any(item in equipment for equipment in room['equipment'])
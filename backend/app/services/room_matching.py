@@ -0,0 +1,119 @@
+from collections import defaultdict
+from time import perf_counter
+from typing import Dict, Hashable, List, Optional, Tuple
+from ortools.sat.python import cp_model
+
+# (key, day, start, duration, candidate room ids) of a session whose time is already fixed
+RoomRequest = Tuple[Hashable, int, int, int, List[int]]
+
+
+def _block_mask(day_idx: int, start_t: int, duration: int, day_len: int) -> int:
+    return ((1 << duration) - 1) << (day_idx * day_len + start_t)
+
+
+def _match_start(requests: List[RoomRequest], room_busy: Dict[int, int], day_len: int) -> Optional[Dict]:
+    """
+    Maximum bipartite matching (augmenting paths) between sessions starting in the same
+    hour and the rooms free for their whole block. Returns key -> room, or None if some
+    session cannot be matched.
+    """
+    candidates = {}
+    for key, day_idx, start_t, duration, rooms in requests:
+        mask = _block_mask(day_idx, start_t, duration, day_len)
+        candidates[key] = [room_id for room_id in rooms if not room_busy.get(room_id, 0) & mask]
+
+    owner = {}  # room_id -> key
+
+    def augment(key, seen) -> bool:
+        for room_id in candidates[key]:
+            if room_id in seen:
+                continue
+            seen.add(room_id)
+            if room_id not in owner or augment(owner[room_id], seen):
+                owner[room_id] = key
+                return True
+        return False
+
+    # Most constrained sessions first keeps the augmenting paths short
+    for key in sorted(candidates, key=lambda k: len(candidates[k])):
+        if not augment(key, set()):
+            return None
+    return {key: room_id for room_id, key in owner.items()}
+
+
+def _solve_day(requests: List[RoomRequest], room_busy: Dict[int, int], day_len: int,
+               time_limit: float, num_workers: int) -> Optional[Dict]:
+    """Small CP-SAT model assigning rooms to one day's sessions at once"""
+    model = cp_model.CpModel()
+    choices = defaultdict(list)  # key -> [(room_id, literal)]
+    room_cover = defaultdict(list)  # (room_id, hour) -> [literal]
+    for index, (key, day_idx, start_t, duration, rooms) in enumerate(requests):
+        mask = _block_mask(day_idx, start_t, duration, day_len)
+        for room_id in rooms:
+            if room_busy.get(room_id, 0) & mask:
+                continue
+            literal = model.NewBoolVar(f'x{index}_r{room_id}')
+            choices[key].append((room_id, literal))
+            for t_idx in range(start_t, start_t + duration):
+                room_cover[room_id, t_idx].append(literal)
+        model.AddExactlyOne([literal for _, literal in choices[key]])
+    for literals in room_cover.values():
+        if len(literals) > 1:
+            model.AddAtMostOne(literals)
+
+    solver = cp_model.CpSolver()
+    solver.parameters.max_time_in_seconds = time_limit
+    solver.parameters.num_workers = num_workers
+    if solver.Solve(model) not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        return None
+    return {
+        key: next(room_id for room_id, literal in options if solver.BooleanValue(literal))
+        for key, options in choices.items()
+    }
+
+
+def assign_rooms(requests: List[RoomRequest], room_busy: Dict[int, int], day_len: int,
+                 time_limit: float, num_workers: int = 1) -> Tuple[Optional[Dict], Dict]:
+    """
+    Give every session with a fixed day and start a concrete room. Days are independent;
+    within a day, sessions are matched start hour by start hour, each hour against the
+    rooms earlier hours left free. If an hour cannot be matched, the whole day falls back
+    to a small CP-SAT model. room_busy (room_id -> occupied cells bitmap) is not modified.
+
+    Returns (key -> room_id, or None if some day has no assignment, stats).
+    """
+    started = perf_counter()
+    by_day = defaultdict(list)
+    for request in requests:
+        by_day[request[1]].append(request)
+
+    assignment = {}
+    fallback_days = []
+    for day_idx, day_requests in sorted(by_day.items()):
+        busy = dict(room_busy)
+        day_assignment = {}
+        by_start = defaultdict(list)
+        for request in day_requests:
+            by_start[request[2]].append(request)
+        for start_t in sorted(by_start):
+            matched = _match_start(by_start[start_t], busy, day_len)
+            if matched is None:
+                day_assignment = None
+                break
+            for key, _, _, duration, _ in by_start[start_t]:
+                room_id = matched[key]
+                busy[room_id] = busy.get(room_id, 0) | _block_mask(day_idx, start_t, duration, day_len)
+            day_assignment.update(matched)
+
+        if day_assignment is None:
+            fallback_days.append(day_idx)
+            day_assignment = _solve_day(day_requests, room_busy, day_len, time_limit, num_workers)
+            if day_assignment is None:
+                return None, {
+                    'seconds': round(perf_counter() - started, 3),
+                    'fallback_days': fallback_days,
+                    'failed_day': day_idx,
+                }
+        assignment.update(day_assignment)
+
+    return assignment, {'seconds': round(perf_counter() - started, 3), 'fallback_days': fallback_days}
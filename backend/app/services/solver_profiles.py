@@ -0,0 +1,104 @@
+import os
+from typing import Dict, Optional
+from ortools.sat.python import cp_model
+from ..config import settings
+
+# Named CP-SAT configurations. time_budget_seconds is for a whole run and is
+# split across levels; relative_gap_limit stops a level once its solution is
+# provably within that fraction of the optimum.
+SOLVER_PROFILES: Dict[str, Dict] = {
+    'fast_draft': {
+        'time_budget_seconds': 60,
+        'num_search_workers': 0,
+        'search_branching': 'AUTOMATIC_SEARCH',
+        'linearization_level': 0,
+        'random_seed': 0,
+        'relative_gap_limit': 0.10,
+    },
+    'standard': {
+        'time_budget_seconds': 600,
+        'num_search_workers': 0,
+        'search_branching': 'AUTOMATIC_SEARCH',
+        'linearization_level': 1,
+        'random_seed': 0,
+        'relative_gap_limit': 0.01,
+    },
+    'exhaustive': {
+        'time_budget_seconds': 3600,
+        'num_search_workers': 0,
+        'search_branching': 'PORTFOLIO_SEARCH',
+        'linearization_level': 2,
+        'random_seed': 0,
+        'relative_gap_limit': 0.0,
+    },
+}
+
+SEARCH_BRANCHING = {
+    'AUTOMATIC_SEARCH': cp_model.AUTOMATIC_SEARCH,
+    'FIXED_SEARCH': cp_model.FIXED_SEARCH,
+    'PORTFOLIO_SEARCH': cp_model.PORTFOLIO_SEARCH,
+    'LP_SEARCH': cp_model.LP_SEARCH,
+    'PSEUDO_COST_SEARCH': cp_model.PSEUDO_COST_SEARCH,
+    'PORTFOLIO_WITH_QUICK_RESTART_SEARCH': cp_model.PORTFOLIO_WITH_QUICK_RESTART_SEARCH,
+}
+
+# Never give a level less than this, however small it looks
+MIN_LEVEL_SECONDS = 5.0
+
+
+def get_solver_profile(name: Optional[str] = None, time_budget_seconds: Optional[float] = None) -> Dict:
+    """
+    Resolve a profile by name (default: settings.SOLVER_PROFILE), applying the
+    worker count and time budget overrides from settings or the request.
+    """
+    name = name or settings.SOLVER_PROFILE
+    if name not in SOLVER_PROFILES:
+        raise ValueError(f"Unknown solver profile '{name}'. Use one of: {', '.join(SOLVER_PROFILES)}")
+
+    profile = dict(SOLVER_PROFILES[name], name=name)
+    if settings.SOLVER_NUM_WORKERS:
+        profile['num_search_workers'] = settings.SOLVER_NUM_WORKERS
+    if not profile['num_search_workers']:
+        profile['num_search_workers'] = os.cpu_count() or 1
+    if time_budget_seconds:
+        profile['time_budget_seconds'] = time_budget_seconds
+    elif settings.SOLVER_TIME_BUDGET_SECONDS:
+        profile['time_budget_seconds'] = settings.SOLVER_TIME_BUDGET_SECONDS
+    return profile
+
+
+def configure_solver(solver: cp_model.CpSolver, profile: Dict, time_limit: float):
+    """Apply a resolved profile and a time limit to a CpSolver"""
+    solver.parameters.max_time_in_seconds = time_limit
+    solver.parameters.num_workers = profile['num_search_workers']
+    solver.parameters.search_branching = SEARCH_BRANCHING[profile['search_branching']]
+    solver.parameters.linearization_level = profile['linearization_level']
+    solver.parameters.random_seed = profile['random_seed']
+    solver.parameters.relative_gap_limit = profile['relative_gap_limit']
+
+
+class TimeBudget:
+    """
+    Splits a run's time budget across levels in proportion to their size.
+    Each level gets its share of whatever is left, so time an easy level does
+    not use rolls over to the levels after it.
+    """
+
+    def __init__(self, total_seconds: float):
+        self.remaining = float(total_seconds)
+        self.pending_weights: Dict[int, float] = {}  # level -> size, for levels not solved yet
+
+    def plan(self, level_weights: Dict[int, float]):
+        self.pending_weights = dict(level_weights)
+
+    def limit_for(self, level: int) -> float:
+        weight = self.pending_weights.pop(level, None)
+        total_weight = (weight or 0) + sum(self.pending_weights.values())
+        if not weight or not total_weight:
+            share = self.remaining
+        else:
+            share = self.remaining * weight / total_weight
+        return max(share, MIN_LEVEL_SECONDS)
+
+    def spend(self, seconds: float):
+        self.remaining = max(self.remaining - seconds, 0.0)
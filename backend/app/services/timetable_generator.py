@@ -1,18 +1,173 @@
 from ortools.sat.python import cp_model
 from sqlalchemy.orm import Session
-from typing import Dict, Callable, List
+from typing import Dict, Callable, List, Optional, Tuple
 from datetime import time
+from time import perf_counter
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+import os
+import random
+from array import array
+try:
+    import resource
+except ImportError:  # not available on Windows; peak memory is then not reported
+    resource = None
 from ..models import (
-    Timetable, TimetableSlot, Room, Course, Lecturer,
-    StudentGroup, GroupAssignment, LecturerAssignment,
-    RoomType, UserRole, CourseType
+    Timetable, TimetableSlot, Course, LecturerAssignment,
+    UserRole, CourseType, GroupDivisionType
 )
+from .generation_snapshot import GenerationSnapshot
+from .solver_profiles import get_solver_profile, configure_solver, TimeBudget, MIN_LEVEL_SECONDS
+from .room_eligibility import RoomEligibility
+from .lecturer_eligibility import LecturerEligibility
+from .group_hierarchy import GroupHierarchy, DIVISION_SUBGROUPS
+from .level_quotas import allocate_level_quotas, resource_pressure
+from .feasibility import precheck_sessions
+from .room_matching import assign_rooms
+from .conflict_graph import conflict_cliques
+
+# Model formulations available per run:
+# - bool_matrix: one BoolVar per (session, day, start, room, lecturer) with per-hour sums
+# - interval: one start variable per session, optional intervals and NoOverlap per resource
+# - factorized: separate start / room-choice / lecturer-choice variables per session, channeled
+# - two_phase: BoolVars per (session, day, start, lecturer) with per-hour room capacity counts,
+#   then concrete rooms by bipartite matching per hour (CP-SAT per day if matching fails)
+# - greedy: no solver; a constructive draft placing the most constrained sessions first,
+#   sessions it cannot place are listed instead of failing the level
+ENGINES = ('bool_matrix', 'interval', 'factorized', 'two_phase', 'greedy')
+
+# Level results a run keeps, in every mode; a greedy draft (INCOMPLETE) is kept with the
+# sessions it could not place listed in level_stats[level]['unplaced_sessions']
+KEPT_STATUSES = ('OPTIMAL', 'FEASIBLE', 'INCOMPLETE')
+
+# How levels are scheduled:
+# - sequential: one model per level (5 -> 4 -> 3 -> 2), each seeing what earlier levels took
+# - joint: a single model for all levels sharing rooms and lecturers
+# - departments: sequential levels, each split into per-department models solved in
+#   parallel processes, then merged with a small repair model for cross-department clashes
+# - quota: rooms, lecturer days and lecturer hours are first divided between levels, then
+#   all levels are solved in parallel processes; a level that does not fit is re-solved
+#   sequentially afterwards
+# - days: sequential levels, each solved coarse-to-fine: sessions and lecturers are first
+#   assigned to days under daily capacity, then every day is solved in a parallel process
+MODES = ('sequential', 'joint', 'departments', 'quota', 'days')
+
+# Order of the levels solved one after another (all modes but joint):
+# - difficulty: most oversubscribed level first (see resource_pressure), ties 5 -> 2
+# - fixed: 5 -> 4 -> 3 -> 2
+LEVEL_ORDERS = ('difficulty', 'fixed')
+
+# Backtracking: rooms and lecturers whose earlier-level sessions are released in the first
+# round after a level fails; every further round releases twice as many
+BACKTRACK_RESOURCES = 4
+
+# Course types whose groups may be taught together in one shared session per block
+SHARED_COURSE_TYPES = (CourseType.GENERAL, CourseType.MULTI_DEPARTMENT)
+
+# Who picks a session's lecturer:
+# - session: every session chooses among its eligible lecturers on its own
+# - course: one lecturer teaches all of a group's sessions of a course (a primary one when
+#   any qualifies); courses no lecturer can teach whole are bound per session type instead
+# - course_type: one lecturer per group, course and session type, primary lecturers preferred
+# Bound sessions carry session['binding'] and the models choose once per binding
+LECTURER_BINDINGS = ('session', 'course', 'course_type')
+
+# Best effort: a level that still does not fit is solved again with its hard constraints
+# turned into penalties (per hour), one more stage at a time until every session is placed:
+# - coverage: sessions may stay unplaced
+# - room_type: sessions may also use rooms of a type other than the course prefers
+# - lecturer_overlap: lecturers may also teach two sessions at once
+RELAXATION_STAGES = ('coverage', 'room_type', 'lecturer_overlap')
+RELAXATION_PENALTIES = {'coverage': 100, 'room_type': 5, 'lecturer_overlap': 20}
+# A best-effort answer is wanted fast: the most one relaxed solve may take
+RELAXATION_STEP_SECONDS = 20.0
+
+# Coarse-to-fine: how often an infeasible day is sent back to the day assignment
+MAX_DAY_ROUNDS = 10
+
+# Two-phase: how often phase 1 is re-solved after a day's rooms could not be assigned
+MAX_ROOM_CUTS = 5
+
+# Improvement (LNS): what a step may relax, and the most one step's re-solve may take
+LNS_NEIGHBOURHOODS = ('day', 'lecturer', 'room', 'department')
+LNS_STEP_SECONDS = 10.0
+
+
+def _peak_rss_mb():
+    """Peak resident memory of this process so far in MB, or None where it cannot be read"""
+    if resource is None:
+        return None
+    # ru_maxrss is in kilobytes on Linux
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def _solve_partition(generator: 'TimetableGenerator', sessions: List[Dict], time_limit: float,
+                     num_workers: int, quota: Dict = None) -> Tuple[Dict, Dict]:
+    """
+    Process pool entry point: solve one subproblem on a detached copy of the generator.
+    A quota from allocate_level_quotas further blocks rooms and lecturers and caps hours.
+    """
+    generator.profile = dict(generator.profile, num_search_workers=num_workers)
+    generator.placements = {}
+    if quota:
+        for unavailable, blocked in ((generator.room_eligibility.unavailable, quota['rooms']),
+                                     (generator.lecturer_eligibility.unavailable, quota['lecturers'])):
+            for resource_id, mask in blocked.items():
+                unavailable[resource_id] = unavailable.get(resource_id, 0) | mask
+        generator.lecturer_eligibility.max_hours.update(quota['max_hours'])
+    stats = generator._build_and_solve(sessions, time_limit, perf_counter())
+    return stats, generator.placements
+
 
 class TimetableGenerator:
-    def __init__(self, db: Session, timetable_id: int, progress_callback: Callable = None):
+    def __init__(self, db: Session, timetable_id: int, progress_callback: Callable = None,
+                 engine: str = 'bool_matrix', profile: str = None, time_budget_seconds: float = None,
+                 baseline_timetable_id: int = None, mode: str = 'sequential', draft_hints: bool = False,
+                 break_symmetry: bool = True, strengthen_model: bool = False, lean_model: bool = False,
+                 lecturer_binding: str = 'session', shared_sessions: bool = True,
+                 level_order: str = 'difficulty', max_backtracks: int = 2, best_effort: bool = False):
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown generation engine '{engine}'. Use one of: {', '.join(ENGINES)}")
+        if mode not in MODES:
+            raise ValueError(f"Unknown generation mode '{mode}'. Use one of: {', '.join(MODES)}")
+        if lecturer_binding not in LECTURER_BINDINGS:
+            raise ValueError(f"Unknown lecturer binding '{lecturer_binding}'. Use one of: {', '.join(LECTURER_BINDINGS)}")
+        if level_order not in LEVEL_ORDERS:
+            raise ValueError(f"Unknown level order '{level_order}'. Use one of: {', '.join(LEVEL_ORDERS)}")
+        if max_backtracks < 0:
+            raise ValueError("max_backtracks cannot be negative")
+        
         self.db = db
         self.timetable_id = timetable_id
         self.progress_callback = progress_callback
+        self.engine = engine
+        self.mode = mode
+        # Existing timetable whose slots are fed to the solver as hints (warm start)
+        self.baseline_timetable_id = baseline_timetable_id
+        # Hint the solver with a greedy draft for sessions the baseline does not cover
+        self.draft_hints = draft_hints
+        # Order interchangeable sessions and rooms so the solver does not search their permutations
+        self.break_symmetry = break_symmetry
+        # Add clique cuts and redundant aggregates to the per-hour boolean models. They help
+        # prove a level infeasible but slow down finding solutions, so they are opt-in
+        self.strengthen_model = strengthen_model
+        # bool_matrix: unnamed variables with compact array keys, for levels too big for memory
+        self.lean_model = lean_model
+        # Whether a lecturer is chosen per session or once per course (and session type)
+        self.lecturer_binding = lecturer_binding
+        # Teach full-group GENERAL / MULTI_DEPARTMENT courses to all their groups at once
+        self.shared_sessions = shared_sessions
+        # Which level goes first, and how many rounds of releasing earlier levels' sessions
+        # a level that does not fit gets before the run fails
+        self.level_order = level_order
+        self.max_backtracks = max_backtracks
+        # Relax a level that cannot be placed (RELAXATION_STAGES) instead of failing the run;
+        # what had to give is listed in run_stats['best_effort']
+        self.best_effort = best_effort
+        
+        # Solver configuration and the run's time budget, split across levels
+        self.profile = get_solver_profile(profile, time_budget_seconds)
+        self.time_budget = TimeBudget(self.profile['time_budget_seconds'])
         
         # Time slots configuration (07:00 - 19:00, 1-hour slots)
         self.days = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday']
@@ -22,6 +177,19 @@ class TimetableGenerator:
         ]
         
         self.all_slots = []  # Will store all generated slots
+        self.placements = {}  # (course_id, group_id, s_id) -> (day, start, room_id, lecturer_id) of placed sessions
+        self.level_stats = {}  # level -> build/solve statistics, stored in generation_metadata
+        self.run_stats = {}  # whole-run statistics (data loading), stored in generation_metadata
+        self.snapshot = None  # GenerationSnapshot, loaded once on first use
+        self.room_eligibility = None  # RoomEligibility, built from the snapshot
+        self.lecturer_eligibility = None  # LecturerEligibility, built from the snapshot
+        self.group_hierarchy = None  # GroupHierarchy, built from the snapshot
+    
+    def __getstate__(self):
+        # Copies sent to worker processes carry only what model building needs
+        state = dict(self.__dict__)
+        state.update(db=None, progress_callback=None, snapshot=None)
+        return state
     
     def send_progress(self, level: int, status: str, percentage: float, message: str):
         """Send progress update via callback"""
@@ -34,10 +202,31 @@ class TimetableGenerator:
             })
     
     def generate_timetable(self) -> bool:
-        """Generate timetable level by level: 5th -> 4th -> 3rd -> 2nd"""
+        """
+        Generate timetable level by level, hardest first by default (or all at once in joint
+        mode). A level that fails is retried by _backtrack_level, then with best_effort
+        by _solve_relaxed, before the run gives up.
+        """
         levels = [5, 4, 3, 2]
         total_levels = len(levels)
         
+        self._load_snapshot()
+        if self.mode != 'joint' and self.level_order == 'difficulty':
+            levels = self._order_levels(levels)
+        self.time_budget.plan({level: self._estimate_level_size(level) for level in levels})
+        
+        if self.mode == 'joint':
+            if not self.generate_joint_timetable(levels) and not (
+                self.best_effort and self._solve_relaxed(0, 'all', 'all levels', self._courses_of(levels), 0)
+            ):
+                self.send_progress(0, 'failed', 0, 'Failed to generate a joint timetable for all levels')
+                self._record_run_totals()
+                return False
+            levels = []
+        elif self.mode == 'quota':
+            levels = self.generate_levels_in_parallel(levels)
+            self.time_budget.plan({level: self._estimate_level_size(level) for level in levels})
+        
         for idx, level in enumerate(levels):
             level_percentage_start = (idx / total_levels) * 100
             level_percentage_end = ((idx + 1) / total_levels) * 100
@@ -50,7 +239,15 @@ class TimetableGenerator:
             )
             
             # Generate timetable for this level
+            fixed_count = len(self.all_slots)
             success = self.generate_level_timetable(level, level_percentage_start, level_percentage_end)
+            if not success and self.max_backtracks:
+                del self.all_slots[fixed_count:]
+                success = self._backtrack_level(level, level_percentage_start)
+            if not success and self.best_effort:
+                del self.all_slots[fixed_count:]
+                success = self._solve_relaxed(level, str(level), f'Level {level}', self._courses_of([level]),
+                                              level_percentage_start)
             
             if not success:
                 self.send_progress(
@@ -59,6 +256,7 @@ class TimetableGenerator:
                     percentage=level_percentage_start,
                     message=f'Failed to generate timetable for Level {level}'
                 )
+                self._record_run_totals()
                 return False
             
             self.send_progress(
@@ -68,6 +266,8 @@ class TimetableGenerator:
                 message=f'Level {level} timetable completed successfully'
             )
         
+        self._record_run_totals()
+        
         # Save all slots to database
         self.send_progress(
             level=0,
@@ -78,11 +278,15 @@ class TimetableGenerator:
         
         self.save_timetable()
         
+        best_effort = self.run_stats.get('best_effort')
         self.send_progress(
             level=0,
             status='completed',
             percentage=100,
-            message='Timetable generation completed successfully!'
+            message=(
+                f"Best-effort timetable saved: {len(best_effort['unplaced_sessions'])} unplaced and "
+                f"{len(best_effort['violations'])} violating sessions to fix by hand"
+            ) if best_effort else 'Timetable generation completed successfully!'
         )
         
         return True
@@ -145,311 +349,2757 @@ class TimetableGenerator:
             
         return sessions
 
-    def _get_compatible_rooms(self, course: Course, session_type: str, all_rooms: List[Room]) -> List[Room]:
-        """Filter rooms based on course preferences and capability"""
-        compatible_rooms = []
-        
-        for room in all_rooms:
-            # 1. Check Department Affinity
-            if room.department_affinity:
-                # If room has affinity, course must match.
-                # Assuming department mapping or just checking if course.department.code matches
-                # simplified: if affinity is string, check if it is part of display code or dept name
-                # For now, strict check if available, or skip generic rooms
-                pass 
-                # Refined logic: If affinity is set, room is restricted.
-                # But we don't have easy link to Dept Code here without extra queries.
-                # Let's rely on room_type for now mostly.
-            
-            # 2. Check Room Type/Category
-            # Map Course Preferred Room Type to Room Type
-            # Course.preferred_room_type is enum RoomType (lecture_hall, lab, etc)
-            # Room.room_type is string (legacy) or room_category (new Enum)
-            
-            if course.preferred_room_type == RoomType.ANY:
-                # Allow any room that fits capacity (maybe)
-                # But prefer Lecture Halls for Lectures
-                if session_type == 'lecture' and 'lecture' in str(room.room_type).lower():
-                    compatible_rooms.append(room)
-                elif session_type == 'practical' and 'lab' in str(room.room_type).lower():
-                    compatible_rooms.append(room)
-                else:
-                    compatible_rooms.append(room)
+    def _order_levels(self, levels: List[int]) -> List[int]:
+        """
+        Levels sorted by difficulty, the highest resource_pressure of any room or lecturer
+        their sessions may use, hardest first: a tight level is better off choosing before
+        the others take its rooms and lecturers. Ties keep the given order.
+        """
+        rooms_busy, lecturers_busy, _ = self._blocked_resources()
+        remaining_hours = self._remaining_lecturer_hours()
+        num_cells = len(self.days) * len(self.time_slots)
+        difficulty = {}
+        for level in levels:
+            sessions = []
+            if self.snapshot.groups_by_level.get(level):
+                sessions = self._collect_level_sessions(self.snapshot.courses_by_level.get(level, []))
+            pressure = resource_pressure(sessions, rooms_busy, lecturers_busy, remaining_hours, num_cells)
+            difficulty[level] = max(pressure.values(), default=0.0)
+        ordered = sorted(levels, key=lambda level: -difficulty[level])
+        self.run_stats['level_order'] = {
+            'order': ordered,
+            'difficulty': {str(level): round(value, 3) for level, value in difficulty.items()},
+        }
+        return ordered
+
+    def _backtrack_level(self, level: int, progress_start: float) -> bool:
+        """
+        Fixed-slot relaxation after a level failed: release the sessions earlier levels
+        placed on the rooms and lecturers the level is most oversubscribed on (see
+        resource_pressure), and re-solve them together with the level, hinted at where they
+        were. Each round doubles the released resources, up to max_backtracks rounds; a
+        round whose sessions fail the feasibility precheck is skipped without solving.
+        Returns whether the level was placed; otherwise all_slots is left as it was.
+        Rounds are recorded in level_stats[level]['backtracking']; when one succeeds, its
+        statistics replace the level's, with the failed attempt's under 'failed_attempt'.
+        """
+        courses = self.snapshot.courses_by_level.get(level, [])
+        course_by_id = {course.id: course for level_courses in self.snapshot.courses_by_level.values() for course in level_courses}
+        saved_slots, saved_placements = list(self.all_slots), dict(self.placements)
+        
+        # Candidates as if nothing were placed, so lecturers whose hours earlier levels
+        # used up still count against the level
+        self.all_slots = []
+        level_sessions = self._collect_level_sessions(courses)
+        self.all_slots = list(saved_slots)
+        rooms_busy, lecturers_busy, _ = self._blocked_resources()
+        pressure = resource_pressure(
+            level_sessions, rooms_busy, lecturers_busy,
+            self._remaining_lecturer_hours(), len(self.days) * len(self.time_slots)
+        )
+        # Only resources earlier levels hold can be freed
+        held = {('room', slot['room_id']) for slot in saved_slots} | {('lecturer', slot['lecturer_id']) for slot in saved_slots}
+        tightest = sorted((resource for resource in pressure if resource in held), key=lambda r: (-pressure[r], r))
+        
+        rounds = []
+        self.level_stats.setdefault(str(level), {})['backtracking'] = rounds
+        for round_idx in range(self.max_backtracks):
+            resources = set(tightest[:BACKTRACK_RESOURCES << round_idx])
+            if not resources or (rounds and len(resources) == rounds[-1]['resources']):
+                break
+            started = perf_counter()
+            released = self._with_shared_pairs({
+                (slot['course_id'], slot['group_id']) for slot in saved_slots
+                if ('room', slot['room_id']) in resources or ('lecturer', slot['lecturer_id']) in resources
+            })
+            self.all_slots = [slot for slot in saved_slots if (slot['course_id'], slot['group_id']) not in released]
+            self.placements = dict(saved_placements)
+            
+            released_courses = [course_by_id[course_id] for course_id in sorted({course_id for course_id, _ in released})]
+            skipped = []
+            moved = [
+                session for session in self._collect_level_sessions(released_courses, skipped)
+                if (session['course_id'], session['group_id']) in released
+            ]
+            skipped = [session for session in skipped if (session['course_id'], session['group_id']) in released]
+            for session in moved:
+                placement = saved_placements.get((session['course_id'], session['group_id'], session['s_id']))
+                if placement is not None:
+                    day_idx, start_t, room_id, lecturer_id = placement
+                    session['hint'] = (
+                        day_idx, start_t,
+                        room_id if room_id in session['rooms'] else None,
+                        lecturer_id if lecturer_id in session['lecturers'] else None,
+                    )
+            window = self._collect_level_sessions(courses, skipped) + moved
+            rooms_busy, lecturers_busy, groups_busy = self._blocked_resources()
+            problems, _ = precheck_sessions(window, rooms_busy, lecturers_busy, groups_busy,
+                                            self._remaining_lecturer_hours(), len(self.days), len(self.time_slots),
+                                            skipped)
+            if problems:
+                # Releasing these resources cannot be enough: try the next, wider round
+                self.time_budget.spend(perf_counter() - started)
+                rounds.append({'resources': len(resources), 'released_pairs': len(released),
+                               'released_sessions': len(moved), 'precheck_problems': len(problems),
+                               'wall_seconds': round(perf_counter() - started, 3), 'status': 'INFEASIBLE'})
                 continue
+            
+            self.send_progress(level, 'solving', progress_start + 50,
+                               f'Level {level} did not fit; re-solving it with {len(moved)} sessions of earlier levels (round {round_idx + 1})...')
+            self.time_budget.pending_weights[level] = sum(session['duration'] for session in window)
+            time_limit = max(self.time_budget.limit_for(level) / (self.max_backtracks - round_idx), MIN_LEVEL_SECONDS)
+            stats = self._build_and_solve(window, time_limit, started, level, f'Level {level}', progress_start)
+            self.time_budget.spend(perf_counter() - started)
+            rounds.append({
+                'resources': len(resources),
+                'released_pairs': len(released),
+                'released_sessions': len(moved),
+                'released_levels': sorted({course_by_id[course_id].level for course_id, _ in released}),
+                'variables': stats.get('variables'),
+                'solve_seconds': stats['solve_seconds'],
+                'wall_seconds': round(perf_counter() - started, 3),
+                'status': stats['status'],
+            })
+            if stats['status'] in ('OPTIMAL', 'FEASIBLE') and not stats.get('unplaced_sessions'):
+                # The level's stats are now the successful round's; the first attempt is kept apart
+                failed_attempt = {key: value for key, value in self.level_stats[str(level)].items() if key != 'backtracking'}
+                self.level_stats[str(level)] = dict(stats, backtracking=rounds, failed_attempt=failed_attempt)
+                return True
+        
+        self.all_slots, self.placements = saved_slots, saved_placements
+        return False
 
-            # Strict matching if preference is set
-            pref = course.preferred_room_type
-            
-            # Map Enum to string checks
-            if pref == RoomType.LECTURE_HALL:
-                if 'lecture' in str(room.room_type).lower() or 'class' in str(room.room_type).lower():
-                    compatible_rooms.append(room)
-            elif pref == RoomType.LAB:
-                if 'lab' in str(room.room_type).lower():
-                    compatible_rooms.append(room)
-            elif pref == RoomType.DRAWING_ROOM:
-                if 'drawing' in str(room.room_type).lower():
-                    compatible_rooms.append(room)
-            else:
-                # Default loose match
-                compatible_rooms.append(room)
-                
-        return compatible_rooms
+    def _solve_relaxed(self, level: int, stats_key: str, label: str, courses: List[Course],
+                       progress_start: float) -> bool:
+        """
+        Relaxation ladder for sessions that cannot all be placed: solve them in the
+        bool_matrix model with the first RELAXATION_STAGES turned into penalties, one more
+        stage per step, until a step places every session. The step placing the most hours
+        is kept. Returns False only if no step found a solution at all. The steps, and the
+        unplaced and violating sessions of the one kept, go to level_stats[stats_key]['relaxation'];
+        those sessions are also added to run_stats['best_effort'].
+        Skipped sessions (see _collect_level_sessions) are not lost: those without an
+        eligible room join the model, where the room_type stage may give them a room of
+        another type; those without a lecturer are listed as unplaced whatever the step.
+        """
+        fixed_count, saved_placements = len(self.all_slots), dict(self.placements)
+        course_by_id = {course.id: course for course in courses}
+        skipped = []
+        sessions = self._collect_level_sessions(courses, skipped)
+        sessions += [session for session in skipped if session['reason'] == 'no_room']
+        unplaceable = [session for session in skipped if session['reason'] != 'no_room']
+        for session in sessions:
+            group_size = sum(self.snapshot.group_sizes.get(group_id, 0) for group_id in self._session_groups(session))
+            session['other_rooms'] = self.room_eligibility.other_type_rooms(
+                course_by_id[session['course_id']], session['type'], group_size
+            )
+        # What the greedy draft places is a solution of every step: start from it
+        placements, _ = self._greedy_placements(sessions)
+        for session in sessions:
+            session['hint'] = placements.get((session['course_id'], session['group_id'], session['s_id']))
+        
+        steps, best = [], None
+        for stage_idx, stage in enumerate(RELAXATION_STAGES):
+            started = perf_counter()
+            del self.all_slots[fixed_count:]
+            self.placements = dict(saved_placements)
+            self.send_progress(level, 'solving', progress_start + 50,
+                               f'{label} does not fit; placing what it can with {stage.replace("_", " ")} relaxed...')
+            self.time_budget.pending_weights[level] = sum(session['duration'] for session in sessions)
+            time_limit = max(min(self.time_budget.limit_for(level) / (len(RELAXATION_STAGES) - stage_idx),
+                                 RELAXATION_STEP_SECONDS), MIN_LEVEL_SECONDS)
+            stats = self._build_and_solve(sessions, time_limit, started, level, label, progress_start,
+                                          relax=RELAXATION_STAGES[:stage_idx + 1])
+            self.time_budget.spend(perf_counter() - started)
+            step = {'stage': stage, 'status': stats['status'], 'variables': stats['variables'],
+                    'solve_seconds': stats['solve_seconds']}
+            steps.append(step)
+            if stats['status'] not in ('OPTIMAL', 'FEASIBLE'): continue
+            
+            report = self._relaxation_report(sessions + unplaceable)
+            step.update({'unplaced': len(report['unplaced_sessions']), 'violations': len(report['violations'])})
+            unplaced_hours = sum(entry['duration'] for entry in report['unplaced_sessions'])
+            if best is None or unplaced_hours < best[0]:
+                best = (unplaced_hours, stage, report, self.all_slots[fixed_count:], dict(self.placements))
+            if not unplaced_hours: break
+        
+        del self.all_slots[fixed_count:]
+        self.placements = saved_placements
+        relaxation = {'steps': steps}
+        self.level_stats.setdefault(stats_key, {})['relaxation'] = relaxation
+        if best is None:
+            return False
+        
+        _, stage, report, slots, self.placements = best
+        self.all_slots.extend(slots)
+        relaxation.update({'stage': stage, **report})
+        self.level_stats[stats_key]['status'] = 'RELAXED'
+        totals = self.run_stats.setdefault('best_effort', {'unplaced_sessions': [], 'violations': []})
+        for kind, entries in report.items():
+            totals[kind].extend(dict(entry, level=level) for entry in entries)
+        return True
+
+    def _relaxation_report(self, sessions: List[Dict]) -> Dict[str, List[Dict]]:
+        """
+        What a relaxed solve gave up for the sessions: those left unplaced, and the placed
+        ones in a room of another type or teaching at an hour their lecturer teaches
+        something else (at any level)
+        """
+        # A shared session has a slot per group but is taught once: count distinct rooms
+        teaching = defaultdict(set)  # (lecturer_id, day, hour) -> (course_id, room_id) taught then
+        for slot in self.all_slots:
+            teaching[slot['lecturer_id'], slot['day_of_week'], self._time_to_idx(slot['start_time'])].add(
+                (slot['course_id'], slot['room_id'])
+            )
+        report = {'unplaced_sessions': [], 'violations': []}
+        for session in sessions:
+            key = (session['course_id'], session['group_id'], session['s_id'])
+            entry = {'course_id': key[0], 'group_id': key[1], 's_id': key[2],
+                     'type': session['type'], 'duration': session['duration']}
+            if 'reason' in session:
+                # Skipped by _collect_level_sessions: why it had no candidates
+                entry['reason'] = session['reason']
+            if key not in self.placements:
+                report['unplaced_sessions'].append(entry)
+                continue
+            day_idx, start_t, room_id, lecturer_id = self.placements[key]
+            placed = dict(entry, day=day_idx, start=start_t, room_id=room_id, lecturer_id=lecturer_id)
+            if room_id not in session['rooms']:
+                report['violations'].append(dict(placed, kind='room_type'))
+            if any(len(teaching[lecturer_id, day_idx, t_idx]) > 1
+                   for t_idx in range(start_t, start_t + session['duration'])):
+                report['violations'].append(dict(placed, kind='lecturer_overlap'))
+        return report
 
     def generate_level_timetable(self, level: int, progress_start: float, progress_end: float) -> bool:
         """Generate timetable for a specific level using CP-SAT solver"""
         
-        # 1. Fetch Data
-        courses = self.db.query(Course).filter(Course.level == level).all()
+        # 1. Fetch Data (loaded once per run, shared by every level)
+        self._load_snapshot()
+        
+        courses = self.snapshot.courses_by_level.get(level, [])
         if not courses: return True
         
-        groups = self.db.query(StudentGroup).filter(StudentGroup.level == level).all()
+        groups = self.snapshot.groups_by_level.get(level, [])
         if not groups: return True
         
-        all_rooms = self.db.query(Room).all()
-        
         self.send_progress(level, 'building', progress_start + 10, f'Preparing constraints for {len(courses)} courses...')
         
+        build_started = perf_counter()
+        skipped = []
+        level_sessions = self._collect_level_sessions(courses, skipped)
+        if not self._precheck(level, str(level), f'Level {level}', level_sessions, progress_start, build_started, skipped):
+            return False
+        if self.mode == 'departments':
+            success = self._solve_by_department(level, courses, level_sessions, progress_start, build_started)
+        elif self.mode == 'days':
+            success = self._solve_by_day(level, level_sessions, progress_start, build_started)
+        else:
+            success = self._solve_sessions(level, str(level), f'Level {level}', level_sessions, progress_start, build_started)
+        if success and skipped:
+            self._flag_skipped(str(level), skipped)
+        return success
+
+    def generate_joint_timetable(self, levels: List[int]) -> bool:
+        """
+        Schedule every level in one CP-SAT model, so no level is limited to the rooms
+        and lecturers an earlier level left over. Statistics go to level_stats['all'].
+        """
+        self._load_snapshot()
+        self.send_progress(0, 'building', 10, f'Preparing constraints for levels {", ".join(map(str, levels))}...')
+        
+        build_started = perf_counter()
+        skipped = []
+        sessions = self._collect_level_sessions(self._courses_of(levels), skipped)
+        if not self._precheck(0, 'all', 'all levels', sessions, 0, build_started, skipped):
+            return False
+        success = self._solve_sessions(0, 'all', 'all levels', sessions, 0, build_started)
+        if success and skipped:
+            self._flag_skipped('all', skipped)
+        return success
+
+    def _courses_of(self, levels: List[int]) -> List[Course]:
+        """Courses of the given levels, skipping levels without groups"""
+        return [
+            course for level in levels if self.snapshot.groups_by_level.get(level)
+            for course in self.snapshot.courses_by_level.get(level, [])
+        ]
+
+    def _solve_by_department(self, level: int, courses: List[Course], level_sessions: List[Dict],
+                             progress_start: float, build_started: float) -> bool:
+        """
+        Split a level into one subproblem per department (shared GENERAL / MULTI_DEPARTMENT
+        courses form their own), solve them in parallel processes against the slots already
+        fixed, then keep every non-clashing placement and re-solve the clashing sessions in
+        one small model. Falls back to the whole level in one model if that repair fails.
+        """
+        department_of = {
+            course.id: course.department_id if course.course_type == CourseType.DEPARTMENT_SPECIFIC else None
+            for course in courses
+        }
+        partitions = defaultdict(list)
+        for session in level_sessions:
+            partitions[department_of[session['course_id']]].append(session)
+        if len(partitions) < 2:
+            return self._solve_sessions(level, str(level), f'Level {level}', level_sessions, progress_start, build_started)
+        
+        hinted = self._attach_hints(level_sessions)
+        time_limit = self.time_budget.limit_for(level)
+        collect_seconds = perf_counter() - build_started
+        
+        # Largest subproblems first, so they also win clashes in the merge
+        keys = sorted(partitions, key=lambda key: -len(partitions[key]))
+        processes = min(len(keys), os.cpu_count() or 1)
+        num_workers = max(self.profile['num_search_workers'] // processes, 1)
+        
+        self.send_progress(level, 'solving', progress_start + 30,
+                           f'Solving {len(keys)} department subproblems for Level {level} in parallel...')
+        parallel_started = perf_counter()
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            futures = {key: pool.submit(_solve_partition, self, partitions[key], time_limit, num_workers) for key in keys}
+            results = {key: future.result() for key, future in futures.items()}
+        parallel_seconds = perf_counter() - parallel_started
+        
+        # Merge: accept placements in partition order while they fit, repair the rest
+        rooms_busy, lecturers_busy, groups_busy = self._blocked_resources()
+        remaining_hours = self._remaining_lecturer_hours()
+        accepted, clashing = [], []
+        for key in keys:
+            _, placements = results[key]
+            for session in partitions[key]:
+                placement = placements.get((session['course_id'], session['group_id'], session['s_id']))
+                if placement is None:
+                    clashing.append(session)
+                    continue
+                day_idx, start_t, room_id, lecturer_id = placement
+                mask = self._block_mask(day_idx, start_t, session['duration'])
+                if (rooms_busy[room_id] & mask or lecturers_busy[lecturer_id] & mask
+                        or self._groups_mask(groups_busy, session) & mask
+                        or remaining_hours.get(lecturer_id, session['duration']) < session['duration']):
+                    clashing.append(session)
+                    continue
+                rooms_busy[room_id] |= mask
+                lecturers_busy[lecturer_id] |= mask
+                for group_id in self._family_groups(session):
+                    groups_busy[group_id] |= mask
+                if lecturer_id in remaining_hours:
+                    remaining_hours[lecturer_id] -= session['duration']
+                accepted.append((session, placement))
+        
+        fixed_count = len(self.all_slots)
+        for session, placement in accepted:
+            self._append_session_slots(session, *placement)
+        
+        repair_stats = None
+        if clashing:
+            self.send_progress(level, 'solving', progress_start + 70,
+                               f'Repairing {len(clashing)} clashing sessions for Level {level}...')
+            repair_limit = max(time_limit - (perf_counter() - parallel_started), MIN_LEVEL_SECONDS)
+            repair_stats = self._build_and_solve(clashing, repair_limit, perf_counter())
+        
+        fallback_stats = None
+        if repair_stats and repair_stats['status'] not in KEPT_STATUSES:
+            # The clashes could not be repaired around the merged placements; solve the level whole
+            del self.all_slots[fixed_count:]
+            fallback_limit = max(time_limit - (perf_counter() - parallel_started), MIN_LEVEL_SECONDS)
+            fallback_stats = self._build_and_solve(level_sessions, fallback_limit, perf_counter(),
+                                                   level, f'Level {level}', progress_start)
+        
+        solve_seconds = perf_counter() - parallel_started
+        self.time_budget.spend(collect_seconds + solve_seconds)
+        final_stats = fallback_stats or repair_stats
+        status = final_stats['status'] if final_stats else 'FEASIBLE'
+        partition_stats = {str(key if key is not None else 'shared'): results[key][0] for key in keys}
+        self.level_stats[str(level)] = {
+            'engine': self.engine,
+            'profile': self.profile['name'],
+            'mode': self.mode,
+            'sessions': len(level_sessions),
+            'hinted_sessions': hinted,
+            'variables': sum(s['variables'] for s in partition_stats.values()),
+            'constraints': sum(s['constraints'] for s in partition_stats.values()),
+            'build_seconds': round(collect_seconds, 3),
+            'time_limit_seconds': round(time_limit, 1),
+            'solve_seconds': round(solve_seconds, 3),
+            'parallel_seconds': round(parallel_seconds, 3),
+            'processes': processes,
+            'partitions': partition_stats,
+            'clashing_sessions': len(clashing),
+            'repair': repair_stats,
+            'fallback': fallback_stats,
+            'status': status,
+            'unplaced_sessions': (final_stats or {}).get('unplaced_sessions', []),
+        }
+        return status in KEPT_STATUSES
+
+    def _solve_by_day(self, level: int, level_sessions: List[Dict], progress_start: float,
+                      build_started: float) -> bool:
+        """
+        Coarse-to-fine: _assign_days puts every session (with its lecturer) on a day, then
+        each day's start times and rooms are solved as independent subproblems in parallel
+        processes. Days that solve are kept; the sessions of an infeasible day go back to
+        the day assignment, with the part of the day that failed forbidden as a no-good and
+        its group or lecturer (the whole level, if no smaller part failed) held to fewer hours
+        on that day. The day assignment spreads each group's and lecturer's hours over the week.
+        After MAX_DAY_ROUNDS the sessions left are solved in one model (the whole level if
+        even that fails).
+        """
+        hinted = self._attach_hints(level_sessions)
+        time_limit = self.time_budget.limit_for(level)
+        collect_seconds = perf_counter() - build_started
+        started = perf_counter()
+        fixed_count = len(self.all_slots)
+        
+        meta = {(s['course_id'], s['group_id'], s['s_id']): s for s in level_sessions}
+        pending = level_sessions
+        no_goods = []
+        rounds = []
+        day_stats = []
+        processes = min(len(self.days), os.cpu_count() or 1)
+        num_workers = max(self.profile['num_search_workers'] // processes, 1)
+        
+        while pending and len(rounds) < MAX_DAY_ROUNDS:
+            remaining = time_limit - (perf_counter() - started)
+            if remaining <= 0:
+                break
+            self.send_progress(level, 'solving', progress_start + 30,
+                               f'Assigning {len(pending)} Level {level} sessions to days (round {len(rounds) + 1})...')
+            day_of, assign_stats = self._assign_days(pending, no_goods, max(remaining / 4, 1.0))
+            rounds.append({'sessions': len(pending), 'days': assign_stats})
+            if day_of is None:
+                break
+            
+            by_day = defaultdict(list)
+            for key, (day_idx, lecturer_id) in day_of.items():
+                by_day[day_idx].append((key, lecturer_id))
+            
+            self.send_progress(level, 'solving', progress_start + 50,
+                               f'Solving {len(by_day)} days of Level {level} in parallel...')
+            day_limit = max(time_limit - (perf_counter() - started), MIN_LEVEL_SECONDS)
+            with ProcessPoolExecutor(max_workers=min(processes, len(by_day))) as pool:
+                futures = {
+                    day_idx: pool.submit(
+                        _solve_partition, self,
+                        [dict(meta[key], days=[day_idx], lecturers=[lecturer_id]) for key, lecturer_id in assigned],
+                        day_limit, num_workers
+                    )
+                    for day_idx, assigned in by_day.items()
+                }
+                results = {day_idx: future.result() for day_idx, future in futures.items()}
+            
+            failed, unplaced = [], []
+            for day_idx in sorted(by_day):
+                stats, placements = results[day_idx]
+                day_stats.append(stats)
+                if stats['status'] in KEPT_STATUSES:
+                    # A greedy day keeps what it placed; the rest goes back to the day assignment
+                    for key, _ in by_day[day_idx]:
+                        if key in placements:
+                            self._append_session_slots(meta[key], *placements[key])
+                        else:
+                            unplaced.append(key)
+                else:
+                    failed.append(day_idx)
+            rounds[-1]['failed_days'] = failed
+            
+            # The (session, lecturer) pairs that made a day infeasible may not recur on that day
+            for day_idx in failed:
+                no_goods.append((day_idx, *self._day_conflict(day_idx, by_day[day_idx], meta)))
+            pending = [meta[key] for day_idx in failed for key, _ in by_day[day_idx]] + [meta[key] for key in unplaced]
+        
+        # The day assignment only relaxes the level, so without no-goods in play its
+        # infeasibility proves the level infeasible
+        proven_infeasible = (
+            len(rounds) == 1 and not no_goods and rounds[0]['days']['status'] == 'INFEASIBLE'
+        )
+        # ...though a greedy draft still places what it can, as in the other modes
+        if self.engine == 'greedy':
+            proven_infeasible = False
+        fallback_stats = None
+        if pending and not proven_infeasible:
+            remaining = max(time_limit - (perf_counter() - started), MIN_LEVEL_SECONDS)
+            fallback_stats = self._build_and_solve(pending, remaining, perf_counter(), level, f'Level {level}', progress_start)
+            if fallback_stats['status'] not in KEPT_STATUSES and len(pending) < len(level_sessions):
+                # The kept days leave no room for the rest; solve the level whole
+                del self.all_slots[fixed_count:]
+                remaining = max(time_limit - (perf_counter() - started), MIN_LEVEL_SECONDS)
+                fallback_stats = self._build_and_solve(level_sessions, remaining, perf_counter(),
+                                                       level, f'Level {level}', progress_start)
+        
+        solve_seconds = perf_counter() - started
+        self.time_budget.spend(collect_seconds + solve_seconds)
+        if proven_infeasible:
+            status = 'INFEASIBLE'
+        else:
+            status = fallback_stats['status'] if fallback_stats else 'FEASIBLE'
+        self.level_stats[str(level)] = {
+            'engine': self.engine,
+            'profile': self.profile['name'],
+            'mode': self.mode,
+            'sessions': len(level_sessions),
+            'hinted_sessions': hinted,
+            'variables': max((s['variables'] for s in day_stats), default=0),
+            'constraints': max((s['constraints'] for s in day_stats), default=0),
+            'build_seconds': round(collect_seconds, 3),
+            'time_limit_seconds': round(time_limit, 1),
+            'solve_seconds': round(solve_seconds, 3),
+            'rounds': rounds,
+            'day_models_solved': len(day_stats),
+            'fallback': fallback_stats,
+            'status': status,
+            'unplaced_sessions': (fallback_stats or {}).get('unplaced_sessions', []),
+        }
+        return status in KEPT_STATUSES
+
+    def _day_conflict(self, day_idx: int, assigned: List[Tuple], meta: Dict) -> Tuple[Optional[Tuple], List[Tuple]]:
+        """
+        Smallest infeasible part of a failed day that is cheap to find: the sessions of one
+        group or of one lecturer, solved on their own; the whole day if each part fits.
+        Returns (('group' | 'lecturer', id), or None for the whole day, and the part).
+        """
+        parts = defaultdict(list)
+        for key, lecturer_id in assigned:
+            for group_id in self._covered_groups(meta[key]):
+                parts[('group', group_id)].append((key, lecturer_id))
+            parts[('lecturer', lecturer_id)].append((key, lecturer_id))
+        fixed_count = len(self.all_slots)
+        for resource, part in sorted(parts.items(), key=lambda item: len(item[1])):
+            if len(part) == len(assigned):
+                continue
+            sessions = [dict(meta[key], days=[day_idx], lecturers=[lecturer_id]) for key, lecturer_id in part]
+            stats = self._build_and_solve(sessions, MIN_LEVEL_SECONDS, perf_counter())
+            del self.all_slots[fixed_count:]
+            if stats['status'] == 'INFEASIBLE':
+                return resource, part
+        return None, assigned
+
+    def _assign_days(self, level_sessions: List[Dict], no_goods: List[Tuple[int, Optional[Tuple], List[Tuple]]],
+                     time_limit: float):
+        """
+        Stage one of coarse-to-fine solving: one BoolVar per (session, day, lecturer) with
+        daily capacity for every group and lecturer, Hall-type daily capacity for every set
+        of eligible rooms, the weekly hour caps and the no-goods of earlier rounds. Bound
+        sessions all take their binding's one chosen lecturer. Besides broken preferred
+        days, it minimizes the hours of every group's and lecturer's busiest day, so the
+        sessions are spread over the week instead of filling some days to capacity.
+        Returns ({session key: (day, lecturer_id)} or None, stats).
+        """
+        started = perf_counter()
+        dropped = []
+        level_sessions = self._narrow_bound_lecturers(level_sessions, dropped)
+        if dropped:
+            # A session left without a lecturer fits on no day at all
+            return None, {'variables': 0, 'seconds': round(perf_counter() - started, 3), 'status': 'INFEASIBLE'}
         model = cp_model.CpModel()
+        day_len = len(self.time_slots)
+        room_busy, lecturer_busy, group_busy = self._blocked_resources()
         
-        # 2. Variables
-        # Key: (course_id, group_id, session_idx, day, start_time, room_id, lecturer_id) -> BoolVar
-        # To reduce size, we will only create valid variables
+        def free_runs(busy: int, day_idx: int) -> List[int]:
+            """Lengths of the free stretches of a resource's day"""
+            runs, length = [], 0
+            for t_idx in range(day_len):
+                if busy >> self._cell(day_idx, t_idx) & 1:
+                    if length: runs.append(length)
+                    length = 0
+                else:
+                    length += 1
+            if length: runs.append(length)
+            return runs
         
-        vars_store = {} # Key -> BoolVar
-        course_sessions = {} # course_id -> list of session dicts
+        choices = {}  # (session key, day, lecturer_id) -> BoolVar
+        session_vars = defaultdict(list)
+        group_load = defaultdict(list)      # (group_id, day) -> [(var, hours)]
+        lecturer_day_load = defaultdict(list)  # (lecturer_id, day) -> [(var, hours)]
+        room_set_load = defaultdict(list)   # (frozenset of rooms, day) -> [(var, hours)]
+        lecturer_load = defaultdict(list)
+        level_day_load = defaultdict(list)  # day -> [(var, hours)]
+        objective_terms = []
         
-        # Pre-process sessions
-        for course in courses:
-            course_sessions[course.id] = self._parse_course_sessions(course)
+        room_sets = {frozenset(session['rooms']) for session in level_sessions}
+        for session in level_sessions:
+            key = (session['course_id'], session['group_id'], session['s_id'])
+            duration = session['duration']
+            containing = [room_set for room_set in room_sets if frozenset(session['rooms']) <= room_set]
+            for day_idx in self._session_days(session):
+                starts = [
+                    self._block_mask(day_idx, start_t, duration) for start_t in range(day_len - duration + 1)
+                ]
+                starts = [
+                    block for block in starts
+                    if not self._groups_mask(group_busy, session) & block
+                    and any(not room_busy.get(room_id, 0) & block for room_id in session['rooms'])
+                ]
+                for lecturer_id in session['lecturers']:
+                    if all(lecturer_busy.get(lecturer_id, 0) & block for block in starts):
+                        continue
+                    var = model.NewBoolVar(f'c{key[0]}_g{key[1]}_s{key[2]}_d{day_idx}_l{lecturer_id}')
+                    choices[(key, day_idx, lecturer_id)] = var
+                    session_vars[key].append(var)
+                    for group_id in self._covered_groups(session):
+                        group_load[(group_id, day_idx)].append((var, duration))
+                    lecturer_day_load[(lecturer_id, day_idx)].append((var, duration))
+                    for room_set in containing:
+                        room_set_load[(room_set, day_idx)].append((var, duration))
+                    lecturer_load[lecturer_id].append((var, duration))
+                    level_day_load[day_idx].append((var, duration))
+                    preferred_days = self.lecturer_eligibility.preferred_days.get(lecturer_id)
+                    if preferred_days and day_idx not in preferred_days:
+                        objective_terms.append(var)
+        
+        if len(session_vars) < len(level_sessions):
+            # Some session fits on no day at all
+            return None, {'variables': len(choices), 'seconds': round(perf_counter() - started, 3), 'status': 'INFEASIBLE'}
+        for variables in session_vars.values():
+            model.AddExactlyOne(variables)
+        
+        # Lecturer bindings: a session may only take its binding's chosen lecturer
+        binding_of = {(s['course_id'], s['group_id'], s['s_id']): s.get('binding') for s in level_sessions}
+        bound = {}  # (binding, lecturer_id) -> literal
+        for (key, day_idx, lecturer_id), var in choices.items():
+            binding = binding_of[key]
+            if binding is None: continue
+            if (binding, lecturer_id) not in bound:
+                bound[(binding, lecturer_id)] = model.NewBoolVar(f'bind_{len(bound)}_l{lecturer_id}')
+            model.AddImplication(var, bound[(binding, lecturer_id)])
+        by_binding = defaultdict(list)
+        for (binding, _), literal in bound.items():
+            by_binding[binding].append(literal)
+        for literals in by_binding.values():
+            model.AddAtMostOne(literals)
+        
+        # Daily capacity: blocks of D hours only fit in free stretches of at least D hours,
+        # so for every block length D, the hours of blocks of D or more hours are bounded
+        # by the total length of the stretches that long
+        capacities = [
+            (group_load, lambda group_id, day_idx: free_runs(group_busy.get(group_id, 0), day_idx)),
+            (lecturer_day_load, lambda lecturer_id, day_idx: free_runs(lecturer_busy.get(lecturer_id, 0), day_idx)),
+            (room_set_load, lambda room_set, day_idx: [
+                run for r in room_set for run in free_runs(room_busy.get(r, 0), day_idx)
+            ]),
+        ]
+        for loads, capacity in capacities:
+            for (resource, day_idx), load in loads.items():
+                runs = capacity(resource, day_idx)
+                for min_length in sorted({hours for _, hours in load}):
+                    longer = [(var, hours) for var, hours in load if hours >= min_length]
+                    limit = sum(run for run in runs if run >= min_length)
+                    if sum(hours for _, hours in longer) > limit:
+                        model.Add(cp_model.LinearExpr.WeightedSum(
+                            [var for var, _ in longer], [hours for _, hours in longer]
+                        ) <= limit)
+        
+        self._add_lecturer_hour_caps(model, level_sessions, lecturer_load)
+        
+        # A no-good keeps its sessions from all returning to that day, whichever lecturers
+        # they get (a heuristic cut: the fallback model still covers anything it excludes)
+        on_day = defaultdict(list)  # (session key, day) -> [var]
+        for (key, day_idx, _), var in choices.items():
+            on_day[(key, day_idx)].append(var)
+        duration_of = {(s['course_id'], s['group_id'], s['s_id']): s['duration'] for s in level_sessions}
+        for day_idx, resource, assigned in no_goods:
+            keys = {key for key, _ in assigned}
+            # No-goods about sessions placed since are already met
+            if not all(key in session_vars for key in keys): continue
+            model.Add(cp_model.LinearExpr.Sum(
+                [var for key in keys for var in on_day[(key, day_idx)]]
+            ) <= len(keys) - 1)
+            # The group or lecturer that could not fit them (the level, when the whole day
+            # failed) also gets fewer hours there than they took
+            if resource is None:
+                load = level_day_load[day_idx]
+            else:
+                kind, resource_id = resource
+                load = (group_load if kind == 'group' else lecturer_day_load)[(resource_id, day_idx)]
+            model.Add(cp_model.LinearExpr.WeightedSum(
+                [var for var, _ in load], [hours for _, hours in load]
+            ) < sum(duration_of[key] for key in keys))
+        
+        # Spread the load: an hour more on the busiest day of a group or lecturer (counting
+        # what it already has there) costs as much as a session off a preferred day
+        for loads, busy in ((group_load, group_busy), (lecturer_day_load, lecturer_busy)):
+            by_resource = defaultdict(list)
+            for (resource_id, day_idx), load in loads.items():
+                by_resource[resource_id].append((day_idx, load))
+            for resource_id, days in by_resource.items():
+                peak = model.NewIntVar(0, day_len, f'peak_{len(objective_terms)}')
+                for day_idx, load in days:
+                    taken = day_len - sum(free_runs(busy.get(resource_id, 0), day_idx))
+                    model.Add(cp_model.LinearExpr.WeightedSum(
+                        [var for var, _ in load], [hours for _, hours in load]
+                    ) + taken <= peak)
+                objective_terms.append(peak)
+        
+        if objective_terms:
+            model.Minimize(cp_model.LinearExpr.Sum(objective_terms))
+        
+        solver = cp_model.CpSolver()
+        configure_solver(solver, self.profile, time_limit)
+        status = solver.Solve(model)
+        stats = {
+            'variables': len(choices),
+            'seconds': round(perf_counter() - started, 3),
+            'status': solver.StatusName(status),
+        }
+        if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+            return None, stats
+        return {key: (day_idx, lecturer_id) for (key, day_idx, lecturer_id), var in choices.items()
+                if solver.BooleanValue(var)}, stats
+
+    def generate_levels_in_parallel(self, levels: List[int]) -> List[int]:
+        """
+        Divide rooms and lecturers between the levels with allocate_level_quotas and
+        solve every level at once in its own process. Levels that solve within their
+        quota are kept; the rest are returned to be solved sequentially afterwards,
+        with all resources the kept levels left free.
+        """
+        self._load_snapshot()
+        self.send_progress(0, 'building', 5, 'Dividing rooms and lecturers between levels...')
+        
+        build_started = perf_counter()
+        level_sessions = {}
+        skipping = []  # levels with skipped sessions, left to the sequential run to fail or flag
+        for level in levels:
+            if self.snapshot.groups_by_level.get(level):
+                skipped = []
+                level_sessions[level] = self._collect_level_sessions(self.snapshot.courses_by_level.get(level, []), skipped)
+                if skipped:
+                    skipping.append(level)
+                    del level_sessions[level]
+                    continue
+                self._attach_hints(level_sessions[level])
+        
+        rooms_busy, lecturers_busy, _ = self._blocked_resources()
+        remaining_hours = self._remaining_lecturer_hours()
+        quota_limit = max(self.time_budget.remaining * 0.05, MIN_LEVEL_SECONDS)
+        quotas, quota_stats = allocate_level_quotas(
+            level_sessions, rooms_busy, lecturers_busy, remaining_hours,
+            len(self.days), len(self.time_slots), quota_limit, self.profile['num_search_workers']
+        )
+        quota_stats['build_seconds'] = round(perf_counter() - build_started - quota_stats['solve_seconds'], 3)  # incl. session collection
+        self.level_stats['quotas'] = quota_stats
+        self.time_budget.spend(perf_counter() - build_started)
+        if quotas is None:
+            self.run_stats['quota_fallback_levels'] = list(levels)
+            return levels
+        
+        # Quotas hold hours left to use; the workers' caps count hours already used too
+        for quota in quotas.values():
+            quota['max_hours'] = {
+                lecturer_id: self.lecturer_eligibility.max_hours[lecturer_id] - remaining_hours[lecturer_id] + hours
+                for lecturer_id, hours in quota['max_hours'].items()
+            }
+        
+        keys = [level for level in levels if level_sessions.get(level)]
+        processes = min(len(keys), os.cpu_count() or 1) or 1
+        num_workers = max(self.profile['num_search_workers'] // processes, 1)
+        time_limit = max(self.time_budget.remaining * 0.6, MIN_LEVEL_SECONDS)
+        
+        self.send_progress(0, 'solving', 20, f'Solving levels {", ".join(map(str, keys))} in parallel...')
+        parallel_started = perf_counter()
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            futures = {
+                level: pool.submit(_solve_partition, self, level_sessions[level], time_limit, num_workers, quotas[level])
+                for level in keys
+            }
+            results = {level: future.result() for level, future in futures.items()}
+        self.time_budget.spend(perf_counter() - parallel_started)
+        
+        # Keep whole levels that solved and still fit; the rest go to the sequential repair
+        rooms_busy, lecturers_busy, groups_busy = self._blocked_resources()
+        failed = []
+        for level in keys:
+            stats, placements = results[level]
+            stats['hinted_sessions'] = sum(1 for session in level_sessions[level] if session.get('hint'))
+            self.level_stats[str(level)] = stats
+            accepted = self._fit_placements(level_sessions[level], placements, rooms_busy, lecturers_busy, groups_busy)
+            if accepted is None:
+                # Keep the failed attempt's statistics; the sequential repair overwrites level_stats
+                self.run_stats.setdefault('quota_attempts', {})[str(level)] = stats
+                failed.append(level)
+                continue
+            for session, placement in accepted:
+                self._append_session_slots(session, *placement)
+        
+        failed += skipping
+        self.run_stats['quota_fallback_levels'] = failed
+        return [level for level in levels if level in failed]
+
+    def _fit_placements(self, sessions: List[Dict], placements: Dict, rooms_busy: Dict[int, int],
+                        lecturers_busy: Dict[int, int], groups_busy: Dict[int, int]):
+        """
+        Check a subproblem's placements against the occupancy bitmaps and weekly hours of
+        what is already in all_slots. Returns (session, placement) pairs and marks them busy,
+        or None (leaving the bitmaps untouched) if any session is unplaced or clashes.
+        """
+        remaining_hours = self._remaining_lecturer_hours()
+        rooms, lecturers, groups = dict(rooms_busy), dict(lecturers_busy), dict(groups_busy)
+        accepted = []
+        for session in sessions:
+            placement = placements.get((session['course_id'], session['group_id'], session['s_id']))
+            if placement is None:
+                return None
+            day_idx, start_t, room_id, lecturer_id = placement
+            mask = self._block_mask(day_idx, start_t, session['duration'])
+            if (rooms.get(room_id, 0) & mask or lecturers.get(lecturer_id, 0) & mask
+                    or self._groups_mask(groups, session) & mask):
+                return None
+            if lecturer_id in remaining_hours:
+                remaining_hours[lecturer_id] -= session['duration']
+                if remaining_hours[lecturer_id] < 0:
+                    return None
+            rooms[room_id] = rooms.get(room_id, 0) | mask
+            lecturers[lecturer_id] = lecturers.get(lecturer_id, 0) | mask
+            for group_id in self._family_groups(session):
+                groups[group_id] = groups.get(group_id, 0) | mask
+            accepted.append((session, placement))
+        rooms_busy.update(rooms)
+        lecturers_busy.update(lecturers)
+        groups_busy.update(groups)
+        return accepted
+
+    def _record_run_totals(self):
+        """
+        Total model build and solve time of the run, for comparing modes: every level's
+        (a backtracked level's successful round and its failed first attempt), plus the
+        wall time of all backtracking rounds
+        """
+        attempts = [s for s in self.level_stats.values() if 'build_seconds' in s]
+        attempts += [s['failed_attempt'] for s in attempts if 'build_seconds' in s.get('failed_attempt', {})]
+        self.run_stats['mode'] = self.mode
+        self.run_stats['total_build_seconds'] = round(sum(s['build_seconds'] for s in attempts), 3)
+        self.run_stats['total_solve_seconds'] = round(sum(s['solve_seconds'] for s in attempts), 3)
+        self.run_stats['total_backtrack_seconds'] = round(sum(
+            backtrack['wall_seconds'] for s in self.level_stats.values() for backtrack in s.get('backtracking', [])
+        ), 3)
+
+    def _precheck(self, level: int, stats_key: str, label: str, sessions: List[Dict],
+                  progress_start: float, build_started: float, skipped: List[Dict] = ()) -> bool:
+        """
+        Counting checks (see precheck_sessions) against what earlier levels and
+        unavailability left free, before any model is built; skipped sessions (see
+        _collect_level_sessions) fail it by themselves. When they prove the sessions
+        cannot fit, level_stats[stats_key] records an INFEASIBLE status with the
+        resource-pressure report instead of a solve. A greedy draft is made anyway, as it
+        keeps whatever it can place (see _flag_skipped); the report then goes to
+        run_stats['precheck'][stats_key]['report'].
+        Sessions _narrow_bound_lecturers leaves without a lecturer count as skipped.
+        """
+        dropped = []
+        sessions = self._narrow_bound_lecturers(sessions, dropped)
+        skipped = list(skipped) + dropped
+        rooms_busy, lecturers_busy, groups_busy = self._blocked_resources()
+        problems, report = precheck_sessions(
+            sessions, rooms_busy, lecturers_busy, groups_busy,
+            self._remaining_lecturer_hours(), len(self.days), len(self.time_slots), skipped
+        )
+        self.run_stats.setdefault('precheck', {})[stats_key] = {
+            'seconds': report['seconds'], 'problems': len(problems),
+        }
+        if not problems:
+            return True
+        if self.engine == 'greedy':
+            self.run_stats['precheck'][stats_key]['report'] = report
+            self.send_progress(level, 'building', progress_start + 20,
+                               f'{label} cannot fit: {len(problems)} resources or sessions are oversubscribed; drafting what does')
+            return True
+        
+        build_seconds = perf_counter() - build_started
+        self.time_budget.spend(build_seconds)
+        self.level_stats[stats_key] = {
+            'engine': self.engine,
+            'profile': self.profile['name'],
+            'sessions': len(sessions),
+            'variables': 0,
+            'constraints': 0,
+            'build_seconds': round(build_seconds, 3),
+            'solve_seconds': 0.0,
+            'status': 'INFEASIBLE',
+            'skipped_sessions': len(skipped),
+            'precheck': report,
+        }
+        self.send_progress(level, 'solving', progress_start + 30,
+                           f'{label} cannot fit: {len(problems)} resources or sessions are oversubscribed')
+        return False
+
+    def _flag_skipped(self, stats_key: str, skipped: List[Dict]):
+        """
+        A kept draft (greedy) of a level with skipped sessions: list them with the draft's
+        unplaced_sessions and mark it INCOMPLETE
+        """
+        stats = self.level_stats[stats_key]
+        stats['skipped_sessions'] = len(skipped)
+        stats['unplaced_sessions'] = stats.get('unplaced_sessions', []) + [
+            [session['course_id'], session['group_id'], session['s_id']] for session in skipped
+        ]
+        if stats['status'] in ('OPTIMAL', 'FEASIBLE'):
+            stats['status'] = 'INCOMPLETE'
+
+    def _solve_sessions(self, level: int, stats_key: str, label: str, sessions: List[Dict],
+                        progress_start: float, build_started: float) -> bool:
+        """
+        Build the selected engine's model for the given sessions, solve it within the
+        level's share of the time budget and append the placements to all_slots.
+        Statistics are recorded in level_stats[stats_key].
+        """
+        hinted = self._attach_hints(sessions)
+        time_limit = self.time_budget.limit_for(level)
+        
+        stats = self._build_and_solve(sessions, time_limit, build_started, level, label, progress_start)
+        stats['hinted_sessions'] = hinted
+        self.time_budget.spend(stats['build_seconds'] + stats['solve_seconds'])
+        self.level_stats[stats_key] = stats
+        
+        return stats['status'] in KEPT_STATUSES
+
+    def _build_and_solve(self, sessions: List[Dict], time_limit: float, build_started: float,
+                         level: int = 0, label: str = '', progress_start: float = 0,
+                         relax: Tuple[str, ...] = ()) -> Dict:
+        """
+        Build the selected engine's model for the sessions and solve it; on success the
+        placements are appended to all_slots. Returns the build/solve statistics.
+        With relax (a prefix of RELAXATION_STAGES) the bool_matrix model is built whatever
+        the engine, with those constraints as penalties.
+        Sessions _narrow_bound_lecturers leaves without a lecturer get no variables: the
+        greedy draft lists them as unplaced, a relaxed solve covering them leaves them out,
+        and any other solve fails as INFEASIBLE without building a model.
+        """
+        dropped = []
+        sessions = self._narrow_bound_lecturers(sessions, dropped)
+        dropped_keys = [[session['course_id'], session['group_id'], session['s_id']] for session in dropped]
+        engine = 'bool_matrix' if relax else self.engine
+        if engine == 'greedy':
+            stats = self._build_greedy_draft(sessions, time_limit, build_started)
+            if dropped:
+                stats['unplaced_sessions'] += dropped_keys
+                stats['status'] = 'INCOMPLETE'
+            return stats
+        if dropped and 'coverage' not in relax:
+            return {
+                'engine': engine,
+                'profile': self.profile['name'],
+                'sessions': len(sessions) + len(dropped),
+                'variables': 0,
+                'constraints': 0,
+                'build_seconds': round(perf_counter() - build_started, 3),
+                'time_limit_seconds': round(time_limit, 1),
+                'solve_seconds': 0.0,
+                'status': 'INFEASIBLE',
+                'unplaced_sessions': dropped_keys,
+            }
+        
+        # 2-4. Variables, hard constraints and objective for the selected engine
+        if relax:
+            model, num_vars, extract = self._build_bool_matrix_model(sessions, relax)
+        elif self.engine == 'interval':
+            model, num_vars, extract = self._build_interval_model(sessions)
+        elif self.engine == 'factorized':
+            model, num_vars, extract = self._build_factorized_model(sessions)
+        elif self.engine == 'two_phase':
+            model, num_vars, extract = self._build_two_phase_model(sessions, time_limit)
+        else:
+            model, num_vars, extract = self._build_bool_matrix_model(sessions)
+        
+        build_seconds = perf_counter() - build_started
+        build_peak_rss = _peak_rss_mb()
+        
+        # 5. Solve
+        self.send_progress(level, 'solving', progress_start + 60, f'Solving constraints for {label}...')
+        solver = cp_model.CpSolver()
+        configure_solver(solver, self.profile, time_limit)
+        
+        solve_started = perf_counter()
+        status = solver.Solve(model)
+        solve_seconds = perf_counter() - solve_started
+        stats = {
+            'engine': engine,
+            'profile': self.profile['name'],
+            'sessions': len(sessions),
+            'variables': num_vars,
+            'constraints': len(model.Proto().constraints),
+            'build_seconds': round(build_seconds, 3),
+            'time_limit_seconds': round(time_limit, 1),
+            'solve_seconds': round(solve_seconds, 3),
+            'status': solver.StatusName(status),
+            'build_peak_rss_mb': build_peak_rss,
+        }
+        
+        if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+            self.send_progress(level, 'extracting', progress_start + 90, 'solution found! processing...')
+            stats['objective'] = solver.ObjectiveValue()
+            extract_started = perf_counter()
+            # Extraction may report extra statistics, or a failed status of its own
+            stats.update(extract(solver) or {})
+            # ...and solve again (two_phase), which is solve time too
+            resolve_seconds = stats.pop('resolve_seconds', 0.0)
+            stats['solve_seconds'] = round(solve_seconds + resolve_seconds, 3)
+            stats['extract_seconds'] = round(perf_counter() - extract_started - resolve_seconds, 3)
+        stats['peak_rss_mb'] = _peak_rss_mb()
+        return stats
+
+    def repair_timetable(self, scope: Dict[str, List[int]], neighbourhood: int = 0) -> bool:
+        """
+        Re-solve only the sessions a change affects and write them back into this
+        timetable in place; every other slot stays fixed where it is.
+        scope may hold course_ids, department_ids, levels, room_ids and lecturer_ids.
+        neighbourhood widens the re-solved set by that many hops of sessions sharing
+        a group or lecturer with it, giving the solver room to move things around.
+        """
+        # The timetable being repaired doubles as the warm-start baseline
+        self.baseline_timetable_id = self.timetable_id
+        self._load_snapshot()
+        existing = self.snapshot.baseline_slots
+        
+        self.send_progress(0, 'building', 10, 'Finding sessions affected by the change...')
+        build_started = perf_counter()
+        affected = self._repair_affected_pairs(scope, neighbourhood)
+        
+        # Everything outside the affected (course, group) pairs is fixed
+        self.all_slots = [
+            self._slot_to_dict(slot) for slot in existing
+            if (slot.course_id, slot.group_id) not in affected
+        ]
+        fixed_count = len(self.all_slots)
+        
+        courses = [
+            course for level_courses in self.snapshot.courses_by_level.values() for course in level_courses
+            if any(course_id == course.id for course_id, _ in affected)
+        ]
+        skipped = []
+        sessions = [
+            session for session in self._collect_level_sessions(courses, skipped)
+            if (session['course_id'], session['group_id']) in affected
+        ]
+        skipped = [session for session in skipped if (session['course_id'], session['group_id']) in affected]
+        
+        success = (
+            self._precheck(0, 'repair', 'the affected sessions', sessions, 0, build_started, skipped)
+            and self._solve_sessions(0, 'repair', 'the affected sessions', sessions, 0, build_started)
+        )
+        if success and skipped:
+            self._flag_skipped('repair', skipped)
+        success = success and not self.level_stats['repair'].get('unplaced_sessions')
+        self.run_stats['repair'] = {
+            'scope': scope,
+            'neighbourhood': neighbourhood,
+            'affected_pairs': len(affected),
+            'fixed_slots': fixed_count,
+            'removed_slots': len(existing) - fixed_count,
+            'new_slots': len(self.all_slots) - fixed_count if success else 0,
+        }
+        if not success:
+            self.send_progress(0, 'failed', 90, 'No feasible placement for the affected sessions')
+            return False
+        
+        # Write back in place: drop the affected pairs' rows, add their new placements
+        self.send_progress(0, 'finalizing', 95, 'Saving repaired sessions...')
+        for slot in self.db.query(TimetableSlot).filter(TimetableSlot.timetable_id == self.timetable_id).all():
+            if (slot.course_id, slot.group_id) in affected:
+                self.db.delete(slot)
+        self._add_slot_rows(self.all_slots[fixed_count:])
+        self.db.commit()
+        
+        self.send_progress(0, 'completed', 100, 'Timetable repair completed successfully!')
+        return True
+
+    def _repair_affected_pairs(self, scope: Dict[str, List[int]], neighbourhood: int) -> set:
+        """(course_id, group_id) pairs whose sessions a repair re-solves"""
+        course_ids = set(scope.get('course_ids') or [])
+        department_ids = set(scope.get('department_ids') or [])
+        levels = set(scope.get('levels') or [])
+        room_ids = set(scope.get('room_ids') or [])
+        lecturer_ids = set(scope.get('lecturer_ids') or [])
+        existing = self.snapshot.baseline_slots
+        
+        affected = set()
+        for level_courses in self.snapshot.courses_by_level.values():
+            for course in level_courses:
+                if course.id in course_ids or course.department_id in department_ids or course.level in levels:
+                    affected.update((course.id, group_id) for group_id in self._course_group_ids(course))
+        
+        # Slots of courses deleted or unassigned since, or on changed resources
+        for slot in existing:
+            if slot.course_id in course_ids or slot.room_id in room_ids or slot.lecturer_id in lecturer_ids:
+                affected.add((slot.course_id, slot.group_id))
+        
+        for _ in range(neighbourhood):
+            groups = {related for _, group_id in affected for related in self.group_hierarchy.family(group_id)}
+            lecturers = {slot.lecturer_id for slot in existing if (slot.course_id, slot.group_id) in affected}
+            affected |= {
+                (slot.course_id, slot.group_id) for slot in existing
+                if slot.group_id in groups or slot.lecturer_id in lecturers
+            }
+        
+        return self._with_shared_pairs(affected)
+
+    def _with_shared_pairs(self, pairs: set) -> set:
+        """
+        The (course_id, group_id) pairs plus every other group of a shared course they
+        touch: a shared course's sessions are re-solved for all of its groups or none
+        """
+        pairs = set(pairs)
+        for level_courses in self.snapshot.courses_by_level.values():
+            for course in level_courses:
+                group_ids = self.snapshot.group_ids_by_course.get(course.id, [])
+                if self._is_shared_course(course) and any((course.id, g) in pairs for g in group_ids):
+                    pairs.update((course.id, group_id) for group_id in group_ids)
+        return pairs
+
+    def improve_timetable(self, neighbourhoods: Tuple[str, ...] = LNS_NEIGHBOURHOODS, seed: int = 0) -> bool:
+        """
+        Large neighbourhood search on this timetable's soft objective (broken lecturer
+        preferences). Each step picks a session that breaks some preference, relaxes every
+        session sharing its day, lecturer, room or department, and re-solves those with
+        everything else fixed, hinted at where they are now; the result is kept if it
+        breaks fewer preferences. Runs until the time budget is spent or nothing is left to
+        improve, then rewrites the timetable if the objective went down. Returns whether it did.
+        """
+        unknown = [kind for kind in neighbourhoods if kind not in LNS_NEIGHBOURHOODS]
+        if unknown or not neighbourhoods:
+            raise ValueError(f"Unknown neighbourhood '{unknown[0] if unknown else ''}'. Use any of: {', '.join(LNS_NEIGHBOURHOODS)}")
+        
+        # The timetable being improved is its own baseline
+        self.baseline_timetable_id = self.timetable_id
+        self._load_snapshot()
+        existing = self.snapshot.baseline_slots
+        started = perf_counter()
+        budget = self.time_budget.remaining
+        rng = random.Random(seed)
+        
+        self.send_progress(0, 'building', 10, 'Mapping the timetable onto its sessions...')
+        courses = {course.id: course for level_courses in self.snapshot.courses_by_level.values() for course in level_courses}
+        sessions = self._collect_level_sessions(list(courses.values()))
+        self._attach_baseline_hints(sessions)
+        
+        # Pairs whose stored slots do not map exactly onto complete placements stay as stored
+        stored_hours = defaultdict(int)
+        for slot in existing:
+            stored_hours[(slot.course_id, slot.group_id)] += 1
+        session_hours = defaultdict(int)
+        fixed_pairs = set()
+        for session in sessions:
+            pairs = [(session['course_id'], group_id) for group_id in self._session_groups(session)]
+            for pair in pairs:
+                session_hours[pair] += session['duration']
+            if session.get('hint') is None or None in session['hint']:
+                fixed_pairs.update(pairs)
+        fixed_pairs |= {pair for pair, hours in stored_hours.items() if session_hours[pair] != hours}
+        # A shared session moves for all of its groups or stays for all of them
+        for session in sessions:
+            pairs = {(session['course_id'], group_id) for group_id in self._session_groups(session)}
+            if pairs & fixed_pairs:
+                fixed_pairs |= pairs
+        
+        meta = {
+            (session['course_id'], session['group_id'], session['s_id']): session for session in sessions
+            if (session['course_id'], session['group_id']) not in fixed_pairs
+        }
+        current = {key: session['hint'] for key, session in meta.items()}
+        fixed_slots = [self._slot_to_dict(slot) for slot in existing if (slot.course_id, slot.group_id) in fixed_pairs]
+        
+        def penalty(key: Tuple, placement: Tuple) -> int:
+            day_idx, start_t, _, lecturer_id = placement
+            return self._preference_penalty(lecturer_id, day_idx, start_t, meta[key]['duration'])
+        
+        def target_of(kind: str, key: Tuple):
+            day_idx, _, room_id, lecturer_id = current[key]
+            return {'day': day_idx, 'room': room_id, 'lecturer': lecturer_id,
+                    'department': courses[key[0]].department_id}[kind]
+        
+        initial = objective = sum(penalty(key, placement) for key, placement in current.items())
+        history = [[0.0, objective]]
+        steps = {kind: {'tried': 0, 'accepted': 0} for kind in neighbourhoods}
+        
+        self.send_progress(0, 'solving', 20, f'Improving the timetable (objective {objective})...')
+        while objective:
+            time_limit = min(LNS_STEP_SECONDS, budget - (perf_counter() - started))
+            if time_limit <= 0: break
             
-        # Loop to create variables
+            # Only a neighbourhood holding a penalized session can get better
+            penalized = [key for key, placement in current.items() if penalty(key, placement)]
+            kind = rng.choice(neighbourhoods)
+            target = target_of(kind, rng.choice(penalized))
+            relaxed = {key for key in current if target_of(kind, key) == target}
+            
+            self.all_slots = list(fixed_slots)
+            for key, placement in current.items():
+                if key not in relaxed:
+                    self._append_session_slots(meta[key], *placement)
+            self.placements = {}
+            stats = self._build_and_solve(
+                [dict(meta[key], hint=current[key]) for key in relaxed], time_limit, perf_counter()
+            )
+            steps[kind]['tried'] += 1
+            if stats['status'] not in ('OPTIMAL', 'FEASIBLE'): continue
+            
+            placed = {key: self.placements[key] for key in relaxed}
+            gain = sum(penalty(key, current[key]) - penalty(key, placed[key]) for key in relaxed)
+            if gain > 0:
+                current.update(placed)
+                objective -= gain
+                steps[kind]['accepted'] += 1
+                history.append([round(perf_counter() - started, 3), objective])
+                self.send_progress(0, 'solving', 20, f'Objective improved to {objective} by relaxing {kind} {target}')
+        
+        seconds = perf_counter() - started
+        self.time_budget.spend(seconds)
+        self.all_slots = list(fixed_slots)
+        for key, placement in current.items():
+            self._append_session_slots(meta[key], *placement)
+        self.run_stats['improve'] = {
+            'neighbourhoods': list(neighbourhoods),
+            'initial_objective': initial,
+            'final_objective': objective,
+            'steps': steps,
+            'fixed_pairs': len(fixed_pairs),
+            'seconds': round(seconds, 3),
+            'history': history,  # [seconds since start, objective] after each improvement
+        }
+        if objective >= initial:
+            self.send_progress(0, 'completed', 100, 'No better timetable found within the time budget')
+            return False
+        
+        # Rewrite the rows of every session the search could move
+        self.send_progress(0, 'finalizing', 95, 'Saving improved timetable...')
+        for slot in self.db.query(TimetableSlot).filter(TimetableSlot.timetable_id == self.timetable_id).all():
+            if (slot.course_id, slot.group_id) not in fixed_pairs:
+                self.db.delete(slot)
+        self._add_slot_rows(self.all_slots[len(fixed_slots):])
+        self.db.commit()
+        
+        self.send_progress(0, 'completed', 100, f'Objective improved from {initial} to {objective}')
+        return True
+
+    def _load_snapshot(self):
+        """Read all generator input in one pass and compile the eligibility data from it"""
+        if self.snapshot is not None:
+            return
+        self.snapshot = GenerationSnapshot.load(self.db, self.baseline_timetable_id)
+        self.run_stats['snapshot'] = self.snapshot.stats
+        self.room_eligibility = RoomEligibility(
+            self.snapshot.rooms,
+            self.snapshot.department_codes,
+            num_days=len(self.days),
+            day_len=len(self.time_slots)
+        )
+        self.lecturer_eligibility = LecturerEligibility(
+            self.snapshot.lecturers,
+            self.snapshot.unavailability,
+            num_days=len(self.days),
+            day_len=len(self.time_slots)
+        )
+        self.group_hierarchy = GroupHierarchy(list(self.snapshot.groups.values()))
+
+    def _estimate_level_size(self, level: int) -> int:
+        """Rough model size of a level (session-hours to place), used to split the time budget"""
+        size = 0
+        for course in self.snapshot.courses_by_level.get(level, []):
+            if not self.snapshot.lecturer_assignments.get(course.id): continue
+            group_count = len(self.snapshot.group_ids_by_course.get(course.id, []))
+            if self._is_shared_course(course):
+                group_count = 1
+            size += group_count * sum(s['duration'] for s in self._parse_course_sessions(course))
+        return size
+
+    def _collect_level_sessions(self, courses: List[Course], skipped: List[Dict] = None) -> List[Dict]:
+        """
+        Expand the level's courses into the sessions that have to be placed, one per
+        (course, group, block), together with the rooms and lecturers each may use.
+        Rooms come from the eligibility matrix, so rooms that can never host the
+        session (type, capacity, equipment, affinity, availability) get no variables.
+        Lecturers are limited to those whose assignment covers the session type and
+        who still have enough of their weekly hours left. A shared course (see
+        _is_shared_course) gets one session per block for all its groups, with
+        session['group_ids'] listing them and group_id the first; it falls back to a copy
+        per group when no room holds them all. Lab, drawing and tutorial divisions teach
+        their session type to each of the assigned group's subgroups separately (see
+        GroupHierarchy.split_groups); sessions whose groups have subgroups list every group
+        they fill in session['cover_groups']. With a lecturer binding, every
+        session of a bound (group, course[, type]) gets the same candidates, which must
+        have the hours for all of them, and session['binding'] names the binding.
+        A session no room is eligible for, or no lecturer may teach or has the hours left
+        for, can never be placed: it is left out of the sessions returned and appended to
+        skipped (when given) with session['reason'] 'no_room', 'no_lecturer' or
+        'lecturer_hours', so callers can fail or flag the level instead of losing it.
+        """
+        level_sessions = []
+        day_len = len(self.time_slots)
+        remaining_hours = self._remaining_lecturer_hours()
+        
         for course in courses:
             # Lecturers
-            lecturer_assignments = self.db.query(LecturerAssignment).filter(LecturerAssignment.course_id == course.id).all()
-            possible_lecturers = [la.lecturer_id for la in lecturer_assignments]
-            if not possible_lecturers: continue # Skip courses with no lecturer? Or allow TBD? For now skip.
+            lecturer_assignments = self.snapshot.lecturer_assignments.get(course.id, [])
+            if not lecturer_assignments: continue # Skip courses with no lecturer? Or allow TBD? For now skip.
             
             # Groups
-            group_assignments = self.db.query(GroupAssignment).filter(GroupAssignment.course_id == course.id).all()
-            possible_groups = [ga.group_id for ga in group_assignments]
+            possible_groups = self.snapshot.group_ids_by_course.get(course.id, [])
             if not possible_groups: continue
             
-            sessions = course_sessions[course.id]
-            
-            for session in sessions:
-                duration = session['duration']
-                s_id = session['s_id']
+            course_sessions = [s for s in self._parse_course_sessions(course) if s['duration'] <= day_len]
+            bound = self._bound_candidates(course_sessions, lecturer_assignments, remaining_hours)
+            for session in course_sessions:
+                if session['type'] in bound:
+                    binding_key, possible_lecturers = bound[session['type']]
+                else:
+                    binding_key = None
+                    possible_lecturers = [
+                        lecturer_id
+                        for lecturer_id in self.lecturer_eligibility.eligible_lecturers(lecturer_assignments, session['type'])
+                        if remaining_hours.get(lecturer_id, session['duration']) >= session['duration']
+                    ]
+                unplaceable = None
+                if not possible_lecturers:
+                    # Nobody may teach the session, or nobody has the hours left for it; the
+                    # latter keep their lecturers, whose demand the precheck reports
+                    possible_lecturers = self.lecturer_eligibility.eligible_lecturers(lecturer_assignments, session['type'])
+                    unplaceable = 'lecturer_hours' if possible_lecturers else 'no_lecturer'
                 
-                # Filter valid rooms
-                valid_rooms = self._get_compatible_rooms(course, session['type'], all_rooms)
+                if self._is_shared_course(course):
+                    combined_size = sum(self.snapshot.group_sizes.get(group_id, 0) for group_id in possible_groups)
+                    valid_rooms = self.room_eligibility.eligible_rooms(
+                        course, session['type'], possible_groups[0], combined_size
+                    )
+                    if valid_rooms:
+                        level_session = {
+                            'course_id': course.id,
+                            'group_id': possible_groups[0],
+                            'group_ids': list(possible_groups),
+                            's_id': session['s_id'],
+                            'type': session['type'],
+                            'duration': session['duration'],
+                            'rooms': valid_rooms,
+                            'lecturers': possible_lecturers,
+                        }
+                        if binding_key is not None:
+                            level_session['binding'] = (course.id, possible_groups[0]) + binding_key
+                        self._keep_session(level_sessions, skipped, level_session, unplaceable)
+                        continue
                 
-                for group_id in possible_groups:
-                    # Constraint: Create variables for each potential slot
-                    for day_idx in range(len(self.days)):
-                        # Ensure session fits in day (duration)
-                        # Time slots are 0 to 11 (07:00 to 18:00 start)
-                        # Last valid start index = 12 - duration
-                        for start_t in range(12 - duration + 1):
-                            
-                            for room in valid_rooms:
-                                for lecturer_id in possible_lecturers:
-                                    # Create Variable
-                                    var_name = f'c{course.id}_g{group_id}_s{s_id}_d{day_idx}_t{start_t}_r{room.id}_l{lecturer_id}'
-                                    var = model.NewBoolVar(var_name)
-                                    
-                                    key = (course.id, group_id, s_id, day_idx, start_t, room.id, lecturer_id)
-                                    vars_store[key] = var
+                attending = [
+                    group_id for assigned in possible_groups
+                    for group_id in self.group_hierarchy.split_groups(assigned, course.group_division_type, session['type'])
+                ]
+                for group_id in attending:
+                    # Filter valid rooms
+                    valid_rooms = self.room_eligibility.eligible_rooms(
+                        course, session['type'], group_id, self.snapshot.group_sizes.get(group_id, 0)
+                    )
+                    
+                    level_session = {
+                        'course_id': course.id,
+                        'group_id': group_id,
+                        's_id': session['s_id'],
+                        'type': session['type'],
+                        'duration': session['duration'],
+                        'rooms': valid_rooms,
+                        'lecturers': possible_lecturers,
+                    }
+                    if binding_key is not None:
+                        level_session['binding'] = (course.id, group_id) + binding_key
+                    self._keep_session(level_sessions, skipped, level_session,
+                                       unplaceable or (None if valid_rooms else 'no_room'))
         
-        # 3. Constraints
+        return level_sessions
+
+    def _keep_session(self, level_sessions: List[Dict], skipped: List[Dict], session: Dict, unplaceable: str):
+        """
+        Add a collected session to the level's, or, when unplaceable says why it can never
+        be placed, to skipped (if the caller keeps one) with that reason
+        """
+        session = self._with_cover_groups(session)
+        if unplaceable is None:
+            level_sessions.append(session)
+        elif skipped is not None:
+            skipped.append(dict(session, reason=unplaceable))
+
+    def _with_cover_groups(self, session: Dict) -> Dict:
+        """Add session['cover_groups'] when the session's groups have subgroups"""
+        groups = self._session_groups(session)
+        covered = sorted({g for group_id in groups for g in self.group_hierarchy.below(group_id)})
+        if len(covered) > len(groups):
+            session['cover_groups'] = covered
+        return session
+
+    def _course_group_ids(self, course: Course) -> List[int]:
+        """Groups a course's slots may belong to: its assigned groups and the subgroups it splits into"""
+        group_ids = []
+        for assigned in self.snapshot.group_ids_by_course.get(course.id, []):
+            group_ids.append(assigned)
+            if course.group_division_type in DIVISION_SUBGROUPS:
+                split_type = DIVISION_SUBGROUPS[course.group_division_type][0]
+                group_ids.extend(g for g in self.group_hierarchy.split_groups(
+                    assigned, course.group_division_type, split_type
+                ) if g != assigned)
+        return group_ids
+
+    def _is_shared_course(self, course: Course) -> bool:
+        """Whether a course's groups attend its sessions together rather than one copy each"""
+        return (
+            self.shared_sessions
+            and course.course_type in SHARED_COURSE_TYPES
+            and course.group_division_type in (None, GroupDivisionType.FULL_GROUP)
+            and len(self.snapshot.group_ids_by_course.get(course.id, [])) > 1
+        )
+
+    def _session_groups(self, session: Dict) -> List[int]:
+        """Groups attending a session: every group of a shared session, else its one group"""
+        return session.get('group_ids') or [session['group_id']]
+
+    def _covered_groups(self, session: Dict) -> List[int]:
+        """
+        Groups whose per-hour covers a session joins: its groups and their subgroups
+        (session['cover_groups'] when there are any), so a subgroup's cover holds its own
+        sessions and those of its ancestors, and siblings' covers stay apart
+        """
+        return session.get('cover_groups') or self._session_groups(session)
+
+    def _family_groups(self, session: Dict) -> set:
+        """Groups a placed session makes busy: its groups' ancestors and descendants too"""
+        family = set()
+        for group_id in self._session_groups(session):
+            family |= self.group_hierarchy.family(group_id)
+        return family
+
+    def _groups_mask(self, busy: Dict[int, int], session: Dict) -> int:
+        """
+        Union of the occupancy bitmaps of the groups attending a session; with bitmaps from
+        _blocked_resources this includes their ancestors' and descendants' slots
+        """
+        mask = 0
+        for group_id in self._session_groups(session):
+            mask |= busy.get(group_id, 0)
+        return mask
+
+    def _bound_candidates(self, course_sessions: List[Dict], lecturer_assignments: List[LecturerAssignment],
+                          remaining_hours: Dict[int, int]) -> Dict[str, Tuple[Tuple, List[int]]]:
+        """
+        Under a lecturer binding, session type -> (binding key suffix, candidate lecturers)
+        for one group's sessions of a course. 'course' binds all types together (key ()),
+        falling back to one binding per type (key (type,)) when no lecturer can teach
+        them all within their remaining hours. Empty without a binding.
+        """
+        if self.lecturer_binding == 'session':
+            return {}
+        hours = defaultdict(int)
+        for session in course_sessions:
+            hours[session['type']] += session['duration']
         
-        # C1. Each Session must be assigned exactly once per Group
-        for course in courses:
-            group_ids = [ga.group_id for ga in self.db.query(GroupAssignment).filter(GroupAssignment.course_id == course.id).all()]
-            for group_id in group_ids:
-                sessions = course_sessions[course.id]
-                for session in sessions:
-                    # Gather all vars for this specific session
-                    session_vars = []
-                    for k, var in vars_store.items():
-                        # k: (c, g, s, d, t, r, l)
-                        if k[0] == course.id and k[1] == group_id and k[2] == session['s_id']:
-                            session_vars.append(var)
-                    
-                    if session_vars:
-                        model.Add(sum(session_vars) == 1)
+        def with_hours(lecturer_ids: List[int], needed: int) -> List[int]:
+            return [l for l in lecturer_ids if remaining_hours.get(l, needed) >= needed]
         
-        # Helper to get "Active" status for resource at (day, time)
-        # We need to map Block Starts to Time Coverage
-        # A block starting at T with duration D covers [T, T+1, ..., T+D-1]
+        if self.lecturer_binding == 'course':
+            whole = with_hours(
+                self.lecturer_eligibility.bound_lecturers(lecturer_assignments, set(hours), primary_only=True),
+                sum(hours.values())
+            )
+            if whole:
+                return {session_type: ((), whole) for session_type in hours}
+        return {
+            session_type: ((session_type,), with_hours(
+                self.lecturer_eligibility.bound_lecturers(lecturer_assignments, {session_type}), type_hours
+            ))
+            for session_type, type_hours in hours.items()
+        }
+
+    def _narrow_bound_lecturers(self, sessions: List[Dict], dropped: List[Dict] = None) -> List[Dict]:
+        """
+        Bound sessions whose binding already has slots in all_slots (a kept day, the fixed
+        part of a repair or improvement step) may only use the lecturer teaching those.
+        A session whose candidates do not include that lecturer has none left: it is left
+        out of the sessions returned, so no variable is built for it, and appended to
+        dropped (when given) with session['reason'] 'no_lecturer'.
+        """
+        if self.lecturer_binding == 'session':
+            return sessions
+        placed = defaultdict(set)  # binding key -> lecturers already teaching it
+        for slot in self.all_slots:
+            placed[(slot['course_id'], slot['group_id'])].add(slot['lecturer_id'])
+            placed[(slot['course_id'], slot['group_id'], slot['session_type'])].add(slot['lecturer_id'])
+        narrowed = []
+        for session in sessions:
+            if session.get('binding') in placed:
+                session = dict(session, lecturers=[l for l in session['lecturers'] if l in placed[session['binding']]])
+                if not session['lecturers']:
+                    if dropped is not None:
+                        dropped.append(dict(session, reason='no_lecturer'))
+                    continue
+            narrowed.append(session)
+        return narrowed
+
+    def _baseline_blocks(self) -> Dict[Tuple[int, int, str], List[List[int]]]:
+        """
+        Rebuild the baseline timetable's blocks from its hourly slots: consecutive hours of
+        the same course, group, type, room and lecturer are merged into one run.
+        Returns (course_id, group_id, session_type) -> [[day, start, length, room_id, lecturer_id]].
+        """
+        blocks = defaultdict(list)
+        ordered = sorted(
+            self.snapshot.baseline_slots,
+            key=lambda s: (s.course_id, s.group_id, s.session_type, s.day_of_week, s.start_time)
+        )
+        for slot in ordered:
+            runs = blocks[(slot.course_id, slot.group_id, slot.session_type)]
+            t_idx = self._time_to_idx(slot.start_time)
+            last = runs[-1] if runs else None
+            if (last and last[0] == slot.day_of_week and last[1] + last[2] == t_idx
+                    and last[3] == slot.room_id and last[4] == slot.lecturer_id):
+                last[2] += 1
+            else:
+                runs.append([slot.day_of_week, t_idx, 1, slot.room_id, slot.lecturer_id])
+        return blocks
+
+    def _attach_hints(self, level_sessions: List[Dict]) -> int:
+        """
+        Warm-start hints for a model: baseline placements first, then (with draft_hints)
+        a greedy draft for every session without a complete hint. Returns the number of
+        hinted sessions.
+        """
+        hinted = self._attach_baseline_hints(level_sessions)
+        if not self.draft_hints or self.engine == 'greedy':
+            return hinted
         
-        # Optimization: Pre-calculate coverage maps?
-        # Iterate Day, Time, Resource -> Sum constraints
+        placements, _ = self._greedy_placements(level_sessions)
+        for session in level_sessions:
+            placement = placements.get((session['course_id'], session['group_id'], session['s_id']))
+            hint = session.get('hint')
+            if placement is not None and (hint is None or None in hint):
+                hinted += hint is None
+                session['hint'] = placement
+        return hinted
+
+    def _attach_baseline_hints(self, level_sessions: List[Dict]) -> int:
+        """
+        Map baseline blocks back onto this run's sessions as session['hint'] =
+        (day, start, room_id or None, lecturer_id or None). Longer sessions claim runs
+        first; rooms or lecturers no longer eligible are left out of the hint.
+        Returns the number of hinted sessions.
+        """
+        if not self.snapshot.baseline_slots:
+            return 0
         
-        for day_idx in range(len(self.days)):
-            for t_idx in range(12):
-                
-                # C2. Room Capacity / Overlap
-                for room in all_rooms:
-                    active_vars_room = []
-                    # Check all variables that might cover this time
-                    for k, var in vars_store.items():
-                        # k: (c, g, s, d, start_t, r, l)
-                        if k[3] == day_idx and k[5] == room.id:
-                            start_t = k[4]
-                            # Get duration
-                            duration = course_sessions[k[0]][k[2]]['duration']
-                            if start_t <= t_idx < start_t + duration:
-                                active_vars_room.append(var)
-                    
-                    # Add Previous Level Constraints (Already scheduled slots)
-                    # Check self.all_slots
-                    is_blocked_externally = False
-                    for slot in self.all_slots:
-                        if slot['day_of_week'] == day_idx and slot['room_id'] == room.id:
-                            slot_start_idx = self._time_to_idx(slot['start_time'])
-                            slot_end_idx = self._time_to_idx(slot['end_time'])
-                            # slot covers [start, end)
-                            # t_idx covers [t, t+1)
-                            # simplified: if t_idx matches any hour covered by slot
-                            if slot_start_idx <= t_idx < slot_end_idx:
-                                is_blocked_externally = True
-                                break
-                    
-                    if is_blocked_externally:
-                         if active_vars_room:
-                             model.Add(sum(active_vars_room) == 0)
-                    elif active_vars_room:
-                        model.Add(sum(active_vars_room) <= 1)
+        blocks = self._baseline_blocks()
+        hinted = 0
+        for session in sorted(level_sessions, key=lambda s: (-s['duration'], s['s_id'])):
+            runs = blocks.get((session['course_id'], session['group_id'], session['type']), [])
+            run = next((r for r in runs if r[2] >= session['duration']), None)
+            if run is None: continue
+            
+            day_idx, start_t, _, room_id, lecturer_id = run
+            session['hint'] = (
+                day_idx, start_t,
+                room_id if room_id in session['rooms'] else None,
+                lecturer_id if lecturer_id in session['lecturers'] else None,
+            )
+            # The rest of the run is left for the course's other sessions
+            run[1] += session['duration']
+            run[2] -= session['duration']
+            hinted += 1
+        return hinted
 
+    def _greedy_placements(self, level_sessions: List[Dict]) -> Tuple[Dict[Tuple, Tuple], List[Tuple]]:
+        """
+        Constructive draft without a solver, against the same occupancy bitmaps and
+        eligible rooms and lecturers as the models. Sessions are placed one at a time, most
+        constrained first (fewest free (day, start, room, lecturer) options left by the
+        sessions placed so far, longer sessions breaking ties). Each keeps its hint if that is still free; otherwise it takes the
+        option breaking fewest lecturer preferences, on the day its group has least so far,
+        in the room the remaining sessions need least. The first session of a binding
+        placed fixes the lecturer of the rest. all_slots is not modified.
+        Returns ({(course_id, group_id, s_id): (day, start, room_id, lecturer_id)}, [keys left unplaced]).
+        """
+        day_len = len(self.time_slots)
+        room_busy, lecturer_busy, group_busy = self._blocked_resources()
+        remaining_hours = self._remaining_lecturer_hours()
+        room_demand = defaultdict(int)  # room_id -> hours of unplaced sessions that may use it
+        for session in level_sessions:
+            for room_id in session['rooms']:
+                room_demand[room_id] += session['duration']
+        group_day_hours = defaultdict(int)  # (group_id, day) -> hours placed by the draft
+        bound = {}  # binding -> lecturer_id picked by its first placed session
+        binding_hours = defaultdict(int)  # binding -> hours its lecturer has to teach
+        for session in level_sessions:
+            if session.get('binding') is not None:
+                binding_hours[session['binding']] += session['duration']
+        
+        def options(session: Dict) -> List[Tuple[int, int, int, int]]:
+            duration = session['duration']
+            group_blocked = self._groups_mask(group_busy, session)
+            binding = session.get('binding')
+            if binding in bound:
+                lecturers, needed = [bound[binding]], duration
+            else:
+                lecturers, needed = session['lecturers'], binding_hours.get(binding, duration)
+            found = []
+            for day_idx in self._session_days(session):
+                for start_t in range(day_len - duration + 1):
+                    block = self._block_mask(day_idx, start_t, duration)
+                    if group_blocked & block: continue
+                    rooms = [room_id for room_id in session['rooms'] if not room_busy[room_id] & block]
+                    if not rooms: continue
+                    for lecturer_id in lecturers:
+                        if lecturer_busy[lecturer_id] & block: continue
+                        if remaining_hours.get(lecturer_id, needed) < needed: continue
+                        found.extend((day_idx, start_t, room_id, lecturer_id) for room_id in rooms)
+            return found
+        
+        # Options of every session still to place, refreshed after each placement for the
+        # sessions sharing one of its resources, so the next pick is the most constrained now
+        pending = {i: options(session) for i, session in enumerate(level_sessions)}
+        placements, unplaced = {}, []
+        while pending:
+            idx = min(pending, key=lambda i: (len(pending[i]), -level_sessions[i]['duration'], i))
+            found = pending.pop(idx)
+            session = level_sessions[idx]
+            key = (session['course_id'], session['group_id'], session['s_id'])
+            duration = session['duration']
+            if not found:
+                unplaced.append(key)
+                continue
+            
+            if session.get('hint') in found:
+                choice = session['hint']
+            else:
+                choice = min(found, key=lambda o: (
+                    self._preference_penalty(o[3], o[0], o[1], duration),
+                    max(group_day_hours[group_id, o[0]] for group_id in self._session_groups(session)),
+                    room_demand[o[2]],
+                ))
+            day_idx, start_t, room_id, lecturer_id = choice
+            block = self._block_mask(day_idx, start_t, duration)
+            room_busy[room_id] |= block
+            lecturer_busy[lecturer_id] |= block
+            for group_id in self._family_groups(session):
+                group_busy[group_id] |= block
+            for group_id in self._session_groups(session):
+                group_day_hours[group_id, day_idx] += duration
+            if lecturer_id in remaining_hours:
+                remaining_hours[lecturer_id] -= duration
+            for candidate in session['rooms']:
+                room_demand[candidate] -= duration
+            if session.get('binding') is not None:
+                bound[session['binding']] = lecturer_id
+            placements[key] = choice
+            family = self._family_groups(session)
+            for other in pending:
+                candidate = level_sessions[other]
+                if (room_id in candidate['rooms'] or lecturer_id in candidate['lecturers']
+                        or family.intersection(self._session_groups(candidate))
+                        or (candidate.get('binding') is not None and candidate.get('binding') == session.get('binding'))):
+                    pending[other] = options(candidate)
+        return placements, unplaced
 
-                # C3. Lecturer Overlap
-                # Get all unique lecturers in this level
-                unique_lecturers = set(k[6] for k in vars_store.keys()) # k[6] is lecturer_id
-                
-                for lecturer_id in unique_lecturers:
-                    active_vars_lec = []
-                    for k, var in vars_store.items():
-                        if k[3] == day_idx and k[6] == lecturer_id:
-                            start_t = k[4]
-                            duration = course_sessions[k[0]][k[2]]['duration']
-                            if start_t <= t_idx < start_t + duration:
-                                active_vars_lec.append(var)
-                                
-                    # External check
-                    is_blocked_ext = False
-                    for slot in self.all_slots:
-                         if slot['day_of_week'] == day_idx and slot['lecturer_id'] == lecturer_id:
-                            slot_start_idx = self._time_to_idx(slot['start_time'])
-                            slot_end_idx = self._time_to_idx(slot['end_time'])
-                            if slot_start_idx <= t_idx < slot_end_idx:
-                                is_blocked_ext = True
-                                break
-                    
-                    if is_blocked_ext:
-                        if active_vars_lec:
-                             model.Add(sum(active_vars_lec) == 0)
-                    elif active_vars_lec:
-                        model.Add(sum(active_vars_lec) <= 1)
-
-                # C4. Group Overlap
-                unique_groups = set(k[1] for k in vars_store.keys())
-                for group_id in unique_groups:
-                    active_vars_group = []
-                    for k, var in vars_store.items():
-                        if k[3] == day_idx and k[1] == group_id:
-                            start_t = k[4]
-                            duration = course_sessions[k[0]][k[2]]['duration']
-                            if start_t <= t_idx < start_t + duration:
-                                active_vars_group.append(var)
-                    
-                    # External check (if group was used in previous level?? Unlikely given strict levels, but safe to check)
-                    # Actually, groups are usually distinct per level. But let's be safe.
-                    is_blocked_ext = False
-                    for slot in self.all_slots:
-                         if slot['day_of_week'] == day_idx and slot['group_id'] == group_id:
-                            slot_start_idx = self._time_to_idx(slot['start_time'])
-                            slot_end_idx = self._time_to_idx(slot['end_time'])
-                            if slot_start_idx <= t_idx < slot_end_idx:
-                                is_blocked_ext = True
-                                break
+    def _build_greedy_draft(self, level_sessions: List[Dict], time_limit: float, build_started: float) -> Dict:
+        """
+        Place the sessions with the greedy draft and append them to all_slots.
+        Returns statistics shaped like a solver run's; status is INCOMPLETE when some
+        sessions found no free placement, with their keys in unplaced_sessions.
+        """
+        solve_started = perf_counter()
+        placements, unplaced = self._greedy_placements(level_sessions)
+        penalty = 0
+        for session in level_sessions:
+            placement = placements.get((session['course_id'], session['group_id'], session['s_id']))
+            if placement is None: continue
+            day_idx, start_t, room_id, lecturer_id = placement
+            self._append_session_slots(session, day_idx, start_t, room_id, lecturer_id)
+            penalty += self._preference_penalty(lecturer_id, day_idx, start_t, session['duration'])
+        
+        return {
+            'engine': self.engine,
+            'profile': self.profile['name'],
+            'sessions': len(level_sessions),
+            'variables': 0,
+            'constraints': 0,
+            'build_seconds': round(solve_started - build_started, 3),
+            'time_limit_seconds': round(time_limit, 1),
+            'solve_seconds': round(perf_counter() - solve_started, 3),
+            'status': 'INCOMPLETE' if unplaced else 'FEASIBLE',
+            'objective': penalty,
+            'unplaced_sessions': [list(key) for key in unplaced],
+        }
+
+    def _build_bool_matrix_model(self, level_sessions: List[Dict], relax: Tuple[str, ...] = ()):
+        """
+        One BoolVar per (session, day, start, room, lecturer); overlaps are forbidden
+        with per-hour sums over each resource. Bound sessions drop the lecturer: their
+        BoolVars are per (session, day, start, room) and _add_bound_lecturers chooses
+        one lecturer per binding. Interchangeable sessions are ordered by the week time
+        of their chosen BoolVar (see _add_symmetry_breaking).
+        relax (see RELAXATION_STAGES) lets sessions go unplaced, use session['other_rooms']
+        or overlap a lecturer's other sessions (earlier levels' too) at a penalty per hour;
+        symmetry breaking and strengthening are left out then, since both assume the
+        hard constraints.
+        Returns (model, number of variables, extract callback).
+        """
+        model = cp_model.CpModel()
+        day_len = len(self.time_slots)
+        
+        # 2. Variables
+        # Key: (course_id, group_id, session_idx, day, start_time, room_id, lecturer_id) -> BoolVar
+        # (lecturer_id None for bound sessions). To reduce size, we will only create valid variables
+        vars_store = {} # Key -> BoolVar
+        session_meta = {} # (course_id, group_id, s_id) -> session dict
+        # Lean model: unnamed variables, described by their position in compact arrays instead
+        # of vars_store (proto variable index, index into level_sessions, week cell, room,
+        # lecturer or -1 when bound)
+        lean = self.lean_model
+        var_indexes, var_sessions, var_cells, var_rooms, var_lecturers = (array('l') for _ in range(5))
+        
+        # Bucket every var by the session it belongs to and by each
+        # (day, hour, resource) cell it covers, in the same single pass.
+        # A block starting at T with duration D covers [T, T+1, ..., T+D-1]
+        session_vars = defaultdict(list)   # (course_id, group_id, s_id) -> [var]
+        room_cover = defaultdict(list)     # (day, hour, room_id) -> [var]
+        lecturer_cover = defaultdict(list) # (day, hour, lecturer_id) -> [var]
+        group_cover = defaultdict(list)    # (day, hour, group_id) -> [var]
+        session_cover = defaultdict(list)  # (course_id, group_id, s_id, day, hour) -> [var]
+        lecturer_load = defaultdict(list)  # lecturer_id -> [(var, hours)]
+        binding_vars = defaultdict(list)   # binding -> [(var, session, day, start)]
+        objective_terms = []
+        
+        # Slots fixed by earlier levels and room availability, as one
+        # occupancy bitmap per resource; blocked cells get no variables at all
+        room_busy, lecturer_busy, group_busy = self._blocked_resources()
+        lecturer_taken = {}
+        if 'lecturer_overlap' in relax:
+            # Only unavailability still blocks a lecturer; slots taken count in the covers
+            lecturer_taken = self._build_occupancy(self.all_slots)[1]
+            lecturer_busy = self.lecturer_eligibility.unavailable
+        # Twin rooms: later sessions skip the twins earlier ones leave free. Called before
+        # any hint is read, hints are renamed to match
+        session_classes, room_excluded = self._symmetry_classes(level_sessions, room_busy) if not relax else ([], {})
+        ordered = {(s['course_id'], s['group_id'], s['s_id']) for sessions in session_classes for s in sessions}
+        start_terms = defaultdict(list)    # (course_id, group_id, s_id) -> [(var, week-time start)]
+        
+        for session_idx, session in enumerate(level_sessions):
+            course_id, group_id, s_id = session['course_id'], session['group_id'], session['s_id']
+            duration = session['duration']
+            session_meta[(course_id, group_id, s_id)] = session
+            group_blocked = self._groups_mask(group_busy, session)
+            excluded = room_excluded.get((course_id, group_id, s_id), ())
+            binding = session.get('binding')
+            # Bound sessions leave the lecturer to their binding's choice
+            lecturer_options = [None] if binding is not None else session['lecturers']
+            # Warm start: only a complete baseline placement can be hinted here
+            hint = session.get('hint')
+            if hint is not None and binding is not None:
+                hint = hint[:3] + (None,)
+            if hint is not None and None in hint[:3 if binding is not None else 4]:
+                hint = None
+            # Relaxed room type: rooms of another type are options too, at a penalty
+            other_rooms = set(session['other_rooms']) if 'room_type' in relax else set()
+            rooms = session['rooms'] + sorted(other_rooms)
+            
+            for day_idx in self._session_days(session):
+                # Time slots are 0 to 11 (07:00 to 18:00 start)
+                # Last valid start index = 12 - duration
+                for start_t in range(day_len - duration + 1):
+                    block = self._block_mask(day_idx, start_t, duration)
+                    if group_blocked & block: continue
+                    if binding is not None and all(lecturer_busy.get(l, 0) & block for l in session['lecturers']): continue
+                    covered = range(start_t, start_t + duration)
                     
-                    if is_blocked_ext:
-                        if active_vars_group: model.Add(sum(active_vars_group) == 0)
-                    elif active_vars_group:
-                        model.Add(sum(active_vars_group) <= 1)
+                    for room_id in rooms:
+                        if room_busy.get(room_id, 0) & block or room_id in excluded: continue
+                        
+                        for lecturer_id in lecturer_options:
+                            if lecturer_busy.get(lecturer_id, 0) & block: continue
+                            
+                            # Create Variable
+                            if lean:
+                                var = model.NewBoolVar('')
+                                var_indexes.append(var.Index())
+                                var_sessions.append(session_idx)
+                                var_cells.append(self._cell(day_idx, start_t))
+                                var_rooms.append(room_id)
+                                var_lecturers.append(-1 if lecturer_id is None else lecturer_id)
+                            else:
+                                var_name = f'c{course_id}_g{group_id}_s{s_id}_d{day_idx}_t{start_t}_r{room_id}_l{lecturer_id}'
+                                var = model.NewBoolVar(var_name)
+                                
+                                key = (course_id, group_id, s_id, day_idx, start_t, room_id, lecturer_id)
+                                vars_store[key] = var
+                            if hint is not None:
+                                model.AddHint(var, int((day_idx, start_t, room_id, lecturer_id) == hint))
+                            session_vars[(course_id, group_id, s_id)].append(var)
+                            if (course_id, group_id, s_id) in ordered:
+                                start_terms[(course_id, group_id, s_id)].append((var, self._cell(day_idx, start_t)))
+                            if room_id in other_rooms:
+                                objective_terms.append(RELAXATION_PENALTIES['room_type'] * duration * var)
+                            for t_idx in covered:
+                                room_cover[(day_idx, t_idx, room_id)].append(var)
+                                for covered_group in self._covered_groups(session):
+                                    group_cover[(day_idx, t_idx, covered_group)].append(var)
+                                if lecturer_id is not None:
+                                    lecturer_cover[(day_idx, t_idx, lecturer_id)].append(var)
+                                if self.strengthen_model:
+                                    session_cover[(course_id, group_id, s_id, day_idx, t_idx)].append(var)
+                            
+                            if lecturer_id is None:
+                                binding_vars[binding].append((var, session, day_idx, start_t))
+                                continue
+                            lecturer_load[lecturer_id].append((var, duration))
+                            
+                            # Soft: lecturer time-of-day preferences
+                            penalty = self._preference_penalty(lecturer_id, day_idx, start_t, duration)
+                            if penalty:
+                                objective_terms.append(penalty * var)
+        
+        # Bound sessions: one lecturer choice per binding, feeding the same covers and loads
+        bound_lecturers = self._add_bound_lecturers(
+            model, level_sessions, binding_vars, lecturer_cover, lecturer_load, lecturer_busy, objective_terms
+        )
+        
+        # 3. Constraints
+        
+        # C1. Each Session must be assigned exactly once per Group
+        for key, session in session_meta.items():
+            if 'coverage' in relax:
+                # ...or left out, at a penalty
+                unplaced = model.NewBoolVar('' if lean else f'unplaced_c{key[0]}_g{key[1]}_s{key[2]}')
+                model.AddExactlyOne(session_vars[key] + [unplaced])
+                objective_terms.append(RELAXATION_PENALTIES['coverage'] * session['duration'] * unplaced)
+                continue
+            # A session left with no unblocked placement makes the level infeasible
+            model.AddExactlyOne(session_vars[key])
+        
+        # C2. Room Capacity / Overlap
+        # C3. Lecturer Overlap
+        # C4. Group Overlap
+        hard_covers = (room_cover, group_cover) if 'lecturer_overlap' in relax else (room_cover, lecturer_cover, group_cover)
+        for cover in hard_covers:
+            for active_vars in cover.values():
+                if len(active_vars) > 1:
+                    model.AddAtMostOne(active_vars)
+        if 'lecturer_overlap' in relax:
+            # Every session beyond the first in a lecturer's hour is penalized
+            for (day_idx, t_idx, lecturer_id), active_vars in lecturer_cover.items():
+                taken = lecturer_taken.get(lecturer_id, 0) >> self._cell(day_idx, t_idx) & 1
+                if len(active_vars) + taken > 1:
+                    overlap = model.NewIntVar(0, len(active_vars) + taken - 1, '' if lean else f'overlap_l{lecturer_id}_d{day_idx}_t{t_idx}')
+                    model.Add(cp_model.LinearExpr.Sum(active_vars) + taken <= 1 + overlap)
+                    objective_terms.append(RELAXATION_PENALTIES['lecturer_overlap'] * overlap)
+        
+        # C5. Lecturer weekly hours
+        self._add_lecturer_hour_caps(model, level_sessions, lecturer_load)
+        
+        # C6. Symmetry breaking: twin room options were left out above; interchangeable
+        # sessions run in s_id order, each start being the week time of its chosen var
+        symmetry = {
+            'room_options_removed': sum(len(rooms) for rooms in room_excluded.values()),
+            'session_orderings': self._add_symmetry_breaking(model, session_classes, {
+                key: cp_model.LinearExpr.WeightedSum([var for var, _ in terms], [cell for _, cell in terms])
+                for key, terms in start_terms.items()
+            }),
+        }
+        
+        # C7. Clique cuts and redundant aggregates
+        strengthening = {} if relax else self._add_redundant_constraints(model, level_sessions, session_cover, room_busy, group_busy)
 
         # 4. Soft Constraints & Objectives
-        # Lecturer Preferences: Avoid Early Morning (07:00 at index 0) / Late Afternoon (17:00+ at index 10, 11)
+        if objective_terms:
+            model.Minimize(cp_model.LinearExpr.Sum(objective_terms))
+        
+        def extract(solver: cp_model.CpSolver):
+            chosen = self._chosen_bound_lecturers(solver, bound_lecturers)
+            if lean:
+                # Read the whole solution vector once instead of asking per variable
+                solution = solver.ResponseProto().solution
+                for position, var_index in enumerate(var_indexes):
+                    if solution[var_index]:
+                        session = level_sessions[var_sessions[position]]
+                        day_idx, start_t = divmod(var_cells[position], day_len)
+                        lecturer_id = var_lecturers[position]
+                        self._append_session_slots(
+                            session, day_idx, start_t, var_rooms[position],
+                            chosen[session['binding']] if lecturer_id < 0 else lecturer_id
+                        )
+                return {'symmetry': symmetry, 'strengthening': strengthening}
+            for k, var in vars_store.items():
+                if solver.Value(var) == 1:
+                    course_id, group_id, s_id, day_idx, start_t, room_id, lecturer_id = k
+                    session = session_meta[(course_id, group_id, s_id)]
+                    self._append_session_slots(
+                        session, day_idx, start_t, room_id,
+                        chosen[session['binding']] if lecturer_id is None else lecturer_id
+                    )
+            return {'symmetry': symmetry, 'strengthening': strengthening}
+        
+        return model, len(var_indexes) if lean else len(vars_store), extract
+
+    def _build_interval_model(self, level_sessions: List[Dict]):
+        """
+        Each session is a start variable on a week-long time axis (day * 12 + hour)
+        with one optional interval per (room, lecturer) alternative. Bound sessions have
+        room alternatives only, plus one optional interval per candidate lecturer present
+        when their binding's shared lecturer choice picks them. Rooms, lecturers and groups
+        each get a NoOverlap; slots from earlier levels become fixed intervals.
+        Returns (model, number of variables, extract callback).
+        """
+        model = cp_model.CpModel()
+        day_len = len(self.time_slots)
+        
+        room_intervals = defaultdict(list)     # room_id -> [interval]
+        lecturer_intervals = defaultdict(list) # lecturer_id -> [interval]
+        group_intervals = defaultdict(list)    # group_id -> [interval]
+        # (session, start var, [(room_id, lecturer_id or None, presence literal)], bound lecturer choice)
+        placements = []
+        lecturer_load = defaultdict(list)      # lecturer_id -> [(literal, hours)]
+        lecturer_choices = {}                  # binding -> (choice var, {lecturer_id: literal})
+        hinted_choices = set()                 # indexes of shared choice vars already hinted
         objective_terms = []
+        session_classes, _ = self._symmetry_classes(level_sessions)
         
-        for k, var in vars_store.items():
-            # k: (c, g, s, d, start_t, r, l)
-            lecturer_id = k[6]
-            start_t = k[4]
-            duration = course_sessions[k[0]][k[2]]['duration']
-            end_t = start_t + duration
-            
-            lecturer = self.db.query(Lecturer).get(lecturer_id)
-            if lecturer and lecturer.teaching_preferences:
-                prefs = lecturer.teaching_preferences
-                if isinstance(prefs, dict):
-                    # Avoid Early Morning (07:00 start)
-                    if prefs.get('avoid_early_morning') and start_t == 0:
-                        objective_terms.append(var) # Minimize this being true
-                    
-                    # Avoid Late Afternoon (Any part of session touches 17:00+ i.e. index >= 10)
-                    # 17:00 is index 10. 18:00 is index 11.
-                    if prefs.get('avoid_late_afternoon') and end_t > 10:
-                        objective_terms.append(var)
+        for session in level_sessions:
+            duration = session['duration']
+            name = self._session_name(session)
+            start = self._new_session_start(model, session, group_intervals)
+            
+            alternatives = []
+            lecturer_choice = None
+            if session.get('binding') is not None:
+                lecturer_choice, lecturer_literals = self._new_lecturer_choice(model, session, lecturer_choices)
+                for lecturer_id, chosen in lecturer_literals.items():
+                    lecturer_intervals[lecturer_id].append(model.NewOptionalIntervalVar(
+                        start, duration, start + duration, chosen, f'iv_{name}_l{lecturer_id}'
+                    ))
+                    lecturer_load[lecturer_id].append((chosen, duration))
+                for room_id in session['rooms']:
+                    present = model.NewBoolVar(f'{name}_r{room_id}')
+                    room_intervals[room_id].append(model.NewOptionalIntervalVar(
+                        start, duration, start + duration, present, f'iv_{name}_r{room_id}'
+                    ))
+                    alternatives.append((room_id, None, present))
+            
+            for room_id in session['rooms'] if lecturer_choice is None else ():
+                for lecturer_id in session['lecturers']:
+                    present = model.NewBoolVar(f'{name}_r{room_id}_l{lecturer_id}')
+                    interval = model.NewOptionalIntervalVar(
+                        start, duration, start + duration, present, f'iv_{name}_r{room_id}_l{lecturer_id}'
+                    )
+                    room_intervals[room_id].append(interval)
+                    lecturer_intervals[lecturer_id].append(interval)
+                    lecturer_load[lecturer_id].append((present, duration))
+                    alternatives.append((room_id, lecturer_id, present))
+            
+            # C1. Each Session must be assigned exactly once per Group
+            model.AddExactlyOne(present for _, _, present in alternatives)
+            placements.append((session, start, alternatives, lecturer_choice))
+            
+            # Warm start from the baseline timetable
+            if session.get('hint'):
+                day_idx, start_t, hint_room, hint_lecturer = session['hint']
+                model.AddHint(start, self._cell(day_idx, start_t))
+                if lecturer_choice is not None:
+                    if hint_lecturer in lecturer_literals and lecturer_choice.Index() not in hinted_choices:
+                        hinted_choices.add(lecturer_choice.Index())
+                        model.AddHint(lecturer_choice, hint_lecturer)
+                        for lecturer_id, chosen in lecturer_literals.items():
+                            model.AddHint(chosen, int(lecturer_id == hint_lecturer))
+                    hint_lecturer = None
+                if hint_room is not None and (hint_lecturer is not None or lecturer_choice is not None):
+                    for room_id, lecturer_id, present in alternatives:
+                        model.AddHint(present, int((room_id, lecturer_id) == (hint_room, hint_lecturer)))
+            
+            # Soft: lecturer time-of-day preferences
+            if lecturer_choice is not None:
+                uses_lecturer = lecturer_literals
+            else:
+                uses_lecturer = {
+                    lecturer_id: cp_model.LinearExpr.Sum([p for _, l, p in alternatives if l == lecturer_id])
+                    for lecturer_id in session['lecturers']
+                }
+            objective_terms.extend(self._interval_preference_terms(model, name, start, duration, uses_lecturer))
+        
+        # C2. Room Overlap / C3. Lecturer Overlap / C4. Group Overlap
+        self._add_resource_no_overlaps(model, room_intervals, lecturer_intervals, group_intervals)
+        
+        # C5. Lecturer weekly hours
+        self._add_lecturer_hour_caps(model, level_sessions, lecturer_load)
+        
+        # C6. Symmetry breaking
+        symmetry = {'session_orderings': self._add_symmetry_breaking(model, session_classes, {
+            (s['course_id'], s['group_id'], s['s_id']): start for s, start, _, _ in placements
+        })}
+        
+        if objective_terms:
+            model.Minimize(cp_model.LinearExpr.Sum(objective_terms))
+        
+        def extract(solver: cp_model.CpSolver):
+            for session, start, alternatives, lecturer_choice in placements:
+                day_idx, start_t = divmod(solver.Value(start), day_len)
+                for room_id, lecturer_id, present in alternatives:
+                    if solver.BooleanValue(present):
+                        if lecturer_id is None:
+                            lecturer_id = solver.Value(lecturer_choice)
+                        self._append_session_slots(session, day_idx, start_t, room_id, lecturer_id)
+                        break
+            return {'symmetry': symmetry}
+        
+        return model, len(model.Proto().variables), extract
 
+    def _build_factorized_model(self, level_sessions: List[Dict]):
+        """
+        Each session gets separate start-time, room-choice and lecturer-choice variables.
+        Room and lecturer choices are channeled to one presence literal per candidate,
+        and each literal owns an optional interval sharing the session's start, so the
+        variable count grows with rooms + lecturers instead of rooms * lecturers * times.
+        Bound sessions share their binding's lecturer choice.
+        Returns (model, number of variables, extract callback).
+        """
+        model = cp_model.CpModel()
+        day_len = len(self.time_slots)
+        
+        room_intervals = defaultdict(list)     # room_id -> [interval]
+        lecturer_intervals = defaultdict(list) # lecturer_id -> [interval]
+        group_intervals = defaultdict(list)    # group_id -> [interval]
+        placements = []  # (session, start var, room choice var, lecturer choice var)
+        lecturer_load = defaultdict(list)      # lecturer_id -> [(literal, hours)]
+        lecturer_choices = {}                  # binding -> (choice var, {lecturer_id: literal})
+        hinted_choices = set()                 # indexes of shared choice vars already hinted
+        objective_terms = []
+        session_classes, _ = self._symmetry_classes(level_sessions)
+        
+        for session in level_sessions:
+            duration = session['duration']
+            name = self._session_name(session)
+            start = self._new_session_start(model, session, group_intervals)
+            
+            room_choice, room_literals = self._new_channeled_choice(model, f'room_{name}', session['rooms'])
+            for room_id, chosen in room_literals.items():
+                room_intervals[room_id].append(model.NewOptionalIntervalVar(
+                    start, duration, start + duration, chosen, f'iv_{name}_r{room_id}'
+                ))
+            
+            lecturer_choice, lecturer_literals = self._new_lecturer_choice(model, session, lecturer_choices)
+            for lecturer_id, chosen in lecturer_literals.items():
+                lecturer_intervals[lecturer_id].append(model.NewOptionalIntervalVar(
+                    start, duration, start + duration, chosen, f'iv_{name}_l{lecturer_id}'
+                ))
+                lecturer_load[lecturer_id].append((chosen, duration))
+            
+            placements.append((session, start, room_choice, lecturer_choice))
+            
+            # Warm start from the baseline timetable
+            if session.get('hint'):
+                day_idx, start_t, hint_room, hint_lecturer = session['hint']
+                model.AddHint(start, self._cell(day_idx, start_t))
+                for choice, literals, hinted_id in (
+                    (room_choice, room_literals, hint_room),
+                    (lecturer_choice, lecturer_literals, hint_lecturer),
+                ):
+                    if hinted_id is None or choice.Index() in hinted_choices: continue
+                    hinted_choices.add(choice.Index())
+                    model.AddHint(choice, hinted_id)
+                    for candidate_id, chosen in literals.items():
+                        model.AddHint(chosen, int(candidate_id == hinted_id))
+            
+            # Soft: lecturer time-of-day preferences
+            objective_terms.extend(self._interval_preference_terms(model, name, start, duration, lecturer_literals))
+        
+        # C2. Room Overlap / C3. Lecturer Overlap / C4. Group Overlap
+        self._add_resource_no_overlaps(model, room_intervals, lecturer_intervals, group_intervals)
+        
+        # C5. Lecturer weekly hours
+        self._add_lecturer_hour_caps(model, level_sessions, lecturer_load)
+        
+        # C6. Symmetry breaking
+        symmetry = {'session_orderings': self._add_symmetry_breaking(model, session_classes, {
+            (s['course_id'], s['group_id'], s['s_id']): start for s, start, _, _ in placements
+        })}
+        
         if objective_terms:
-            model.Minimize(sum(objective_terms))
+            model.Minimize(cp_model.LinearExpr.Sum(objective_terms))
+        
+        def extract(solver: cp_model.CpSolver):
+            for session, start, room_choice, lecturer_choice in placements:
+                day_idx, start_t = divmod(solver.Value(start), day_len)
+                self._append_session_slots(
+                    session, day_idx, start_t, solver.Value(room_choice), solver.Value(lecturer_choice)
+                )
+            return {'symmetry': symmetry}
+        
+        return model, len(model.Proto().variables), extract
 
-        # 5. Solve
-        self.send_progress(level, 'solving', progress_start + 60, f'Solving constraints for Level {level}...')
-        solver = cp_model.CpSolver()
-        solver.parameters.max_time_in_seconds = 300
+    def _build_two_phase_model(self, level_sessions: List[Dict], time_limit: float):
+        """
+        Phase 1: one BoolVar per (session, day, start, lecturer), with rooms reduced to
+        counts: in every hour, the sessions confined to a set of eligible rooms may not
+        outnumber the free rooms of that set. Bound sessions drop the lecturer as in
+        bool_matrix. Phase 2 (at extraction) gives each placed session a concrete room
+        with assign_rooms.
+        Returns (model, number of variables, extract callback).
+        """
+        model = cp_model.CpModel()
+        day_len = len(self.time_slots)
         
-        status = solver.Solve(model)
+        vars_store = {}  # (course_id, group_id, s_id, day, start, lecturer_id or None) -> BoolVar
+        session_meta = {}  # (course_id, group_id, s_id) -> session dict
+        session_vars = defaultdict(list)
+        lecturer_cover = defaultdict(list)  # (day, hour, lecturer_id) -> [var]
+        group_cover = defaultdict(list)     # (day, hour, group_id) -> [var]
+        class_cover = defaultdict(list)     # (day, hour, frozenset of rooms) -> [var]
+        lecturer_load = defaultdict(list)
+        binding_vars = defaultdict(list)    # binding -> [(var, session, day, start)]
+        objective_terms = []
         
-        if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
-            self.send_progress(level, 'extracting', progress_start + 90, 'solution found! processing...')
+        session_cover = defaultdict(list)   # (course_id, group_id, s_id, day, hour) -> [var]
+        
+        room_busy, lecturer_busy, group_busy = self._blocked_resources()
+        containing = self._room_classes(level_sessions)
+        
+        for session in level_sessions:
+            course_id, group_id, s_id = session['course_id'], session['group_id'], session['s_id']
+            duration = session['duration']
+            session_meta[(course_id, group_id, s_id)] = session
+            group_blocked = self._groups_mask(group_busy, session)
+            classes = containing[frozenset(session['rooms'])]
+            binding = session.get('binding')
+            lecturer_options = [None] if binding is not None else session['lecturers']
+            hint = session.get('hint')
+            if hint is not None and binding is not None:
+                hint = hint[:3] + (None,)
+            if hint is not None and (hint[0] is None or (hint[3] is None and binding is None)):
+                hint = None
             
-            # Extract
-            for k, var in vars_store.items():
-                if solver.Value(var) == 1:
-                    course_id, group_id, s_id, day_idx, start_t, room_id, lecturer_id = k
-                    session_meta = course_sessions[course_id][s_id]
-                    duration = session_meta['duration']
+            for day_idx in self._session_days(session):
+                for start_t in range(day_len - duration + 1):
+                    block = self._block_mask(day_idx, start_t, duration)
+                    if group_blocked & block: continue
+                    # Some eligible room must be free for the whole block
+                    if all(room_busy.get(room_id, 0) & block for room_id in session['rooms']): continue
+                    if binding is not None and all(lecturer_busy.get(l, 0) & block for l in session['lecturers']): continue
+                    covered = range(start_t, start_t + duration)
                     
-                    # Create slot for each hour of the block (to match DB structure)
-                    for i in range(duration):
-                        current_t = start_t + i
-                        slot_data = {
-                            'course_id': course_id,
-                            'lecturer_id': lecturer_id,
-                            'room_id': room_id,
-                            'group_id': group_id,
-                            'day': self.days[day_idx],
-                            'day_of_week': day_idx,
-                            'start_time': self.time_slots[current_t][0],
-                            'end_time': self.time_slots[current_t][1],
-                            'session_type': session_meta['type']
-                        }
-                        self.all_slots.append(slot_data)
-            return True
-        else:
-            return False
+                    for lecturer_id in lecturer_options:
+                        if lecturer_busy.get(lecturer_id, 0) & block: continue
+                        
+                        var = model.NewBoolVar(f'c{course_id}_g{group_id}_s{s_id}_d{day_idx}_t{start_t}_l{lecturer_id}')
+                        vars_store[(course_id, group_id, s_id, day_idx, start_t, lecturer_id)] = var
+                        if hint is not None:
+                            model.AddHint(var, int((day_idx, start_t, lecturer_id) == (hint[0], hint[1], hint[3])))
+                        session_vars[(course_id, group_id, s_id)].append(var)
+                        for t_idx in covered:
+                            if lecturer_id is not None:
+                                lecturer_cover[(day_idx, t_idx, lecturer_id)].append(var)
+                            for covered_group in self._covered_groups(session):
+                                group_cover[(day_idx, t_idx, covered_group)].append(var)
+                            session_cover[(course_id, group_id, s_id, day_idx, t_idx)].append(var)
+                            for room_class in classes:
+                                class_cover[(day_idx, t_idx, room_class)].append(var)
+                        if lecturer_id is None:
+                            binding_vars[binding].append((var, session, day_idx, start_t))
+                            continue
+                        lecturer_load[lecturer_id].append((var, duration))
+                        
+                        penalty = self._preference_penalty(lecturer_id, day_idx, start_t, duration)
+                        if penalty:
+                            objective_terms.append(penalty * var)
+        
+        bound_lecturers = self._add_bound_lecturers(
+            model, level_sessions, binding_vars, lecturer_cover, lecturer_load, lecturer_busy, objective_terms
+        )
+        
+        for key in session_meta:
+            model.AddExactlyOne(session_vars[key])
+        
+        for cover in (lecturer_cover, group_cover):
+            for active_vars in cover.values():
+                if len(active_vars) > 1:
+                    model.AddAtMostOne(active_vars)
+        
+        # Aggregate room capacity per hour and room class
+        for (day_idx, t_idx, room_class), active_vars in class_cover.items():
+            cell = 1 << self._cell(day_idx, t_idx)
+            free_rooms = sum(1 for room_id in room_class if not room_busy.get(room_id, 0) & cell)
+            if len(active_vars) > free_rooms:
+                model.Add(cp_model.LinearExpr.Sum(active_vars) <= free_rooms)
+        
+        self._add_lecturer_hour_caps(model, level_sessions, lecturer_load)
+        # Room classes are already counted above
+        strengthening = self._add_redundant_constraints(
+            model, level_sessions, session_cover, room_busy, group_busy, room_classes=False
+        )
+        
+        if objective_terms:
+            model.Minimize(cp_model.LinearExpr.Sum(objective_terms))
+        
+        def extract(solver: cp_model.CpSolver):
+            # A day whose rooms cannot be assigned is cut off (that day's combination of
+            # placements may not recur) and phase 1 is solved again, a few times at most,
+            # within what the first solve left of the level's time limit
+            first_solve_seconds, resolved, resolve_seconds = solver.WallTime(), False, 0.0
+            for cuts in range(MAX_ROOM_CUTS + 1):
+                chosen = [k for k, var in vars_store.items() if solver.Value(var) == 1]
+                requests = [
+                    ((course_id, group_id, s_id), day_idx, start_t,
+                     session_meta[(course_id, group_id, s_id)]['duration'],
+                     session_meta[(course_id, group_id, s_id)]['rooms'])
+                    for course_id, group_id, s_id, day_idx, start_t, _ in chosen
+                ]
+                rooms, room_stats = assign_rooms(
+                    requests, room_busy, day_len, max(time_limit / 10, 1.0), self.profile['num_search_workers']
+                )
+                room_stats['cuts'] = cuts
+                if rooms is not None:
+                    break
+                left = time_limit - first_solve_seconds - resolve_seconds
+                if left < 1.0:
+                    break
+                model.AddBoolOr([vars_store[k].Not() for k in chosen if k[3] == room_stats['failed_day']])
+                solver = cp_model.CpSolver()
+                configure_solver(solver, self.profile, min(max(time_limit / 10, 1.0), left))
+                status = solver.Solve(model)
+                resolved, resolve_seconds = True, resolve_seconds + solver.WallTime()
+                if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+                    break
+            # The re-solves count as solve time; the final solver's result is the one reported
+            stats = {'room_assignment': room_stats, 'strengthening': strengthening,
+                     'resolve_seconds': round(resolve_seconds, 3)}
+            if rooms is None:
+                return dict(stats, status='ROOM_ASSIGNMENT_FAILED')
+            if resolved:
+                stats.update(status=solver.StatusName(status), objective=solver.ObjectiveValue())
+            bound = self._chosen_bound_lecturers(solver, bound_lecturers)
+            for course_id, group_id, s_id, day_idx, start_t, lecturer_id in chosen:
+                key = (course_id, group_id, s_id)
+                if lecturer_id is None:
+                    lecturer_id = bound[session_meta[key]['binding']]
+                self._append_session_slots(session_meta[key], day_idx, start_t, rooms[key], lecturer_id)
+            return stats
+        
+        return model, len(vars_store), extract
+
+    def _room_classes(self, level_sessions: List[Dict]) -> Dict[frozenset, List[frozenset]]:
+        """
+        Room classes are the distinct sets of eligible rooms, plus the union of all rooms.
+        Returns each session room set -> every class it falls inside.
+        """
+        room_classes = {frozenset(session['rooms']) for session in level_sessions}
+        room_classes.add(frozenset(room_id for session in level_sessions for room_id in session['rooms']))
+        return {
+            rooms: [room_class for room_class in room_classes if rooms <= room_class]
+            for rooms in room_classes
+        }
+
+    def _add_redundant_constraints(self, model: cp_model.CpModel, level_sessions: List[Dict],
+                                   session_cover: Dict[Tuple, List], room_busy: Dict[int, int],
+                                   group_busy: Dict[int, int], room_classes: bool = True) -> Dict[str, int]:
+        """
+        Strengthen a per-hour boolean model without removing any solution:
+        - clique cuts: every hour, at most one session of each conflict-graph clique that
+          no single group, lecturer or room covers by itself
+        - per group and day, no more hours than the group has free that day
+        - per hour and room class, no more sessions confined to the class than it has free rooms
+        session_cover maps (course_id, group_id, s_id, day, hour) to the vars covering that cell.
+        Returns how many constraints of each kind were added.
+        """
+        if not self.strengthen_model:
+            return {}
+        day_len = len(self.time_slots)
+        cells = [(day_idx, t_idx) for day_idx in range(len(self.days)) for t_idx in range(day_len)]
+        keys = [(session['course_id'], session['group_id'], session['s_id']) for session in level_sessions]
+        added = {'clique_cuts': 0, 'group_day_bounds': 0, 'room_class_bounds': 0}
+        
+        for clique in conflict_cliques(level_sessions):
+            for day_idx, t_idx in cells:
+                literals = [var for idx in clique for var in session_cover.get((*keys[idx], day_idx, t_idx), [])]
+                if len(literals) > 1:
+                    model.AddAtMostOne(literals)
+                    added['clique_cuts'] += 1
+        
+        # A var appears once per hour it covers, so these sums count hours
+        keys_by_group = defaultdict(list)
+        for session, key in zip(level_sessions, keys):
+            for group_id in self._covered_groups(session):
+                keys_by_group[group_id].append(key)
+        day_mask = (1 << day_len) - 1
+        for group_id, group_keys in keys_by_group.items():
+            for day_idx in range(len(self.days)):
+                free_hours = day_len - bin(group_busy.get(group_id, 0) >> self._cell(day_idx, 0) & day_mask).count('1')
+                literals = [
+                    var for key in group_keys for t_idx in range(day_len)
+                    for var in session_cover.get((*key, day_idx, t_idx), [])
+                ]
+                if len(literals) > free_hours:
+                    model.Add(cp_model.LinearExpr.Sum(literals) <= free_hours)
+                    added['group_day_bounds'] += 1
+        
+        if room_classes:
+            class_cover = defaultdict(list)  # (day, hour, room class) -> [var]
+            containing = self._room_classes(level_sessions)
+            for session, key in zip(level_sessions, keys):
+                # A one-room class repeats that room's own constraint
+                classes = [c for c in containing[frozenset(session['rooms'])] if len(c) > 1]
+                for day_idx, t_idx in cells:
+                    literals = session_cover.get((*key, day_idx, t_idx))
+                    if not literals: continue
+                    for room_class in classes:
+                        class_cover[(day_idx, t_idx, room_class)].extend(literals)
+            for (day_idx, t_idx, room_class), literals in class_cover.items():
+                cell = 1 << self._cell(day_idx, t_idx)
+                free_rooms = sum(1 for room_id in room_class if not room_busy.get(room_id, 0) & cell)
+                if len(literals) > free_rooms:
+                    model.Add(cp_model.LinearExpr.Sum(literals) <= free_rooms)
+                    added['room_class_bounds'] += 1
+        return added
+
+    def _symmetry_classes(self, level_sessions: List[Dict],
+                          room_busy: Dict[int, int] = None) -> Tuple[List[List[Dict]], Dict[Tuple, set]]:
+        """
+        Interchangeable sessions (same course, group, type, duration and candidate rooms,
+        lecturers and days) and interchangeable rooms (same occupancy, wanted by exactly the
+        same sessions, as twin rooms of one category and capacity are). Rooms are only
+        compared when room_busy is given. Of n twin rooms, the k-th session that may use them
+        only needs the first k: any solution can rename twins in order of first use.
+        Hints are permuted to follow both orderings, so a warm start stays feasible; call
+        this before the model reads them.
+        Returns (classes of 2+ sessions in s_id order, session key -> rooms it can skip).
+        """
+        if not self.break_symmetry:
+            return [], {}
+        
+        by_signature = defaultdict(list)
+        for session in level_sessions:
+            by_signature[(
+                session['course_id'], session['group_id'], session['type'], session['duration'],
+                tuple(session['rooms']), tuple(session['lecturers']), tuple(self._session_days(session)),
+            )].append(session)
+        session_classes = []
+        for sessions in by_signature.values():
+            if len(sessions) < 2: continue
+            sessions.sort(key=lambda s: s['s_id'])
+            hints = [session.get('hint') for session in sessions]
+            if None not in hints:
+                for session, hint in zip(sessions, sorted(hints, key=lambda h: (h[0], h[1]))):
+                    session['hint'] = hint
+            session_classes.append(sessions)
+        
+        room_excluded = defaultdict(set)
+        if room_busy is None:
+            return session_classes, room_excluded
+        wanted_by = defaultdict(list)  # room_id -> indexes of the sessions that may use it
+        for idx, session in enumerate(level_sessions):
+            for room_id in session['rooms']:
+                wanted_by[room_id].append(idx)
+        by_usage = defaultdict(list)
+        for room_id in sorted(wanted_by):
+            by_usage[(tuple(wanted_by[room_id]), room_busy.get(room_id, 0))].append(room_id)
+        
+        for (users, _), rooms in by_usage.items():
+            if len(rooms) < 2: continue
+            renamed = {}  # hinted room -> twin it becomes, in order of first use
+            for position, idx in enumerate(users):
+                session = level_sessions[idx]
+                room_excluded[(session['course_id'], session['group_id'], session['s_id'])].update(rooms[position + 1:])
+                hint = session.get('hint')
+                if hint and hint[2] in rooms:
+                    if hint[2] not in renamed:
+                        renamed[hint[2]] = rooms[len(renamed)]
+                    session['hint'] = (hint[0], hint[1], renamed[hint[2]], hint[3])
+        return session_classes, room_excluded
+
+    def _add_symmetry_breaking(self, model: cp_model.CpModel, session_classes: List[List[Dict]],
+                               session_starts: Dict[Tuple, object]) -> int:
+        """
+        Interchangeable sessions must run in s_id order, each ending before the next one
+        starts; this only discards permutations of solutions, never a whole solution.
+        session_starts maps session keys to week-time start expressions (day * 12 + hour).
+        Returns the number of orderings added.
+        """
+        orderings = 0
+        for sessions in session_classes:
+            for earlier, later in zip(sessions, sessions[1:]):
+                first = session_starts.get((earlier['course_id'], earlier['group_id'], earlier['s_id']))
+                second = session_starts.get((later['course_id'], later['group_id'], later['s_id']))
+                # A session without a single placement option leaves nothing to order
+                if first is None or second is None: continue
+                model.Add(first + earlier['duration'] <= second)
+                orderings += 1
+        return orderings
+
+    def _session_name(self, session: Dict) -> str:
+        return f"c{session['course_id']}_g{session['group_id']}_s{session['s_id']}"
+
+    def _session_days(self, session: Dict):
+        """Days a session may be placed on; coarse-to-fine solving pins it to one"""
+        return session.get('days') or range(len(self.days))
+
+    def _new_session_start(self, model: cp_model.CpModel, session: Dict, group_intervals: Dict[int, List]):
+        """
+        Week-time start variable for a session. A block may start at any hour that lets
+        it finish on the same day; its groups always attend, so the group interval is mandatory.
+        """
+        day_len = len(self.time_slots)
+        duration = session['duration']
+        name = self._session_name(session)
+        
+        start = model.NewIntVarFromDomain(
+            cp_model.Domain.FromIntervals([
+                [day_idx * day_len, day_idx * day_len + day_len - duration]
+                for day_idx in self._session_days(session)
+            ]),
+            f'start_{name}'
+        )
+        interval = model.NewIntervalVar(start, duration, start + duration, f'iv_{name}')
+        for group_id in self._covered_groups(session):
+            group_intervals[group_id].append(interval)
+        return start
+
+    def _new_channeled_choice(self, model: cp_model.CpModel, name: str, candidate_ids: List[int]):
+        """
+        Integer choice over candidate ids plus one literal per candidate, channeled so that
+        literal <=> (choice == id). Returns (choice var, {candidate_id: literal}).
+        """
+        choice = model.NewIntVarFromDomain(cp_model.Domain.FromValues(candidate_ids), name)
+        literals = {}
+        for candidate_id in candidate_ids:
+            chosen = model.NewBoolVar(f'{name}_is_{candidate_id}')
+            model.Add(choice == candidate_id).OnlyEnforceIf(chosen)
+            model.Add(choice != candidate_id).OnlyEnforceIf(chosen.Not())
+            literals[candidate_id] = chosen
+        model.AddExactlyOne(literals.values())
+        return choice, literals
+
+    def _new_lecturer_choice(self, model: cp_model.CpModel, session: Dict, lecturer_choices: Dict[Tuple, Tuple]):
+        """
+        Channeled lecturer choice for a session; all sessions of a binding share one,
+        kept in lecturer_choices. Returns (choice var, {lecturer_id: literal}).
+        """
+        key = session.get('binding') or (session['course_id'], session['group_id'], session['s_id'])
+        if key not in lecturer_choices:
+            name = 'bind_' + '_'.join(map(str, key)) if session.get('binding') else self._session_name(session)
+            lecturer_choices[key] = self._new_channeled_choice(model, f'lecturer_{name}', session['lecturers'])
+        return lecturer_choices[key]
+
+    def _add_resource_no_overlaps(self, model: cp_model.CpModel, room_intervals: Dict[int, List],
+                                  lecturer_intervals: Dict[int, List], group_intervals: Dict[int, List]):
+        """NoOverlap per room, lecturer and group, including slots fixed by earlier levels"""
+        room_busy, lecturer_busy, group_busy = self._blocked_resources()
+        
+        for intervals, busy in (
+            (room_intervals, room_busy),
+            (lecturer_intervals, lecturer_busy),
+            (group_intervals, group_busy),
+        ):
+            for resource_id, resource_intervals in intervals.items():
+                fixed = [
+                    model.NewFixedSizeIntervalVar(run_start, run_length, '')
+                    for run_start, run_length in self._busy_runs(busy.get(resource_id, 0))
+                ]
+                if len(resource_intervals) + len(fixed) > 1:
+                    model.AddNoOverlap(resource_intervals + fixed)
+
+    def _add_lecturer_hour_caps(self, model: cp_model.CpModel, level_sessions: List[Dict],
+                                lecturer_load: Dict[int, List[Tuple]]):
+        """
+        Keep each lecturer within max_hours_per_week, counting hours already taken
+        by earlier levels. Only lecturers who could actually exceed it get a constraint.
+        """
+        remaining_hours = self._remaining_lecturer_hours()
+        potential_hours = defaultdict(int)
+        for session in level_sessions:
+            for lecturer_id in session['lecturers']:
+                potential_hours[lecturer_id] += session['duration']
+        
+        for lecturer_id, load in lecturer_load.items():
+            if lecturer_id in remaining_hours and potential_hours[lecturer_id] > remaining_hours[lecturer_id]:
+                model.Add(
+                    cp_model.LinearExpr.WeightedSum([literal for literal, _ in load], [hours for _, hours in load])
+                    <= remaining_hours[lecturer_id]
+                )
+
+    def _add_bound_lecturers(self, model: cp_model.CpModel, level_sessions: List[Dict],
+                             binding_vars: Dict[Tuple, List[Tuple]], lecturer_cover: Dict[Tuple, List],
+                             lecturer_load: Dict[int, List[Tuple]], lecturer_busy: Dict[int, int],
+                             objective_terms: List) -> Dict[Tuple, Dict[int, object]]:
+        """
+        Lecturer choice for the per-hour boolean models' bound sessions, whose variables
+        (listed per binding as (var, session, day, start)) carry no lecturer. A binding with
+        one candidate feeds its variables straight into that lecturer's covers, load and
+        preferences. Otherwise one literal per candidate picks the lecturer, and:
+        - hours the lecturer cannot teach are closed to the binding while they are picked
+        - a lecturer several bindings may pick teaches an hour for a binding only if picked
+          and the binding uses the hour, so the usual per-hour cover applies
+        - the binding's hours count against the picked lecturer's weekly cap
+        - preference penalties count for the picked lecturer only
+        Returns binding -> {lecturer_id: literal, None for a sole candidate}.
+        """
+        candidates = {}
+        binding_hours = defaultdict(int)
+        bindings_of = defaultdict(set)  # lecturer_id -> bindings that may pick them
+        hinted = defaultdict(list)
+        for session in level_sessions:
+            binding = session.get('binding')
+            if binding is None:
+                for lecturer_id in session['lecturers']:
+                    bindings_of[lecturer_id].add(None)
+                continue
+            candidates[binding] = session['lecturers']
+            binding_hours[binding] += session['duration']
+            for lecturer_id in session['lecturers']:
+                bindings_of[lecturer_id].add(binding)
+            if session.get('hint') and session['hint'][3] in session['lecturers']:
+                hinted[binding].append(session['hint'][3])
+        
+        choices = {}
+        for binding, placed in binding_vars.items():
+            lecturers = candidates[binding]
+            if len(lecturers) == 1:
+                lecturer_id = lecturers[0]
+                choices[binding] = {lecturer_id: None}
+                for var, session, day_idx, start_t in placed:
+                    for t_idx in range(start_t, start_t + session['duration']):
+                        lecturer_cover[(day_idx, t_idx, lecturer_id)].append(var)
+                    lecturer_load[lecturer_id].append((var, session['duration']))
+                    penalty = self._preference_penalty(lecturer_id, day_idx, start_t, session['duration'])
+                    if penalty:
+                        objective_terms.append(penalty * var)
+                continue
+            
+            name = 'bind_' + '_'.join(map(str, binding))
+            picked = {lecturer_id: model.NewBoolVar(f'{name}_l{lecturer_id}') for lecturer_id in lecturers}
+            model.AddExactlyOne(picked.values())
+            choices[binding] = picked
+            if hinted[binding]:
+                # The lecturer most of the binding's hints agree on
+                favourite = max(set(hinted[binding]), key=hinted[binding].count)
+                for lecturer_id, literal in picked.items():
+                    model.AddHint(literal, int(lecturer_id == favourite))
+            
+            cover = defaultdict(list)  # (day, hour) -> [var] of the binding
+            for var, session, day_idx, start_t in placed:
+                for t_idx in range(start_t, start_t + session['duration']):
+                    cover[(day_idx, t_idx)].append(var)
+            
+            for lecturer_id, literal in picked.items():
+                lecturer_load[lecturer_id].append((literal, binding_hours[binding]))
+                busy = lecturer_busy.get(lecturer_id, 0)
+                shared = len(bindings_of[lecturer_id]) > 1
+                for (day_idx, t_idx), active in cover.items():
+                    if busy >> self._cell(day_idx, t_idx) & 1:
+                        model.Add(cp_model.LinearExpr.Sum(active) + literal <= 1)
+                    elif shared:
+                        teaching = model.NewBoolVar(f'{name}_l{lecturer_id}_d{day_idx}_t{t_idx}')
+                        model.Add(cp_model.LinearExpr.Sum(active) + literal - 1 <= teaching)
+                        lecturer_cover[(day_idx, t_idx, lecturer_id)].append(teaching)
+                
+                penalized = [
+                    (var, self._preference_penalty(lecturer_id, day_idx, start_t, session['duration']))
+                    for var, session, day_idx, start_t in placed
+                ]
+                penalized = [(var, penalty) for var, penalty in penalized if penalty]
+                if penalized:
+                    # cost >= the penalties of the binding's placements while this lecturer is picked
+                    worst = sum(penalty for _, penalty in penalized)
+                    cost = model.NewIntVar(0, worst, f'{name}_l{lecturer_id}_penalty')
+                    model.Add(cost >= cp_model.LinearExpr.WeightedSum(
+                        [var for var, _ in penalized], [penalty for _, penalty in penalized]
+                    ) - worst + worst * literal)
+                    objective_terms.append(cost)
+        return choices
+
+    def _chosen_bound_lecturers(self, solver: cp_model.CpSolver, choices: Dict[Tuple, Dict[int, object]]) -> Dict[Tuple, int]:
+        """binding -> the lecturer the solver picked for it"""
+        return {
+            binding: next(l for l, literal in picked.items() if literal is None or solver.BooleanValue(literal))
+            for binding, picked in choices.items()
+        }
+
+    def _remaining_lecturer_hours(self) -> Dict[int, int]:
+        """Weekly teaching hours each lecturer has left after the slots already generated"""
+        # A slot covers [start, end), which stored slots may give as several hours. A shared
+        # session has a slot per group, but the lecturer teaches it once
+        used_hours = defaultdict(set)  # lecturer_id -> (day, hour, course_id) of the hours taught
+        for slot in self.all_slots:
+            used_hours[slot['lecturer_id']].update(
+                (slot['day_of_week'], t_idx, slot['course_id'])
+                for t_idx in range(self._time_to_idx(slot['start_time']), self._time_to_idx(slot['end_time']))
+            )
+        return {
+            lecturer_id: max(max_hours - len(used_hours[lecturer_id]), 0)
+            for lecturer_id, max_hours in self.lecturer_eligibility.max_hours.items()
+        }
+
+    def _interval_preference_terms(self, model: cp_model.CpModel, name: str, start, duration: int,
+                                   uses_lecturer: Dict[int, object]) -> List:
+        """
+        Penalty literals for a session whose chosen lecturer dislikes its time of day or day.
+        uses_lecturer maps each candidate lecturer to a 0/1 expression that is 1 when they teach it.
+        """
+        day_len = len(self.time_slots)
+        terms = []
+        hour = None
+        day = None
+        outside = {}  # preference -> literal, false forces the block to respect it
+        
+        for lecturer_id, teaches in uses_lecturer.items():
+            prefs = self.lecturer_eligibility.preferences.get(lecturer_id) or {}
+            preferred_days = self.lecturer_eligibility.preferred_days.get(lecturer_id)
+            
+            wanted = [key for key in ('avoid_early_morning', 'avoid_late_afternoon') if prefs.get(key)]
+            if preferred_days:
+                wanted.append(('preferred_days', tuple(sorted(preferred_days))))
+            
+            for key in wanted:
+                if key not in outside:
+                    if hour is None:
+                        # Day and hour of the day the block starts at (hour 0 = 07:00)
+                        hour = model.NewIntVar(0, day_len - duration, f'hour_{name}')
+                        day = model.NewIntVar(0, len(self.days) - 1, f'day_{name}')
+                        model.Add(start == day * day_len + hour)
+                    literal = model.NewBoolVar(f'{key}_{name}' if isinstance(key, str) else f'offday_{name}')
+                    if key == 'avoid_early_morning':
+                        # Avoid Early Morning (07:00 start)
+                        model.Add(hour >= 1).OnlyEnforceIf(literal.Not())
+                    elif key == 'avoid_late_afternoon':
+                        # Avoid Late Afternoon (Any part of session touches 17:00+ i.e. index >= 10)
+                        model.Add(hour + duration <= 10).OnlyEnforceIf(literal.Not())
+                    else:
+                        # Teach on one of the lecturer's preferred days
+                        model.AddLinearExpressionInDomain(
+                            day, cp_model.Domain.FromValues(list(key[1]))
+                        ).OnlyEnforceIf(literal.Not())
+                    outside[key] = literal
+                
+                # Only counts when this lecturer is the one teaching the session
+                penalty = model.NewBoolVar(f'pen_{name}_l{lecturer_id}_{len(terms)}')
+                model.Add(penalty >= teaches + outside[key] - 1)
+                terms.append(penalty)
+        
+        return terms
+
+    def _cell(self, day_idx: int, t_idx: int) -> int:
+        """Bit position of a (day, hour) cell in a weekly occupancy bitmap"""
+        return day_idx * len(self.time_slots) + t_idx
+
+    def _build_occupancy(self, slots: List[Dict]) -> Tuple[Dict[int, int], Dict[int, int], Dict[int, int]]:
+        """
+        Turn already scheduled slots into per-resource weekly bitmaps.
+        Returns (room_busy, lecturer_busy, group_busy), each resource_id -> int bitmap.
+        """
+        room_busy = defaultdict(int)
+        lecturer_busy = defaultdict(int)
+        group_busy = defaultdict(int)
+        
+        for slot in slots:
+            day_idx = slot['day_of_week']
+            # slot covers [start, end)
+            for t_idx in range(self._time_to_idx(slot['start_time']), self._time_to_idx(slot['end_time'])):
+                bit = 1 << self._cell(day_idx, t_idx)
+                room_busy[slot['room_id']] |= bit
+                lecturer_busy[slot['lecturer_id']] |= bit
+                group_busy[slot['group_id']] |= bit
+        
+        return room_busy, lecturer_busy, group_busy
+
+    def _block_mask(self, day_idx: int, start_t: int, duration: int) -> int:
+        """Bitmap of the cells covered by a block starting at (day_idx, start_t)"""
+        return ((1 << duration) - 1) << self._cell(day_idx, start_t)
+
+    def _blocked_resources(self) -> Tuple[Dict[int, int], Dict[int, int], Dict[int, int]]:
+        """
+        Occupancy from earlier levels, plus hours rooms and lecturers are not available.
+        A group is also busy whenever one of its ancestors or descendants has a slot.
+        """
+        room_busy, lecturer_busy, slot_groups_busy = self._build_occupancy(self.all_slots)
+        for room_id, unavailable in self.room_eligibility.unavailable.items():
+            room_busy[room_id] |= unavailable
+        for lecturer_id, unavailable in self.lecturer_eligibility.unavailable.items():
+            lecturer_busy[lecturer_id] |= unavailable
+        group_busy = defaultdict(int)
+        for group_id, busy in slot_groups_busy.items():
+            for related in self.group_hierarchy.family(group_id):
+                group_busy[related] |= busy
+        return room_busy, lecturer_busy, group_busy
+
+    def _busy_runs(self, bitmap: int) -> List[Tuple[int, int]]:
+        """Split a weekly occupancy bitmap into (start cell, length) runs of busy hours"""
+        day_len = len(self.time_slots)
+        runs = []
+        for day_idx in range(len(self.days)):
+            t_idx = 0
+            while t_idx < day_len:
+                if bitmap >> self._cell(day_idx, t_idx) & 1:
+                    run_start = t_idx
+                    while t_idx < day_len and bitmap >> self._cell(day_idx, t_idx) & 1:
+                        t_idx += 1
+                    runs.append((self._cell(day_idx, run_start), t_idx - run_start))
+                else:
+                    t_idx += 1
+        return runs
+
+    def _preference_penalty(self, lecturer_id: int, day_idx: int, start_t: int, duration: int) -> int:
+        """
+        Lecturer Preferences: Avoid Early Morning (07:00 at index 0) / Late Afternoon (17:00+ at index 10, 11)
+        and preferred teaching days. Returns how many of them a block at (day_idx, start_t) would break.
+        """
+        prefs = self.lecturer_eligibility.preferences.get(lecturer_id)
+        if not prefs:
+            return 0
+        penalty = 0
+        # Avoid Early Morning (07:00 start)
+        if prefs.get('avoid_early_morning') and start_t == 0:
+            penalty += 1
+        # Avoid Late Afternoon (Any part of session touches 17:00+ i.e. index >= 10)
+        # 17:00 is index 10. 18:00 is index 11.
+        if prefs.get('avoid_late_afternoon') and start_t + duration > 10:
+            penalty += 1
+        preferred_days = self.lecturer_eligibility.preferred_days.get(lecturer_id)
+        if preferred_days and day_idx not in preferred_days:
+            penalty += 1
+        return penalty
+
+    def _append_session_slots(self, session: Dict, day_idx: int, start_t: int, room_id: int, lecturer_id: int):
+        """
+        Record a placed session as one slot per hour of the block (to match DB structure),
+        and per group for a shared session
+        """
+        for group_id in self._session_groups(session):
+            for i in range(session['duration']):
+                current_t = start_t + i
+                slot_data = {
+                    'course_id': session['course_id'],
+                    'lecturer_id': lecturer_id,
+                    'room_id': room_id,
+                    'group_id': group_id,
+                    'day': self.days[day_idx],
+                    'day_of_week': day_idx,
+                    'start_time': self.time_slots[current_t][0],
+                    'end_time': self.time_slots[current_t][1],
+                    'session_type': session['type']
+                }
+                self.all_slots.append(slot_data)
+        self.placements[(session['course_id'], session['group_id'], session['s_id'])] = (
+            day_idx, start_t, room_id, lecturer_id
+        )
 
     def _time_to_idx(self, t: time) -> int:
         """Convert time object to 0-11 index (07:00 start)"""
         # 07:00 -> 0
         return t.hour - 7
 
+    def _slot_to_dict(self, slot: TimetableSlot) -> Dict:
+        """Stored TimetableSlot row -> the slot dict format used in all_slots"""
+        return {
+            'course_id': slot.course_id,
+            'lecturer_id': slot.lecturer_id,
+            'room_id': slot.room_id,
+            'group_id': slot.group_id,
+            'day': self.days[slot.day_of_week],
+            'day_of_week': slot.day_of_week,
+            'start_time': slot.start_time,
+            'end_time': slot.end_time,
+            'session_type': slot.session_type
+        }
+
     def save_timetable(self):
         """Save all generated slots to the database"""
-        for slot_data in self.all_slots:
+        self._add_slot_rows(self.all_slots)
+        self.db.commit()
+
+    def _add_slot_rows(self, slots: List[Dict]):
+        """Add TimetableSlot rows for the given slot dicts to the session"""
+        for slot_data in slots:
             slot = TimetableSlot(
                 course_id=slot_data['course_id'],
                 lecturer_id=slot_data['lecturer_id'],
@@ -462,5 +3112,3 @@ class TimetableGenerator:
                 timetable_id=self.timetable_id
             )
             self.db.add(slot)
-        
-        self.db.commit()
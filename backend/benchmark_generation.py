@@ -0,0 +1,89 @@
+"""
+Benchmark the timetable generator engines against the data currently in the database.
+Solves every level with each engine and mode in memory (nothing is saved) and prints
+model size, build time and solve time side by side.
+With --symmetry, every engine and mode also runs without symmetry breaking; with
+--strengthen, also with clique cuts and redundant aggregates; with --bind-course, also
+with one lecturer per group and course; with --per-group, also with a copy of every
+shared session per group. The solve time each variant saves (or costs) is printed per run. --lean builds every bool_matrix model in lean mode; peak memory only
+grows within a process, so compare it across two invocations.
+
+Usage: python benchmark_generation.py [engine|mode ...] [--symmetry] [--strengthen] [--bind-course] [--per-group] [--lean]
+"""
+import sys
+import os
+
+sys.path.append(os.getcwd())
+
+from app.database import SessionLocal
+from app.services.timetable_generator import TimetableGenerator, ENGINES, MODES, _peak_rss_mb
+
+LEVELS = [5, 4, 3, 2]
+
+# Command line flag -> (label suffix, generator options of the variant run)
+VARIANTS = {
+    '--symmetry': ('nosym', {'break_symmetry': False}),
+    '--strengthen': ('strengthened', {'strengthen_model': True}),
+    '--bind-course': ('course-bound', {'lecturer_binding': 'course'}),
+    '--per-group': ('per-group', {'shared_sessions': False}),
+}
+
+def benchmark_engine(db, engine: str, mode: str, **options) -> dict:
+    generator = TimetableGenerator(db, timetable_id=None, engine=engine, mode=mode, **options)
+    if mode == 'joint':
+        generator.generate_joint_timetable(LEVELS)
+        return generator.level_stats
+    levels = generator.generate_levels_in_parallel(LEVELS) if mode == 'quota' else LEVELS
+    for level in levels:
+        if not generator.generate_level_timetable(level, 0, 100):
+            break
+    return generator.level_stats
+
+def print_results(results: dict):
+    header = f"{'engine/mode':<30}{'level':>6}{'sessions':>10}{'vars':>10}{'constraints':>13}{'build s':>10}{'solve s':>10}  status"
+    print(header)
+    print("-" * len(header))
+    for engine, level_stats in results.items():
+        for level, stats in level_stats.items():
+            print(
+                f"{engine:<30}{level:>6}{stats.get('sessions', 0):>10}{stats['variables']:>10}"
+                f"{stats['constraints']:>13}{stats['build_seconds']:>10.3f}{stats['solve_seconds']:>10.3f}  {stats['status']}"
+            )
+        total_build = sum(s['build_seconds'] for s in level_stats.values())
+        total_solve = sum(s['solve_seconds'] for s in level_stats.values())
+        print(f"{engine:<30}{'total':>6}{'':>33}{total_build:>10.3f}{total_solve:>10.3f}")
+        print()
+
+def print_savings(results: dict, suffix: str):
+    """Solve time of each default run against its variant; positive means the default is faster"""
+    print(f"{'engine/mode':<30}{'solve s':>10}{suffix + ' s':>16}{'saved':>9}")
+    for run, level_stats in results.items():
+        if f"{run} {suffix}" not in results: continue
+        default = sum(s['solve_seconds'] for s in level_stats.values())
+        variant = sum(s['solve_seconds'] for s in results[f"{run} {suffix}"].values())
+        saved = (variant - default) / variant * 100 if variant else 0.0
+        print(f"{run:<30}{default:>10.3f}{variant:>16.3f}{saved:>8.1f}%")
+    print()
+
+if __name__ == "__main__":
+    engines = [arg for arg in sys.argv[1:] if arg in ENGINES] or list(ENGINES)
+    modes = [arg for arg in sys.argv[1:] if arg in MODES] or list(MODES)
+    variants = [VARIANTS[arg] for arg in sys.argv[1:] if arg in VARIANTS]
+    base_options = {'lean_model': '--lean' in sys.argv[1:]}
+    db = SessionLocal()
+    try:
+        results = {}
+        for engine in engines:
+            for mode in modes:
+                print(f"[*] Benchmarking engine '{engine}' in {mode} mode...")
+                results[f"{engine}/{mode}"] = benchmark_engine(db, engine, mode, **base_options)
+                for suffix, options in variants:
+                    print(f"[*] ...and {suffix}")
+                    results[f"{engine}/{mode} {suffix}"] = benchmark_engine(db, engine, mode, **base_options, **options)
+        print()
+        print_results(results)
+        for suffix, _ in variants:
+            print_savings(results, suffix)
+        print(f"Peak RSS: {_peak_rss_mb()} MB")
+    finally:
+        db.close()
@@ -0,0 +1,157 @@
+"""
+Small timetables for the generation tests (test_engines.py and the other test_*.py
+scripts that import this). They run on their own SQLite file, so the database in
+.env is never reset.
+"""
+import os
+import sys
+import tempfile
+
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.gettempdir(), 'tablesys_generation_tests.db')
+os.environ.setdefault('SECRET_KEY', 'generation-tests-' + 'x' * 32)
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.database import SessionLocal, engine
+from app.models import (
+    Base, Department, Room, Course, Lecturer, StudentGroup, LecturerAssignment, GroupAssignment,
+    Timetable, TimetableSlot, RoomCategory, CourseType, GroupType
+)
+
+ROOM_TYPES = {
+    RoomCategory.LECTURE_HALL_MEDIUM: 'lecture_hall',
+    RoomCategory.COMPUTER_LAB: 'lab',
+    RoomCategory.DRAWING_ROOM: 'drawing_room',
+}
+
+
+def reset_db():
+    """Empty database with every table; returns a session"""
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    return SessionLocal()
+
+
+def add_department(db, code='TEST'):
+    department = Department(name=f'{code} Dept', code=code)
+    db.add(department)
+    db.commit()
+    return department
+
+
+def add_room(db, name, capacity, category=RoomCategory.LECTURE_HALL_MEDIUM):
+    room = Room(name=name, building='B1', capacity=capacity, room_type=ROOM_TYPES[category],
+                room_category=category, availability='Mon-Fri 07:00-19:00')
+    db.add(room)
+    db.commit()
+    return room
+
+
+def add_lecturer(db, department, name, max_hours=20):
+    lecturer = Lecturer(staff_number=name, full_name=name, email=f'{name.lower()}@test.com',
+                        department_id=department.id, max_hours_per_week=max_hours)
+    db.add(lecturer)
+    db.commit()
+    return lecturer
+
+
+def add_group(db, department, name, level, size, parent=None, group_type=GroupType.DEPARTMENT):
+    group = StudentGroup(name=name, level=level, department_id=department.id, size=size,
+                         group_type=group_type, parent_group_id=parent.id if parent else None)
+    db.add(group)
+    db.commit()
+    return group
+
+
+def add_course(db, department, code, level, groups, lecturers, lecture_hours=2, practical_hours=0, **fields):
+    """A course taught to the groups by any of the lecturers; lecture blocks of two hours"""
+    fields.setdefault('session_configuration', {'requires_consecutive': 2})
+    course = Course(code=code, name=code, department_id=department.id, level=level, credits=3,
+                    lecture_hours=lecture_hours, tutorial_hours=0, practical_hours=practical_hours,
+                    course_type=fields.pop('course_type', CourseType.DEPARTMENT_SPECIFIC), **fields)
+    db.add(course)
+    db.commit()
+    for lecturer in lecturers:
+        db.add(LecturerAssignment(lecturer_id=lecturer.id, course_id=course.id))
+    for group in groups:
+        db.add(GroupAssignment(group_id=group.id, course_id=course.id))
+    db.commit()
+    return course
+
+
+def add_timetable(db):
+    timetable = Timetable(name='Test Timetable', semester='1', year=2024, academic_half='first_half')
+    db.add(timetable)
+    db.commit()
+    return timetable
+
+
+def add_catalogue(db, codes=('TEST',)):
+    """
+    Two levels of two groups each per department: four halls per department, two
+    lecturers per level and 12 hours of lectures per group.
+    Returns (timetable, hours needed per group id).
+    """
+    hours = {}
+    for code in codes:
+        dept = add_department(db, code)
+        for room_idx in range(4):
+            add_room(db, f'{code} Hall {room_idx}', 100)
+        for level in (2, 3):
+            lecturers = [add_lecturer(db, dept, f'{code}L{level}{idx}') for idx in range(2)]
+            groups = [add_group(db, dept, f'{code}G{level}{idx}', level, 40) for idx in range(2)]
+            for course_idx in range(4):
+                group = groups[course_idx % 2]
+                add_course(db, dept, f'{code}{level}0{course_idx}', level, [group], lecturers, lecture_hours=4)
+                hours[group.id] = hours.get(group.id, 0) + 4
+            add_course(db, dept, f'{code}{level}10', level, groups, lecturers[:1], lecture_hours=4)
+            for group in groups:
+                hours[group.id] += 4
+    return add_timetable(db), hours
+
+
+def stored_slots(db, timetable):
+    return db.query(TimetableSlot).filter(TimetableSlot.timetable_id == timetable.id).all()
+
+
+def hours_by_group(slots):
+    """Slot hours stored per group id"""
+    hours = {}
+    for slot in slots:
+        hours[slot.group_id] = hours.get(slot.group_id, 0) + slot.end_time.hour - slot.start_time.hour
+    return hours
+
+
+def clashes(slots, key):
+    """(key, day, hour) cells booked by more than one distinct session hour"""
+    seen = {}
+    clashing = set()
+    for slot in slots:
+        taught = (slot.course_id, slot.room_id, slot.lecturer_id)
+        for hour in range(slot.start_time.hour, slot.end_time.hour):
+            cell = (key(slot), slot.day_of_week, hour)
+            # A shared session has a slot per group in the same room with the same course
+            if cell in seen and seen[cell] != taught:
+                clashing.add(cell)
+            seen.setdefault(cell, taught)
+    return clashing
+
+
+def assert_clash_free(slots):
+    for name, key in (('room', lambda slot: slot.room_id), ('lecturer', lambda slot: slot.lecturer_id),
+                      ('group', lambda slot: slot.group_id)):
+        clashing = clashes(slots, key)
+        assert not clashing, f'{name} clashes at {sorted(clashing)}'
+
+
+def run_tests(tests):
+    """Run test functions as a script, in the style of test_generation.py"""
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"[+] {test.__name__}")
+        except Exception as e:
+            failed += 1
+            print(f"[-] {test.__name__}: {e!r}")
+    print(f"\n{len(tests) - failed} passed, {failed} failed")
+    return failed
@@ -0,0 +1,113 @@
+"""
+Best-effort generation: a timetable that cannot satisfy every constraint is saved with
+what had to give (room types waived, sessions left unplaced) reported, not lost.
+Run with `python test_best_effort.py` or pytest.
+"""
+from generation_test_data import (
+    reset_db, add_department, add_room, add_lecturer, add_group, add_course, add_timetable,
+    stored_slots, clashes, run_tests
+)
+from app.models import RoomType
+from app.services.timetable_generator import TimetableGenerator
+
+
+def _lab_only_timetable(db):
+    """A course that wants a lab, and only a lecture hall"""
+    dept = add_department(db)
+    add_room(db, 'Hall', 100)
+    lecturer = add_lecturer(db, dept, 'L1')
+    group = add_group(db, dept, 'G2', 2, 40)
+    course = add_course(db, dept, 'C201', 2, [group], [lecturer], lecture_hours=4,
+                        preferred_room_type=RoomType.LAB)
+    return add_timetable(db), course
+
+
+def _oversubscribed_timetable(db):
+    """Four groups needing 20 hours each of the one room's 60"""
+    dept = add_department(db)
+    add_room(db, 'Hall', 100)
+    for group_idx in range(4):
+        group = add_group(db, dept, f'G{group_idx}', 2, 40)
+        for course_idx in range(2):
+            lecturer = add_lecturer(db, dept, f'L{group_idx}{course_idx}')
+            add_course(db, dept, f'C2{group_idx}{course_idx}', 2, [group], [lecturer], lecture_hours=10)
+    return add_timetable(db)
+
+
+def test_room_type_fails_without_best_effort():
+    db = reset_db()
+    try:
+        timetable, _ = _lab_only_timetable(db)
+        generator = TimetableGenerator(db, timetable.id, time_budget_seconds=30)
+        assert not generator.generate_timetable()
+        problems = generator.level_stats['2']['precheck']['problems']
+        assert [(p['check'], p['reason']) for p in problems] == [('no_placement', 'no_room')] * 2
+        assert 'best_effort' not in generator.run_stats
+    finally:
+        db.close()
+
+
+def test_room_type_waived_with_best_effort():
+    db = reset_db()
+    try:
+        timetable, course = _lab_only_timetable(db)
+        generator = TimetableGenerator(db, timetable.id, time_budget_seconds=30, best_effort=True)
+        assert generator.generate_timetable()
+        relaxation = generator.level_stats['2']['relaxation']
+        assert generator.level_stats['2']['status'] == 'RELAXED'
+        # Coverage alone leaves both sessions out; waiving room types places them and ends the ladder
+        assert [(step['stage'], step['unplaced']) for step in relaxation['steps']] == [('coverage', 2), ('room_type', 0)]
+        assert relaxation['stage'] == 'room_type'
+        best_effort = generator.run_stats['best_effort']
+        assert best_effort['unplaced_sessions'] == []
+        assert [(v['kind'], v['course_id'], v['reason']) for v in best_effort['violations']] == [('room_type', course.id, 'no_room')] * 2
+        assert len(stored_slots(db, timetable)) == 4
+    finally:
+        db.close()
+
+
+def test_lecturer_out_of_hours_listed_unplaced():
+    db = reset_db()
+    try:
+        dept = add_department(db)
+        add_room(db, 'Hall', 100)
+        lecturer = add_lecturer(db, dept, 'L1', max_hours=1)
+        group = add_group(db, dept, 'G2', 2, 40)
+        course = add_course(db, dept, 'C201', 2, [group], [lecturer], lecture_hours=4)
+        timetable = add_timetable(db)
+        generator = TimetableGenerator(db, timetable.id, time_budget_seconds=30, best_effort=True)
+        assert generator.generate_timetable()
+        # One hour a week fits neither 2-hour block: both are listed, not lost
+        unplaced = generator.run_stats['best_effort']['unplaced_sessions']
+        assert [(entry['course_id'], entry['reason']) for entry in unplaced] == [(course.id, 'lecturer_hours')] * 2
+        assert not stored_slots(db, timetable)
+    finally:
+        db.close()
+
+
+def test_unplaced_hours_reported():
+    db = reset_db()
+    try:
+        timetable = _oversubscribed_timetable(db)
+        generator = TimetableGenerator(db, timetable.id, time_budget_seconds=60, best_effort=True)
+        assert generator.generate_timetable()
+        assert generator.level_stats['2']['status'] == 'RELAXED'
+        unplaced = generator.run_stats['best_effort']['unplaced_sessions']
+        unplaced_hours = sum(entry['duration'] for entry in unplaced)
+        slots = stored_slots(db, timetable)
+        # Every hour needed is either in the room or listed; the room holds at most 60
+        assert len(slots) + unplaced_hours == 80
+        assert unplaced_hours >= 20
+        assert not clashes(slots, lambda slot: slot.room_id)
+        assert all(entry['level'] == 2 for entry in unplaced)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    run_tests([
+        test_room_type_fails_without_best_effort,
+        test_room_type_waived_with_best_effort,
+        test_lecturer_out_of_hours_listed_unplaced,
+        test_unplaced_hours_reported,
+    ])
@@ -0,0 +1,133 @@
+"""
+Every generation engine places all the hours a catalogue needs without a room,
+lecturer or group clash.
+Run with `python test_engines.py` or pytest.
+"""
+from datetime import time
+from generation_test_data import (
+    reset_db, add_department, add_room, add_lecturer, add_group, add_course, add_timetable, add_catalogue,
+    stored_slots, hours_by_group, assert_clash_free, run_tests
+)
+from app.models import LecturerUnavailability
+from app.services.timetable_generator import TimetableGenerator
+
+
+def _generate(engine, **options):
+    """Generate the test catalogue with one engine, check every hour is placed clash-free; returns the generator"""
+    db = reset_db()
+    timetable, hours = add_catalogue(db)
+    generator = TimetableGenerator(db, timetable.id, engine=engine, **options)
+    assert generator.generate_timetable(), engine
+    slots = stored_slots(db, timetable)
+    assert hours_by_group(slots) == hours, engine
+    assert_clash_free(slots)
+    db.close()
+    return generator
+
+
+def test_bool_matrix_engine():
+    generator = _generate('bool_matrix')
+    assert all(stats['status'] == 'OPTIMAL' for stats in generator.level_stats.values())
+
+
+def test_interval_engine():
+    generator = _generate('interval')
+    assert {stats['engine'] for stats in generator.level_stats.values()} == {'interval'}
+    assert all(stats['status'] == 'OPTIMAL' for stats in generator.level_stats.values())
+
+
+def test_factorized_engine():
+    generator = _generate('factorized')
+    assert all(stats['status'] == 'OPTIMAL' for stats in generator.level_stats.values())
+    # Start, room and lecturer choices add up instead of multiplying
+    bool_matrix = _generate('bool_matrix')
+    for level, stats in generator.level_stats.items():
+        assert stats['variables'] < bool_matrix.level_stats[level]['variables']
+
+
+def test_two_phase_engine():
+    generator = _generate('two_phase')
+    assert all(stats['status'] == 'OPTIMAL' for stats in generator.level_stats.values())
+    # Rooms are matched after the solve, so the model has no room dimension
+    bool_matrix = _generate('bool_matrix')
+    for level, stats in generator.level_stats.items():
+        assert stats['variables'] < bool_matrix.level_stats[level]['variables']
+
+
+def test_greedy_engine():
+    generator = _generate('greedy')
+    for stats in generator.level_stats.values():
+        assert stats['status'] == 'FEASIBLE' and stats['unplaced_sessions'] == []
+        assert stats['solve_seconds'] < 1
+
+
+def test_greedy_picks_most_constrained_as_it_goes():
+    """
+    One room and three lecturers free only on Monday mornings: Y fills 07:00-10:00, which
+    leaves X (07:00-11:00) just 10:00 while Z (10:00-12:00) still has two hours. Ordered by
+    the options before any placement, Z would go before X and take 10:00
+    """
+    db = reset_db()
+    try:
+        dept = add_department(db)
+        add_room(db, 'Hall', 100)
+        for code, free_from, free_until, hours in (('Y', 7, 10, 3), ('X', 7, 11, 1), ('Z', 10, 12, 1)):
+            lecturer = add_lecturer(db, dept, f'L{code}')
+            blocked = [(0, 7, free_from), (0, free_until, 19)] + [(day, 7, 19) for day in range(1, 5)]
+            db.add_all(LecturerUnavailability(lecturer_id=lecturer.id, day_of_week=day,
+                                              start_time=time(start), end_time=time(end))
+                       for day, start, end in blocked if start < end)
+            group = add_group(db, dept, f'G{code}', 2, 40)
+            add_course(db, dept, f'C2{code}', 2, [group], [lecturer], lecture_hours=hours,
+                       session_configuration={'requires_consecutive': hours})
+        timetable = add_timetable(db)
+        generator = TimetableGenerator(db, timetable.id, engine='greedy')
+        assert generator.generate_timetable()
+        assert generator.level_stats['2']['unplaced_sessions'] == []
+        slots = stored_slots(db, timetable)
+        assert len(slots) == 5
+        assert_clash_free(slots)
+    finally:
+        db.close()
+
+
+def test_draft_hints():
+    generator = _generate('bool_matrix', draft_hints=True)
+    for stats in generator.level_stats.values():
+        # Every session starts from the greedy draft's placement
+        assert stats['hinted_sessions'] == stats['sessions']
+        assert stats['status'] == 'OPTIMAL'
+
+
+def test_bool_matrix_orders_interchangeable_sessions():
+    generator = _generate('bool_matrix')
+    assert sum(stats['symmetry']['session_orderings'] for stats in generator.level_stats.values()) > 0
+    # Orderings only discard permutations: the objective is the same without them
+    unordered = _generate('bool_matrix', break_symmetry=False)
+    for level, stats in generator.level_stats.items():
+        assert unordered.level_stats[level]['symmetry']['session_orderings'] == 0
+        assert stats['status'] == unordered.level_stats[level]['status'] == 'OPTIMAL'
+        assert stats['objective'] == unordered.level_stats[level]['objective']
+
+
+def test_unknown_engine_rejected():
+    try:
+        TimetableGenerator(None, 0, engine='simplex')
+    except ValueError as e:
+        assert 'simplex' in str(e)
+    else:
+        raise AssertionError('unknown engine accepted')
+
+
+if __name__ == "__main__":
+    run_tests([
+        test_bool_matrix_engine,
+        test_interval_engine,
+        test_factorized_engine,
+        test_two_phase_engine,
+        test_greedy_engine,
+        test_greedy_picks_most_constrained_as_it_goes,
+        test_draft_hints,
+        test_bool_matrix_orders_interchangeable_sessions,
+        test_unknown_engine_rejected,
+    ])
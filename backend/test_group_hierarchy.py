@@ -0,0 +1,69 @@
+"""
+Group hierarchy: a group's sessions never overlap those of its parent or subgroups,
+while sibling lab groups may run in parallel.
+Run with `python test_group_hierarchy.py` or pytest.
+"""
+from collections import defaultdict
+from generation_test_data import (
+    reset_db, add_department, add_room, add_lecturer, add_group, add_course, add_timetable,
+    stored_slots, clashes, run_tests
+)
+from app.models import GroupType, GroupDivisionType, RoomCategory, StudentGroup
+from app.services.group_hierarchy import GroupHierarchy
+from app.services.timetable_generator import TimetableGenerator
+
+
+def _lab_timetable(db):
+    """A 60-student group with two lab groups: a full-group course and a course whose practicals split"""
+    dept = add_department(db)
+    add_room(db, 'Hall', 100)
+    add_room(db, 'Lab A', 40, RoomCategory.COMPUTER_LAB)
+    add_room(db, 'Lab B', 40, RoomCategory.COMPUTER_LAB)
+    lecturers = [add_lecturer(db, dept, f'L{i}') for i in range(3)]
+    parent = add_group(db, dept, 'G2', 2, 60)
+    labs = [add_group(db, dept, f'G2-L{i}', 2, 30, parent=parent, group_type=GroupType.LAB_GROUP) for i in range(2)]
+    add_course(db, dept, 'C201', 2, [parent], lecturers[:1], lecture_hours=4)
+    add_course(db, dept, 'C202', 2, [parent], lecturers[1:], lecture_hours=2, practical_hours=3,
+               group_division_type=GroupDivisionType.LAB_GROUPS)
+    return add_timetable(db), parent, labs
+
+
+def test_hierarchy_closures():
+    db = reset_db()
+    try:
+        _, parent, labs = _lab_timetable(db)
+        hierarchy = GroupHierarchy(db.query(StudentGroup).all())
+        assert hierarchy.below(parent.id) == {parent.id, labs[0].id, labs[1].id}
+        assert hierarchy.family(labs[0].id) == {parent.id, labs[0].id}
+        assert labs[1].id not in hierarchy.family(labs[0].id)
+        assert hierarchy.split_groups(parent.id, GroupDivisionType.LAB_GROUPS, 'practical') == [labs[0].id, labs[1].id]
+        assert hierarchy.split_groups(parent.id, GroupDivisionType.LAB_GROUPS, 'lecture') == [parent.id]
+    finally:
+        db.close()
+
+
+def test_parent_and_subgroups_never_clash():
+    for engine in ('bool_matrix', 'factorized', 'greedy'):
+        db = reset_db()
+        try:
+            timetable, parent, labs = _lab_timetable(db)
+            assert TimetableGenerator(db, timetable.id, engine=engine, time_budget_seconds=30).generate_timetable(), engine
+            slots = stored_slots(db, timetable)
+            by_group = defaultdict(set)
+            for slot in slots:
+                by_group[slot.group_id].add((slot.day_of_week, slot.start_time))
+            # 4 + 2 lecture hours for the group, 3 practical hours for each lab group
+            assert len(by_group[parent.id]) == 6 and all(len(by_group[lab.id]) == 3 for lab in labs), engine
+            for lab in labs:
+                assert not by_group[parent.id] & by_group[lab.id], engine
+            assert not clashes(slots, lambda slot: slot.room_id), engine
+            assert not clashes(slots, lambda slot: slot.lecturer_id), engine
+        finally:
+            db.close()
+
+
+if __name__ == "__main__":
+    run_tests([
+        test_hierarchy_closures,
+        test_parent_and_subgroups_never_clash,
+    ])
@@ -0,0 +1,98 @@
+"""
+POST /timetables/{id}/improve: large neighbourhood search lowers the broken lecturer
+preferences of a generated timetable and keeps every session placed.
+The endpoint function is called directly (no HTTP client needed).
+Run with `python test_improve.py` or pytest.
+"""
+from fastapi import HTTPException
+from generation_test_data import (
+    reset_db, add_department, add_room, add_lecturer, add_group, add_course, add_timetable,
+    stored_slots, assert_clash_free, run_tests
+)
+from app.routers.timetables import improve_timetable
+from app.schemas import TimetableImproveRequest
+from app.services.timetable_generator import TimetableGenerator
+
+
+def _draft_timetable(db):
+    """
+    A greedy draft for a lecturer who then asks for Mondays and Tuesdays only and no
+    07:00 starts, so the stored timetable breaks some of their preferences
+    """
+    dept = add_department(db)
+    add_room(db, 'Hall', 100)
+    lecturer = add_lecturer(db, dept, 'L1')
+    lecturer.teaching_preferences = {'preferred_days': ['Thursday', 'Friday']}
+    for level in (2, 3):
+        group = add_group(db, dept, f'G{level}', level, 40)
+        add_course(db, dept, f'C{level}01', level, [group], [lecturer], lecture_hours=4)
+    timetable = add_timetable(db)
+    assert TimetableGenerator(db, timetable.id, engine='greedy').generate_timetable()
+    lecturer.teaching_preferences = {'preferred_days': ['Monday', 'Tuesday'], 'avoid_early_morning': True}
+    db.commit()
+    return timetable
+
+
+def test_improve_lowers_broken_preferences():
+    db = reset_db()
+    try:
+        timetable = _draft_timetable(db)
+        before = sorted((slot.course_id, slot.group_id) for slot in stored_slots(db, timetable))
+        result = improve_timetable(
+            timetable.id, TimetableImproveRequest(time_budget_seconds=20), current_user=None, db=db
+        )
+        assert result['initial_objective'] > 0
+        assert sum(step['tried'] for step in result['steps'].values()) > 0
+        # Every session can move to Monday or Tuesday after 07:00
+        assert result['improved'] and result['final_objective'] < result['initial_objective']
+        assert result['final_objective'] == 0
+        assert [objective for _, objective in result['history']][-1] == 0
+        slots = stored_slots(db, timetable)
+        assert sorted((slot.course_id, slot.group_id) for slot in slots) == before
+        assert {slot.day_of_week for slot in slots} <= {0, 1}
+        assert_clash_free(slots)
+        db.refresh(timetable)
+        assert timetable.generation_metadata['last_improve']['final_objective'] == 0
+    finally:
+        db.close()
+
+
+def test_improve_optimal_timetable_unchanged():
+    db = reset_db()
+    try:
+        timetable = _draft_timetable(db)
+        improve_timetable(timetable.id, TimetableImproveRequest(time_budget_seconds=20), current_user=None, db=db)
+        before = sorted((slot.course_id, slot.day_of_week, slot.start_time) for slot in stored_slots(db, timetable))
+        # Nothing is left to improve: no step is tried and the timetable stays as it is
+        result = improve_timetable(timetable.id, TimetableImproveRequest(time_budget_seconds=5),
+                                   current_user=None, db=db)
+        assert result['initial_objective'] == result['final_objective'] == 0 and not result['improved']
+        assert sum(step['tried'] for step in result['steps'].values()) == 0
+        assert sorted((slot.course_id, slot.day_of_week, slot.start_time) for slot in stored_slots(db, timetable)) == before
+    finally:
+        db.close()
+
+
+def test_improve_rejects_bad_requests():
+    db = reset_db()
+    try:
+        timetable = _draft_timetable(db)
+        for request, status_code in ((TimetableImproveRequest(), 404),
+                                     (TimetableImproveRequest(neighbourhoods=['week']), 400)):
+            timetable_id = timetable.id + 1 if status_code == 404 else timetable.id
+            try:
+                improve_timetable(timetable_id, request, current_user=None, db=db)
+            except HTTPException as e:
+                assert e.status_code == status_code
+            else:
+                raise AssertionError(f'expected {status_code}')
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    run_tests([
+        test_improve_lowers_broken_preferences,
+        test_improve_optimal_timetable_unchanged,
+        test_improve_rejects_bad_requests,
+    ])
@@ -0,0 +1,120 @@
+"""
+Lecturer bindings: with lecturer_binding='course' every engine gives one lecturer all of
+a group's sessions of a course, preferring primary expertise over assistants.
+Run with `python test_lecturer_binding.py` or pytest.
+"""
+from collections import defaultdict
+from time import perf_counter
+from generation_test_data import (
+    reset_db, add_department, add_room, add_lecturer, add_group, add_course, add_timetable,
+    stored_slots, hours_by_group, assert_clash_free, run_tests
+)
+from app.models import LecturerAssignment
+from app.services.timetable_generator import TimetableGenerator
+
+ENGINES = ('bool_matrix', 'interval', 'factorized', 'two_phase', 'greedy')
+
+
+def _three_lecturer_timetable(db):
+    """Two groups and two 6-hour courses, each taught by three lecturers; the first is an assistant"""
+    dept = add_department(db)
+    for name in ('Hall A', 'Hall B'):
+        add_room(db, name, 100)
+    lecturers = [add_lecturer(db, dept, f'L{i}') for i in range(3)]
+    groups = [add_group(db, dept, f'G{i}', 2, 40) for i in range(2)]
+    for code in ('C201', 'C202'):
+        add_course(db, dept, code, 2, groups, lecturers, lecture_hours=6)
+    for assignment in db.query(LecturerAssignment).filter_by(lecturer_id=lecturers[0].id):
+        assignment.expertise_level = 'assistant'
+    db.commit()
+    return add_timetable(db), lecturers
+
+
+def _lecturers_by_binding(slots):
+    taught = defaultdict(set)
+    for slot in slots:
+        taught[(slot.course_id, slot.group_id)].add(slot.lecturer_id)
+    return taught
+
+
+def test_course_binding_every_engine():
+    for engine in ENGINES:
+        db = reset_db()
+        try:
+            timetable, lecturers = _three_lecturer_timetable(db)
+            generator = TimetableGenerator(db, timetable.id, engine=engine, lecturer_binding='course',
+                                           time_budget_seconds=30)
+            assert generator.generate_timetable(), engine
+            slots = stored_slots(db, timetable)
+            assert hours_by_group(slots) == {slot.group_id: 12 for slot in slots}, engine
+            assert_clash_free(slots)
+            taught = _lecturers_by_binding(slots)
+            assert len(taught) == 4 and all(len(ids) == 1 for ids in taught.values()), engine
+            # The assistant is left out while a primary lecturer qualifies
+            assert lecturers[0].id not in set().union(*taught.values()), engine
+        finally:
+            db.close()
+
+
+def test_course_binding_drops_lecturer_variables():
+    variables = {}
+    for binding in ('session', 'course'):
+        db = reset_db()
+        try:
+            timetable, _ = _three_lecturer_timetable(db)
+            generator = TimetableGenerator(db, timetable.id, lecturer_binding=binding, time_budget_seconds=30)
+            assert generator.generate_timetable(), binding
+            variables[binding] = generator.level_stats['2']['variables']
+        finally:
+            db.close()
+    assert variables['course'] < variables['session']
+
+
+def test_binding_lecturer_no_longer_a_candidate():
+    """
+    A binding already taught by a lecturer who is not among its sessions' candidates (the
+    assistant here) leaves the rest of them without a lecturer: the precheck reports them
+    and no model is built
+    """
+    db = reset_db()
+    try:
+        timetable, lecturers = _three_lecturer_timetable(db)
+        for engine in ('bool_matrix', 'interval', 'greedy'):
+            generator = TimetableGenerator(db, timetable.id, engine=engine, lecturer_binding='course',
+                                           time_budget_seconds=30)
+            generator._load_snapshot()
+            sessions = generator._collect_level_sessions(generator.snapshot.courses_by_level[2])
+            first = sessions[0]
+            generator._append_session_slots(first, 0, 0, first['rooms'][0], lecturers[0].id)
+            rest = [session for session in sessions if session['binding'] == first['binding']][1:]
+            assert rest and lecturers[0].id not in rest[0]['lecturers'], engine
+            
+            generator._precheck(2, '2', 'Level 2', rest, 0, perf_counter())
+            report = generator.level_stats['2']['precheck'] if engine != 'greedy' else \
+                generator.run_stats['precheck']['2']['report']
+            assert {problem['reason'] for problem in report['problems']} == {'no_lecturer'}, engine
+            assert report['skipped_hours'] == {'no_lecturer': sum(session['duration'] for session in rest)}, engine
+            
+            stats = generator._build_and_solve(rest, 10, perf_counter())
+            assert stats['variables'] == 0 and len(stats['unplaced_sessions']) == len(rest), engine
+            assert stats['status'] == ('INCOMPLETE' if engine == 'greedy' else 'INFEASIBLE'), engine
+    finally:
+        db.close()
+
+
+def test_unknown_binding_rejected():
+    try:
+        TimetableGenerator(None, 0, lecturer_binding='week')
+    except ValueError as e:
+        assert 'week' in str(e)
+    else:
+        raise AssertionError('unknown lecturer binding accepted')
+
+
+if __name__ == "__main__":
+    run_tests([
+        test_course_binding_every_engine,
+        test_course_binding_drops_lecturer_variables,
+        test_binding_lecturer_no_longer_a_candidate,
+        test_unknown_binding_rejected,
+    ])
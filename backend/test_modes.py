@@ -0,0 +1,103 @@
+"""
+Every generation mode places all the hours a catalogue needs without a room,
+lecturer or group clash.
+Run with `python test_modes.py` or pytest.
+"""
+from datetime import time
+from generation_test_data import (
+    reset_db, add_department, add_room, add_lecturer, add_group, add_course, add_timetable,
+    add_catalogue, stored_slots, hours_by_group, assert_clash_free, run_tests
+)
+from app.models import LecturerUnavailability
+from app.services.timetable_generator import TimetableGenerator, MAX_DAY_ROUNDS
+
+
+def _generate(mode, codes=('TEST',), **options):
+    """Generate the test catalogue in one mode, check every hour is placed clash-free; returns the generator"""
+    db = reset_db()
+    timetable, hours = add_catalogue(db, codes)
+    generator = TimetableGenerator(db, timetable.id, mode=mode, time_budget_seconds=60, **options)
+    assert generator.generate_timetable(), mode
+    slots = stored_slots(db, timetable)
+    assert hours_by_group(slots) == hours, mode
+    assert_clash_free(slots)
+    db.close()
+    return generator
+
+
+def test_joint_mode():
+    generator = _generate('joint')
+    assert list(generator.level_stats) == ['all']
+    assert generator.level_stats['all']['status'] == 'OPTIMAL'
+    assert generator.run_stats['mode'] == 'joint'
+
+
+def test_departments_mode():
+    generator = _generate('departments', ('CS', 'EE'))
+    for level in ('2', '3'):
+        stats = generator.level_stats[level]
+        assert stats['status'] in ('OPTIMAL', 'FEASIBLE')
+        # One subproblem per department, solved side by side
+        assert stats['mode'] == 'departments' and len(stats['partitions']) == 2
+
+
+def test_quota_mode():
+    generator = _generate('quota')
+    assert 'quotas' in generator.level_stats
+    # Both levels solve within their share of rooms and lecturers
+    assert generator.run_stats['quota_fallback_levels'] == []
+    assert all(generator.level_stats[level]['status'] in ('OPTIMAL', 'FEASIBLE') for level in ('2', '3'))
+
+
+def test_days_mode():
+    generator = _generate('days')
+    for level in ('2', '3'):
+        stats = generator.level_stats[level]
+        assert stats['status'] in ('OPTIMAL', 'FEASIBLE')
+        assert stats['mode'] == 'days'
+
+
+def test_days_mode_spreads_the_week():
+    db = reset_db()
+    try:
+        # Two lecturers free only in the mornings teach one group 30 hours: exactly its
+        # mornings, so no day can take more than its share
+        dept = add_department(db)
+        add_room(db, 'Hall', 100)
+        group = add_group(db, dept, 'G2', 2, 40)
+        for i in range(2):
+            lecturer = add_lecturer(db, dept, f'L{i}')
+            db.add_all(LecturerUnavailability(lecturer_id=lecturer.id, day_of_week=day,
+                                              start_time=time(13), end_time=time(19)) for day in range(5))
+            for c in range(5):
+                add_course(db, dept, f'C2{i}{c}', 2, [group], [lecturer], lecture_hours=3)
+        timetable = add_timetable(db)
+        generator = TimetableGenerator(db, timetable.id, mode='days', time_budget_seconds=60)
+        assert generator.generate_timetable()
+        stats = generator.level_stats['2']
+        assert len(stats['rounds']) <= 2 < MAX_DAY_ROUNDS and stats['fallback'] is None
+        slots = stored_slots(db, timetable)
+        assert hours_by_group(slots) == {group.id: 30}
+        assert_clash_free(slots)
+    finally:
+        db.close()
+
+
+def test_unknown_mode_rejected():
+    try:
+        TimetableGenerator(None, 0, mode='random')
+    except ValueError as e:
+        assert 'random' in str(e)
+    else:
+        raise AssertionError('unknown mode accepted')
+
+
+if __name__ == "__main__":
+    run_tests([
+        test_joint_mode,
+        test_departments_mode,
+        test_quota_mode,
+        test_days_mode,
+        test_days_mode_spreads_the_week,
+        test_unknown_mode_rejected,
+    ])
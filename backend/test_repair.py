@@ -0,0 +1,91 @@
+"""
+POST /timetables/{id}/repair on a generated timetable: only what a change touches is
+re-solved, everything else stays where it was.
+The endpoint function is called directly (no HTTP client needed).
+Run with `python test_repair.py` or pytest.
+"""
+from fastapi import HTTPException
+from generation_test_data import (
+    reset_db, add_department, add_room, add_lecturer, add_group, add_course, add_timetable,
+    stored_slots, assert_clash_free, run_tests
+)
+from app.routers.timetables import repair_timetable
+from app.schemas import TimetableRepairRequest
+from app.services.timetable_generator import TimetableGenerator
+
+
+def _generated_timetable(db):
+    """Two levels sharing one hall and one lecturer, generated"""
+    dept = add_department(db)
+    hall = add_room(db, 'Hall', 100)
+    lecturer = add_lecturer(db, dept, 'L1')
+    courses = []
+    for level in (2, 3):
+        group = add_group(db, dept, f'G{level}', level, 40)
+        courses.append(add_course(db, dept, f'C{level}01', level, [group], [lecturer], lecture_hours=4))
+    timetable = add_timetable(db)
+    assert TimetableGenerator(db, timetable.id, time_budget_seconds=30).generate_timetable()
+    return timetable, hall, courses
+
+
+def _status_code(timetable_id, repair, db):
+    try:
+        repair_timetable(timetable_id, repair, current_user=None, db=db)
+    except HTTPException as e:
+        return e.status_code
+    return None
+
+
+def test_repair_resolves_changed_course():
+    db = reset_db()
+    try:
+        timetable, _, courses = _generated_timetable(db)
+        untouched = {(slot.course_id, slot.day_of_week, slot.start_time)
+                     for slot in stored_slots(db, timetable) if slot.course_id != courses[0].id}
+        courses[0].lecture_hours = 6
+        db.commit()
+        result = repair_timetable(
+            timetable.id, TimetableRepairRequest(course_ids=[courses[0].id]), current_user=None, db=db
+        )
+        assert (result['affected_pairs'], result['removed_slots'], result['new_slots']) == (1, 4, 6)
+        slots = stored_slots(db, timetable)
+        assert sum(slot.course_id == courses[0].id for slot in slots) == 6
+        assert untouched <= {(slot.course_id, slot.day_of_week, slot.start_time) for slot in slots}
+        assert_clash_free(slots)
+        db.refresh(timetable)
+        assert timetable.generation_metadata['last_repair']['new_slots'] == 6
+    finally:
+        db.close()
+
+
+def test_repair_rejects_bad_requests():
+    db = reset_db()
+    try:
+        timetable, _, _ = _generated_timetable(db)
+        assert _status_code(timetable.id, TimetableRepairRequest(), db) == 400
+        assert _status_code(timetable.id + 1, TimetableRepairRequest(levels=[2]), db) == 404
+        assert _status_code(timetable.id, TimetableRepairRequest(levels=[2], engine='simplex'), db) == 400
+    finally:
+        db.close()
+
+
+def test_repair_without_room_conflicts():
+    db = reset_db()
+    try:
+        timetable, hall, _ = _generated_timetable(db)
+        before = len(stored_slots(db, timetable))
+        # No room is left that seats the groups
+        hall.capacity = 20
+        db.commit()
+        assert _status_code(timetable.id, TimetableRepairRequest(room_ids=[hall.id]), db) == 409
+        assert len(stored_slots(db, timetable)) == before
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    run_tests([
+        test_repair_resolves_changed_course,
+        test_repair_rejects_bad_requests,
+        test_repair_without_room_conflicts,
+    ])
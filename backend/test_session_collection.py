@@ -0,0 +1,145 @@
+"""
+Sessions that can never be placed (no eligible room, no lecturer with hours left) must
+fail their level, or be listed as unplaced by a greedy draft, never silently dropped.
+Run with `python test_session_collection.py` or pytest.
+"""
+from datetime import time
+from generation_test_data import (
+    reset_db, add_department, add_room, add_lecturer, add_group, add_course, add_timetable,
+    stored_slots, run_tests
+)
+from app.services.timetable_generator import TimetableGenerator
+
+
+def _no_room_timetable(db):
+    """An 80-student group and only a 50-seat room"""
+    dept = add_department(db)
+    add_room(db, 'Small', 50)
+    lecturer = add_lecturer(db, dept, 'L1')
+    group = add_group(db, dept, 'G2', 2, 80)
+    course = add_course(db, dept, 'C201', 2, [group], [lecturer], lecture_hours=4)
+    return add_timetable(db), course, group
+
+
+def _out_of_hours_timetable(db):
+    """One lecturer capped at 4 hours, teaching a 4-hour course at each of levels 5 and 4"""
+    dept = add_department(db)
+    add_room(db, 'Hall', 200)
+    lecturer = add_lecturer(db, dept, 'L1', max_hours=4)
+    for level in (5, 4):
+        group = add_group(db, dept, f'G{level}', level, 40)
+        add_course(db, dept, f'C{level}01', level, [group], [lecturer], lecture_hours=4)
+    return add_timetable(db)
+
+
+def test_no_eligible_room_fails_level():
+    db = reset_db()
+    try:
+        timetable, course, group = _no_room_timetable(db)
+        generator = TimetableGenerator(db, timetable.id)
+        assert not generator.generate_timetable()
+        stats = generator.level_stats['2']
+        assert stats['status'] == 'INFEASIBLE'
+        assert stats['skipped_sessions'] == 2
+        assert stats['precheck']['skipped_hours'] == {'no_room': 4}
+        assert sorted((p['course_id'], p['group_id'], p['s_id']) for p in stats['precheck']['problems']) == [
+            (course.id, group.id, 0), (course.id, group.id, 1)
+        ]
+        assert not stored_slots(db, timetable)
+    finally:
+        db.close()
+
+
+def test_no_eligible_room_greedy_lists_unplaced():
+    db = reset_db()
+    try:
+        timetable, course, group = _no_room_timetable(db)
+        generator = TimetableGenerator(db, timetable.id, engine='greedy')
+        assert generator.generate_timetable()
+        stats = generator.level_stats['2']
+        assert stats['status'] == 'INCOMPLETE'
+        assert stats['skipped_sessions'] == 2
+        assert sorted(map(tuple, stats['unplaced_sessions'])) == [(course.id, group.id, 0), (course.id, group.id, 1)]
+        # The draft is still made, with the precheck's report kept for the run
+        assert generator.run_stats['precheck']['2']['report']['skipped_hours'] == {'no_room': 4}
+    finally:
+        db.close()
+
+
+def test_no_eligible_room_fails_quota_level():
+    db = reset_db()
+    try:
+        timetable, _, _ = _no_room_timetable(db)
+        generator = TimetableGenerator(db, timetable.id, mode='quota')
+        assert not generator.generate_timetable()
+        # Left to the sequential run, which fails it
+        assert generator.run_stats['quota_fallback_levels'] == [2]
+        assert generator.level_stats['2']['precheck']['skipped_hours'] == {'no_room': 4}
+    finally:
+        db.close()
+
+
+def test_backtracking_keeps_unplaceable_level_failed():
+    db = reset_db()
+    try:
+        timetable, course, group = _no_room_timetable(db)
+        # A level-3 course holds the one room level 2 also needs, so level 2 backtracks into it
+        dept, lecturer = course.department, add_lecturer(db, course.department, 'L2')
+        for level in (3, 2):
+            other = add_group(db, dept, f'G{level}b', level, 40)
+            add_course(db, dept, f'C{level}02', level, [other], [lecturer], lecture_hours=4)
+        generator = TimetableGenerator(db, timetable.id, level_order='fixed')
+        assert not generator.generate_timetable()
+        rounds = generator.level_stats['2']['backtracking']
+        # Releasing the room cannot place the 80-student group's sessions
+        assert rounds and all(r['status'] == 'INFEASIBLE' for r in rounds)
+        assert rounds[0]['precheck_problems'] >= 2
+    finally:
+        db.close()
+
+
+def test_lecturer_out_of_hours_fails_level():
+    db = reset_db()
+    try:
+        timetable = _out_of_hours_timetable(db)
+        generator = TimetableGenerator(db, timetable.id)
+        assert not generator.generate_timetable()
+        assert generator.level_stats['5']['status'] == 'OPTIMAL'
+        stats = generator.level_stats['4']
+        assert stats['status'] == 'INFEASIBLE'
+        report = stats['precheck']
+        assert report['skipped_hours'] == {'lecturer_hours': 4}
+        # The lecturer whose hours ran out tops the pressure report
+        assert report['pressure'][0]['kind'] == 'lecturer' and report['pressure'][0]['pressure'] > 1
+    finally:
+        db.close()
+
+
+def test_remaining_hours_count_every_hour_of_a_slot():
+    db = reset_db()
+    try:
+        timetable = _out_of_hours_timetable(db)
+        generator = TimetableGenerator(db, timetable.id)
+        generator._load_snapshot()
+        lecturer_id = next(iter(generator.lecturer_eligibility.max_hours))
+        # Stored slots may span several hours: 2h on Monday and 3h on Tuesday use 5 of 4 hours
+        generator.all_slots = [
+            {'lecturer_id': lecturer_id, 'course_id': 1, 'day_of_week': 0, 'start_time': time(8), 'end_time': time(10)},
+            {'lecturer_id': lecturer_id, 'course_id': 1, 'day_of_week': 1, 'start_time': time(8), 'end_time': time(11)},
+        ]
+        assert generator._remaining_lecturer_hours()[lecturer_id] == 0
+        generator.all_slots = generator.all_slots[:1]
+        assert generator._remaining_lecturer_hours()[lecturer_id] == 2
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    run_tests([
+        test_no_eligible_room_fails_level,
+        test_no_eligible_room_greedy_lists_unplaced,
+        test_no_eligible_room_fails_quota_level,
+        test_backtracking_keeps_unplaceable_level_failed,
+        test_lecturer_out_of_hours_fails_level,
+        test_remaining_hours_count_every_hour_of_a_slot,
+    ])
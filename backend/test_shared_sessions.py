@@ -0,0 +1,90 @@
+"""
+Full-group general courses: their groups attend one shared session per block, in one
+room with one lecturer, unless no room holds them all or shared sessions are turned off.
+Run with `python test_shared_sessions.py` or pytest.
+"""
+from collections import defaultdict
+from generation_test_data import (
+    reset_db, add_department, add_room, add_lecturer, add_group, add_course, add_timetable,
+    stored_slots, hours_by_group, assert_clash_free, run_tests
+)
+from app.models import CourseType, GroupDivisionType
+from app.services.timetable_generator import TimetableGenerator
+
+
+def _general_course_timetable(db, hall_capacity=100):
+    """Two groups of 40 taking one 4-hour general course together and a course each of their own"""
+    dept = add_department(db)
+    add_room(db, 'Hall', hall_capacity)
+    add_room(db, 'Room', 50)
+    lecturer = add_lecturer(db, dept, 'L1')
+    groups = [add_group(db, dept, f'G{i}', 2, 40) for i in range(2)]
+    general = add_course(db, dept, 'GEN201', 2, groups, [lecturer], lecture_hours=4,
+                         course_type=CourseType.GENERAL, group_division_type=GroupDivisionType.FULL_GROUP)
+    for i, group in enumerate(groups):
+        add_course(db, dept, f'C20{i}', 2, [group], [add_lecturer(db, dept, f'L{i + 2}')], lecture_hours=4)
+    return add_timetable(db), general
+
+
+def _placements(slots, course_id):
+    """group_id -> set of (day, start, room, lecturer) of a course's slots"""
+    placed = defaultdict(set)
+    for slot in slots:
+        if slot.course_id == course_id:
+            placed[slot.group_id].add((slot.day_of_week, slot.start_time, slot.room_id, slot.lecturer_id))
+    return placed
+
+
+def _generate(db, timetable, **options):
+    generator = TimetableGenerator(db, timetable.id, time_budget_seconds=30, **options)
+    assert generator.generate_timetable(), options
+    slots = stored_slots(db, timetable)
+    assert set(hours_by_group(slots).values()) == {8}
+    assert_clash_free(slots)
+    return generator, slots
+
+
+def test_general_course_shared_by_its_groups():
+    for engine in ('bool_matrix', 'interval', 'factorized', 'two_phase', 'greedy'):
+        db = reset_db()
+        try:
+            timetable, general = _general_course_timetable(db)
+            generator, slots = _generate(db, timetable, engine=engine)
+            # One session per block for both groups, plus each group's own course
+            assert generator.level_stats['2']['sessions'] == 2 + 2 * 2, engine
+            placed = _placements(slots, general.id)
+            assert len(placed) == 2 and len(set(map(frozenset, placed.values()))) == 1, engine
+        finally:
+            db.close()
+
+
+def test_per_group_copies_without_a_room_for_all():
+    db = reset_db()
+    try:
+        timetable, general = _general_course_timetable(db, hall_capacity=60)
+        generator, slots = _generate(db, timetable)
+        assert generator.level_stats['2']['sessions'] == 2 * 2 + 2 * 2
+        placed = _placements(slots, general.id)
+        # The one lecturer teaches each group on its own, at different hours
+        times = [{(day, start) for day, start, _, _ in cells} for cells in placed.values()]
+        assert len(times) == 2 and not times[0] & times[1]
+    finally:
+        db.close()
+
+
+def test_shared_sessions_off():
+    db = reset_db()
+    try:
+        timetable, _ = _general_course_timetable(db)
+        generator, _ = _generate(db, timetable, shared_sessions=False)
+        assert generator.level_stats['2']['sessions'] == 2 * 2 + 2 * 2
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    run_tests([
+        test_general_course_shared_by_its_groups,
+        test_per_group_copies_without_a_room_for_all,
+        test_shared_sessions_off,
+    ])